@@ -6,11 +6,12 @@ from fastapi import Depends, HTTPException, status, Request, Response
 from fastapi.security import HTTPBearer, HTTPAuthorizationCredentials
 from sqlalchemy.orm import Session
 import secrets
+import time
 import uuid
 import logging
 
 from .config import settings
-from .database import get_db
+from .database import SessionLocal, get_db, is_replica_session, read_session
 from .models.user import User
 from .models.session import UserSession
 from .schemas.common import TokenPayload
@@ -124,9 +125,95 @@ def verify_jwt_token(token: str) -> Optional[TokenPayload]:
         return None
 
 
+_READ_METHODS = frozenset({"GET", "HEAD", "OPTIONS"})
+
+# Unix-время, до которого чтения клиента идут в primary. Подделка cookie
+# ничего не даёт: клиент лишь отправит свои чтения в primary
+READ_PRIMARY_COOKIE = "read_primary_until"
+
+def pin_to_primary(request: Request, until: Optional[float] = None):
+    """
+    Следующие чтения клиента (до until, по умолчанию DB_READ_YOUR_WRITES_SECONDS)
+    идут в primary. Cookie ставит middleware в app.main на любой ответ,
+    в том числе StreamingResponse.
+    """
+    until = until or time.time() + settings.DB_READ_YOUR_WRITES_SECONDS
+    request.state.read_primary_until = max(until, getattr(request.state, "read_primary_until", 0.0))
+
+def set_read_primary_cookie(request: Request, response: Response):
+    until = getattr(request.state, "read_primary_until", None)
+    if not until or until <= time.time():
+        return
+    response.set_cookie(
+        key=READ_PRIMARY_COOKIE,
+        value=f"{until:.3f}",
+        httponly=True,
+        secure=settings.SECURE_COOKIES,
+        samesite="lax",
+        max_age=int(until - time.time()) + 1,
+        domain=settings.COOKIE_DOMAIN
+    )
+
+# То же время из события done потока /records/jobs/{id}/events: после начала
+# StreamingResponse cookie уже не поставить
+READ_PRIMARY_HEADER = "X-Read-Primary-Until"
+
+def is_pinned_to_primary(request: Request) -> bool:
+    now = time.time()
+    try:
+        if float(request.cookies.get(READ_PRIMARY_COOKIE, 0)) > now:
+            return True
+        # Заголовок принимается не дальше DB_READ_YOUR_WRITES_SECONDS вперёд
+        until = float(request.headers.get(READ_PRIMARY_HEADER, 0))
+        return now < until <= now + settings.DB_READ_YOUR_WRITES_SECONDS
+    except ValueError:
+        return False
+
+def get_request_db(request: Request, primary: Session = Depends(get_db)):
+    """
+    Сессия для авторизации и чтений запроса: GET-запросы клиента, не
+    закреплённого за primary, идут в реплику, остальные - в primary
+    (та же сессия, что get_db у эндпоинта; без запросов она не подключается).
+    """
+    if request.method in _READ_METHODS and not is_pinned_to_primary(request):
+        yield from read_session()
+    else:
+        yield primary
+
+def _find_active_session(db: Session, session_id: int) -> Optional[UserSession]:
+    return db.query(UserSession).filter(
+        UserSession.id == session_id,
+        UserSession.is_active == True,
+        UserSession.expires_at > datetime.now(timezone.utc)
+    ).first()
+
+def _find_active_user(db: Session, user_id: int) -> Optional[User]:
+    return db.query(User).filter(User.id == user_id, User.is_active == True).first()
+
+def _touch_session(db: Session, session: UserSession):
+    """Обновляет last_used, если он устарел больше чем на SESSION_TOUCH_INTERVAL_SECONDS"""
+    now = datetime.now(timezone.utc)
+    last_used = session.last_used
+    if last_used is not None and last_used.tzinfo is None:
+        last_used = last_used.replace(tzinfo=timezone.utc)
+    if last_used is not None and (now - last_used).total_seconds() < settings.SESSION_TOUCH_INTERVAL_SECONDS:
+        return
+
+    if not is_replica_session(db):
+        session.last_used = now
+        db.commit()
+        return
+
+    with SessionLocal() as primary:
+        primary.query(UserSession).filter(UserSession.id == session.id).update(
+            {"last_used": now}, synchronize_session=False
+        )
+        primary.commit()
+
 async def get_current_user(
+    request: Request,
     credentials: HTTPAuthorizationCredentials = Depends(security),
-    db: Session = Depends(get_db)
+    db: Session = Depends(get_request_db)
 ) -> User:    
     credentials_exception = HTTPException(
         status_code=status.HTTP_401_UNAUTHORIZED,
@@ -140,28 +227,47 @@ async def get_current_user(
         logger.warning("Invalid token payload or token type")
         raise credentials_exception
 
-    session = db.query(UserSession).filter(
-        UserSession.id == token_payload.session_id,
-        UserSession.is_active == True,
-        UserSession.expires_at > datetime.now(timezone.utc)
-    ).first()
+    session = _find_active_session(db, token_payload.session_id)
+    user = _find_active_user(db, token_payload.user_id) if session else None
+
+    if not session and is_replica_session(db):
+        # Сессия только что создана и ещё не дошла до реплики
+        with SessionLocal() as primary:
+            session = _find_active_session(primary, token_payload.session_id)
+            user = _find_active_user(primary, token_payload.user_id) if session else None
+            # Загруженные объекты остаются доступны после закрытия сессии
+            primary.expunge_all()
+
+    if session:
+        # Для реплики last_used обновляется отдельной сессией primary по id,
+        # без commit, который сбросил бы загруженные атрибуты user
+        _touch_session(db, session)
 
     if not session:
         logger.warning(f"Session not found or expired: {token_payload.session_id}")
         raise credentials_exception
 
-    session.last_used = datetime.now(timezone.utc)
-    db.commit()
-
-    user = db.query(User).filter(User.id == token_payload.user_id,
-                                 User.is_active == True).first()
     if not user:
         logger.warning(f"User not found or inactive: {token_payload.user_id}")
         raise credentials_exception
 
+    if request.method not in _READ_METHODS:
+        # Запрос может что-то записать - следующие чтения клиента идут в primary
+        pin_to_primary(request)
+
     logger.debug(f"Current user retrieved: {user.id} ({user.email})")
     return user
 
+def get_read_db(
+    current_user: User = Depends(get_current_user),
+    db: Session = Depends(get_request_db)
+):
+    """
+    Сессия для эндпоинтов только для чтения: та же, что у авторизации
+    (реплика с read-your-writes)
+    """
+    return db
+
 def set_refresh_token_cookie(response: Response, refresh_token: str):
     response.set_cookie(
         key="refresh_token",
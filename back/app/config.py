@@ -1,10 +1,21 @@
 from pydantic_settings import BaseSettings
+from typing import Optional
 import os
 
 class Settings(BaseSettings):
     DEBUG: bool = False
 
     DATABASE_URL: str
+    # Реплика для чтения; без неё все запросы идут в DATABASE_URL
+    DATABASE_REPLICA_URL: Optional[str] = None
+    DB_POOL_SIZE: int = 10
+    DB_MAX_OVERFLOW: int = 20
+    DB_POOL_TIMEOUT_SECONDS: float = 10.0
+    DB_POOL_RECYCLE_SECONDS: int = 1800
+    DB_POOL_PRE_PING: bool = True
+    DB_READ_YOUR_WRITES_SECONDS: float = 10.0
+    DB_REPLICA_MAX_LAG_SECONDS: float = 5.0
+    DB_REPLICA_LAG_CHECK_INTERVAL_SECONDS: float = 5.0
     
     PRIVATE_KEY_PATH: str = "scripts/private.pem"
     PUBLIC_KEY_PATH: str = "scripts/public.pem"
@@ -13,6 +24,8 @@ class Settings(BaseSettings):
     ACCESS_TOKEN_EXPIRE_MINUTES: int = 30
     REFRESH_TOKEN_EXPIRE_DAYS: int = 7
     SESSION_CLEANUP_DAYS: int = 30
+    # last_used сессии обновляется не чаще этого: чтения не пишут в primary на каждый запрос
+    SESSION_TOUCH_INTERVAL_SECONDS: int = 300
 
     MAX_SESSIONS_PER_USER: int = 5
     SESSION_INACTIVITY_LIMIT_DAYS: int = 30
@@ -31,6 +44,160 @@ class Settings(BaseSettings):
     SECRET_KEY: str  # Секретный ключ для Object Storage
     SECRET_KEY_ID: str  # Key ID для Object Storage
 
+    # IAM-токен: кэшируется до истечения и обновляется заранее.
+    # IAM_TOKEN_CACHE_FILE позволяет разделить токен между процессами
+    IAM_TOKEN_URL: str = "https://iam.api.cloud.yandex.net/iam/v1/tokens"
+    IAM_TOKEN_REFRESH_AHEAD_SECONDS: float = 3600.0
+    IAM_TOKEN_MIN_VALIDITY_SECONDS: float = 300.0
+    IAM_TOKEN_DEFAULT_TTL_SECONDS: float = 12 * 3600.0
+    IAM_TOKEN_CACHE_FILE: Optional[str] = None
+
+    # Обработка загруженных записей
+    AUDIO_PROCESSING_DIR: str = os.path.join(
+        os.path.dirname(os.path.dirname(os.path.abspath(__file__))), "audio_processing"
+    )
+    MAX_UPLOAD_BYTES: int = 50 * 1024 * 1024
+    UPLOAD_CHUNK_SIZE: int = 64 * 1024
+    TRANSCODER_MAX_WORKERS: Optional[int] = None  # None - по числу CPU
+    TRANSCODE_TIMEOUT_SECONDS: float = 120.0
+
+    # Обрезка тишины перед распознаванием (VAD по энергии и переходам через ноль)
+    VAD_ENABLED: bool = True
+    VAD_SAMPLE_RATE: int = 16000
+    VAD_FRAME_MS: int = 30
+    VAD_PADDING_MS: int = 200
+    VAD_MAX_PAUSE_MS: int = 700
+    VAD_MIN_SPEECH_MS: int = 300
+    # Если тишины меньше этой доли, исходный Opus переупаковывается как есть, без перекодирования.
+    # В речи с обычными паузами VAD вырезает 10-20%, ради этого Opus не перекодируем
+    VAD_MIN_TRIM_RATIO: float = 0.3
+
+    # Кэш результатов анализа по SHA-256 аудио (повторные загрузки той же записи)
+    ANALYSIS_CACHE_ENABLED: bool = True
+    ANALYSIS_CACHE_TTL_SECONDS: int = 7 * 24 * 3600
+    ANALYSIS_CACHE_MAX_ENTRIES: int = 10000
+
+    # Object Storage (S3-совместимый API)
+    S3_ENDPOINT_URL: str = "https://storage.yandexcloud.net"
+    S3_ADDRESSING_STYLE: str = "auto"  # "path" для MinIO
+    S3_MAX_POOL_CONNECTIONS: int = 20
+    S3_CONNECT_TIMEOUT_SECONDS: float = 5.0
+    S3_READ_TIMEOUT_SECONDS: float = 60.0
+    S3_MULTIPART_THRESHOLD_BYTES: int = 8 * 1024 * 1024
+    S3_MULTIPART_CHUNK_BYTES: int = 8 * 1024 * 1024
+    S3_MULTIPART_MAX_CONCURRENCY: int = 4
+    S3_STT_PREFIX: str = "stt/"
+    S3_STALE_OBJECT_SECONDS: int = 3600
+    S3_SWEEP_INTERVAL_SECONDS: float = 600.0
+
+    # Circuit breaker и bulkhead для SpeechKit, YandexGPT и IAM
+    CIRCUIT_WINDOW_SIZE: int = 20
+    CIRCUIT_MIN_CALLS: int = 10
+    CIRCUIT_FAILURE_RATE_THRESHOLD: float = 0.5
+    CIRCUIT_SLOW_CALL_RATE_THRESHOLD: float = 0.8
+    CIRCUIT_OPEN_SECONDS: float = 30.0
+    CIRCUIT_HALF_OPEN_MAX_CALLS: int = 2
+    BULKHEAD_MAX_WAIT_SECONDS: float = 5.0
+    SPEECHKIT_MAX_CONCURRENT_CALLS: int = 16
+    SPEECHKIT_SLOW_CALL_SECONDS: float = 20.0
+    LLM_SLOW_CALL_SECONDS: float = 15.0
+    IAM_SLOW_CALL_SECONDS: float = 5.0
+
+    # Исходящие HTTP-запросы в Yandex Cloud: общий пул keep-alive соединений
+    HTTP_POOL_CONNECTIONS: int = 10
+    HTTP_POOL_MAXSIZE: int = 20
+    HTTP_CONNECT_TIMEOUT_SECONDS: float = 5.0
+    HTTP_READ_TIMEOUT_SECONDS: float = 30.0
+    HTTP_MAX_RETRIES: int = 3
+    HTTP_RETRY_BACKOFF_SECONDS: float = 0.5
+
+    # YandexGPT
+    LLM_COMPLETION_URL: str = "https://llm.api.cloud.yandex.net/foundationModels/v1/completion"
+    LLM_MAX_CONCURRENT_CALLS: int = 8
+    LLM_CALL_TIMEOUT_SECONDS: float = 30.0  # на вызов целиком, вместе с повторами
+    LLM_ATTEMPT_TIMEOUT_SECONDS: float = 20.0
+    # Повторы при 429/5xx с decorrelated jitter
+    LLM_MAX_ATTEMPTS: int = 3
+    LLM_RETRY_BASE_DELAY_SECONDS: float = 0.5
+    LLM_RETRY_MAX_DELAY_SECONDS: float = 8.0
+    # Хеджирование: второй такой же запрос, если первый дольше p95
+    LLM_HEDGING_ENABLED: bool = False
+    LLM_HEDGE_PERCENTILE: float = 95.0
+    LLM_HEDGE_MIN_DELAY_SECONDS: float = 0.5
+    LLM_HEDGE_DEFAULT_DELAY_SECONDS: float = 5.0  # пока мало замеров задержки
+    LLM_HEDGE_BUDGET_RATIO: float = 0.1  # не больше 10% запросов с хеджем
+    LLM_LATENCY_WINDOW: int = 200
+    LLM_LATENCY_MIN_SAMPLES: int = 20
+    # Один запрос вместо двух: саммари, эмоция и инсайты одним JSON
+    LLM_COMBINED_ANALYSIS: bool = False
+    LLM_COMBINED_MAX_TOKENS: int = 1500
+    LLM_COMBINED_RETRIES: int = 1
+    # Саммари запрашивается с "stream": true, текст виден клиенту по мере генерации
+    LLM_STREAM_SUMMARY: bool = True
+
+    # Кэш ответов LLM: LRU в памяти процесса + таблица в Postgres с TTL
+    LLM_CACHE_ENABLED: bool = True
+    LLM_CACHE_MEMORY_ENTRIES: int = 512
+    LLM_CACHE_TTL_SECONDS: int = 7 * 24 * 3600
+    LLM_CACHE_PERSISTENT: bool = True
+
+    # SpeechKit. Адреса настраиваются, чтобы можно было подставить локальную заглушку
+    STT_RECOGNIZE_URL: str = "https://stt.api.cloud.yandex.net/speech/v1/stt:recognize"
+    STT_LONG_RUNNING_URL: str = "https://transcribe.api.cloud.yandex.net/speech/stt/v2/longRunningRecognize"
+    STT_OPERATION_URL: str = "https://operation.api.cloud.yandex.net/operations"
+
+    # Синхронное распознавание для коротких записей (лимиты API: 30 секунд и 1 МБ)
+    STT_SYNC_ENABLED: bool = True
+    STT_SYNC_MAX_DURATION_SECONDS: float = 30.0
+    STT_SYNC_MAX_BYTES: int = 1024 * 1024
+    STT_SYNC_TIMEOUT_SECONDS: float = 30.0
+
+    # Длинные записи режутся по паузам на части и распознаются параллельно.
+    # Части до STT_SYNC_MAX_DURATION_SECONDS идут в синхронное распознавание
+    STT_SPLIT_ENABLED: bool = True
+    STT_SEGMENT_MAX_SECONDS: float = 30.0
+    STT_SEGMENT_MIN_SECONDS: float = 10.0
+    STT_SPLIT_MIN_PAUSE_MS: int = 250
+    STT_MAX_PARALLEL_SEGMENTS: int = 4
+
+    # Опрос операций SpeechKit: первый запрос к ожидаемому моменту готовности,
+    # дальше экспоненциальная задержка; дедлайн растёт с длительностью аудио
+    STT_EXPECTED_BASE_SECONDS: float = 1.0
+    STT_EXPECTED_SECONDS_PER_AUDIO_SECOND: float = 0.15
+    STT_POLL_MIN_INTERVAL_SECONDS: float = 0.5
+    STT_POLL_MAX_INTERVAL_SECONDS: float = 5.0
+    STT_POLL_BACKOFF_FACTOR: float = 1.5
+    STT_POLL_REQUEST_TIMEOUT_SECONDS: float = 10.0
+    STT_DEADLINE_BASE_SECONDS: float = 60.0
+    STT_DEADLINE_SECONDS_PER_AUDIO_SECOND: float = 1.0
+
+    # Очередь задач (таблица processing_jobs)
+    JOB_QUEUE_INLINE: bool = True  # False - задачи выполняет только `python -m services.worker`
+    WORKER_CONCURRENCY: int = 2
+    WORKER_POLL_INTERVAL_SECONDS: float = 1.0
+    JOB_VISIBILITY_TIMEOUT_SECONDS: int = 300
+    # Аренда продлевается, пока задача выполняется (например, ждёт SpeechKit дольше аренды)
+    JOB_HEARTBEAT_INTERVAL_SECONDS: float = 60.0
+    # Inline-режим: как часто процесс API ищет повторы, отложенные и брошенные задачи
+    JOB_INLINE_POLL_INTERVAL_SECONDS: float = 5.0
+    JOB_MAX_ATTEMPTS: int = 3
+    JOB_RETRY_BACKOFF_SECONDS: float = 10.0
+    JOB_RETRY_BACKOFF_MAX_SECONDS: float = 600.0
+    # Сколько задача может откладываться из-за недоступной зависимости, не тратя попытки
+    JOB_MAX_DEFER_SECONDS: float = 3600.0
+
+    # Поток событий обработки (SSE): частота записи частичного саммари и опроса задачи
+    JOB_PARTIAL_FLUSH_SECONDS: float = 0.5
+    JOB_EVENTS_POLL_INTERVAL_SECONDS: float = 0.5
+    JOB_EVENTS_KEEPALIVE_SECONDS: float = 15.0
+    JOB_EVENTS_MAX_SECONDS: float = 900.0
+
+    # Допуск загрузок: сверх лимита - 503 с Retry-After до чтения тела запроса
+    ADMISSION_MAX_IN_FLIGHT: int = 4  # анализов одновременно в процессе API (JOB_QUEUE_INLINE)
+    ADMISSION_MAX_QUEUE: int = 16
+    ADMISSION_MAX_QUEUED_JOBS: int = 200  # с отдельными воркерами - задач в статусе pending
+    ADMISSION_RETRY_AFTER_SECONDS: float = 15.0
+
     class Config:
         env_file = ".env"
         env_file_encoding = "utf-8"
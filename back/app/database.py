@@ -1,16 +1,116 @@
-from sqlalchemy import create_engine
+"""
+Подключения к базе: основная (primary) и, если задана DATABASE_REPLICA_URL,
+реплика для чтения.
+
+GET-запросы (авторизация и эндпоинты с get_read_db из app.auth) читают
+из реплики, кроме двух случаев:
+- клиент недавно что-то записал (read-your-writes): его чтения
+  DB_READ_YOUR_WRITES_SECONDS идут в primary, чтобы он видел свои изменения
+  несмотря на отставание реплики. Закрепление хранится у клиента в cookie
+  (app.auth.pin_to_primary), поэтому действует во всех процессах API;
+- реплика отстаёт больше DB_REPLICA_MAX_LAG_SECONDS.
+"""
+import logging
+import threading
+import time
+from typing import Any, Dict, Iterator
+
+from sqlalchemy import create_engine, text
 from sqlalchemy.ext.declarative import declarative_base
-from sqlalchemy.orm import sessionmaker
+from sqlalchemy.orm import Session, sessionmaker
 from .config import settings
 
-engine = create_engine(settings.DATABASE_URL)
+logger = logging.getLogger(__name__)
+
+
+def _engine_options(url: str) -> Dict[str, Any]:
+    options = {
+        "pool_pre_ping": settings.DB_POOL_PRE_PING,
+        "pool_recycle": settings.DB_POOL_RECYCLE_SECONDS,
+    }
+    if not url.startswith("sqlite"):
+        options.update(
+            pool_size=settings.DB_POOL_SIZE,
+            max_overflow=settings.DB_MAX_OVERFLOW,
+            pool_timeout=settings.DB_POOL_TIMEOUT_SECONDS,
+        )
+    return options
+
+
+engine = create_engine(settings.DATABASE_URL, **_engine_options(settings.DATABASE_URL))
 SessionLocal = sessionmaker(autocommit=False, autoflush=False, bind=engine)
 
+replica_engine = None
+ReplicaSessionLocal = SessionLocal
+if settings.DATABASE_REPLICA_URL:
+    replica_engine = create_engine(settings.DATABASE_REPLICA_URL, **_engine_options(settings.DATABASE_REPLICA_URL))
+    ReplicaSessionLocal = sessionmaker(autocommit=False, autoflush=False, bind=replica_engine)
+
 Base = declarative_base()
 
+_replica_state = {"checked_at": 0.0, "lag_seconds": None, "healthy": True}
+_replica_lock = threading.Lock()
+
+
 def get_db():
     db = SessionLocal()
     try:
         yield db
     finally:
-        db.close()
\ No newline at end of file
+        db.close()
+
+
+def _replica_healthy() -> bool:
+    """Отставание реплики, не чаще раза в DB_REPLICA_LAG_CHECK_INTERVAL_SECONDS"""
+    with _replica_lock:
+        if time.monotonic() - _replica_state["checked_at"] < settings.DB_REPLICA_LAG_CHECK_INTERVAL_SECONDS:
+            return _replica_state["healthy"]
+        _replica_state["checked_at"] = time.monotonic()
+
+    try:
+        with replica_engine.connect() as conn:
+            # NULL - это не реплика или репликация ещё ничего не применила
+            lag = conn.execute(text(
+                "SELECT COALESCE(EXTRACT(EPOCH FROM now() - pg_last_xact_replay_timestamp()), 0)"
+            )).scalar()
+        lag = float(lag)
+        healthy = lag <= settings.DB_REPLICA_MAX_LAG_SECONDS
+        if not healthy:
+            logger.warning(f"Replica lags {lag:.1f}s behind primary, reading from primary")
+    except Exception as e:
+        logger.error(f"Replica lag check failed: {str(e)}")
+        lag, healthy = None, False
+
+    with _replica_lock:
+        _replica_state["lag_seconds"] = lag
+        _replica_state["healthy"] = healthy
+    return healthy
+
+
+def read_session() -> Iterator[Session]:
+    """Сессия для чтения: реплика, если она есть и здорова"""
+    use_replica = replica_engine is not None and _replica_healthy()
+    db = (ReplicaSessionLocal if use_replica else SessionLocal)()
+    try:
+        yield db
+    finally:
+        db.close()
+
+
+def get_replica_db():
+    """Для чтения данных, общих для всех пользователей (без read-your-writes)"""
+    yield from read_session()
+
+
+def is_replica_session(db: Session) -> bool:
+    return replica_engine is not None and db.get_bind() is replica_engine
+
+
+def replica_stats() -> Dict[str, Any]:
+    with _replica_lock:
+        state = dict(_replica_state)
+    return {
+        "configured": replica_engine is not None,
+        "healthy": state["healthy"],
+        "lag_seconds": state["lag_seconds"]
+    }
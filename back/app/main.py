@@ -1,16 +1,26 @@
 from datetime import datetime, timezone
 from fastapi import FastAPI, Depends, HTTPException, Request, status
 from fastapi.middleware.cors import CORSMiddleware
-from fastapi.responses import JSONResponse
+from fastapi.responses import JSONResponse, Response
+from sqlalchemy import text
 from sqlalchemy.orm import Session
 import uvicorn
 import logging
+import os
+import time
 
 from .config import settings
-from .database import engine, get_db
-from .models import user
+from .database import engine, get_db, replica_stats
+from .metrics import HTTP_REQUEST_SECONDS, HTTP_REQUESTS_IN_FLIGHT, mark_process_dead, render_metrics
 from .routes import auth, users, records, achievements, calendar
-from .auth import cleanup_expired_sessions
+from .auth import cleanup_expired_sessions, set_read_primary_cookie
+from services.transcoder import transcoder_pool
+from services.llm_cache import llm_cache
+from services.admission import inline_admission
+from services.gpt_service import llm_call_stats
+from services.utils.http_client import close_async_client
+from services.utils.resilience import DependencyUnavailableError, dependency_stats
+from services.worker import inline_runner
 
 logging.basicConfig(
     level=logging.INFO,
@@ -22,17 +32,6 @@ logging.basicConfig(
 
 logger = logging.getLogger(__name__)
 
-try:
-    user.Base.metadata.create_all(bind=engine)
-    logger.info("Database tables created successfully")
-
-    from scripts.init_achievements import init_achievements
-    logger.info("Starting achievements initialization...")
-    init_achievements()
-except Exception as e:
-    logger.error(f"Error creating database tables: {str(e)}")
-    raise
-
 app = FastAPI(
     title="Voice Diary API",
     description="Backend API for Voice Diary application with achievements system",
@@ -50,6 +49,80 @@ app.add_middleware(
     allow_headers=["*"],
 )
 
+@app.middleware("http")
+async def record_request_metrics(request: Request, call_next):
+    started = time.perf_counter()
+    status_code = 500
+    HTTP_REQUESTS_IN_FLIGHT.inc()
+    try:
+        response = await call_next(request)
+        status_code = response.status_code
+        return response
+    finally:
+        HTTP_REQUESTS_IN_FLIGHT.dec()
+        # Шаблон пути, а не сам путь: /records/{record_id}, а не /records/42
+        route = request.scope.get("route")
+        HTTP_REQUEST_SECONDS.labels(
+            method=request.method,
+            route=getattr(route, "path", "unmatched"),
+            status=str(status_code)
+        ).observe(time.perf_counter() - started)
+
+@app.middleware("http")
+async def keep_read_primary_cookie(request: Request, call_next):
+    # state создаётся в scope до вызова эндпоинта, чтобы pin_to_primary
+    # из зависимостей был виден здесь (cookie зависимостей теряются,
+    # если эндпоинт сам возвращает Response)
+    request.state
+    response = await call_next(request)
+    set_read_primary_cookie(request, response)
+    return response
+
+def _check_schema_revision():
+    """
+    Схему создают миграции (alembic upgrade head). Если база отстаёт,
+    процесс не стартует: иначе запросы падали бы на отсутствующих таблицах.
+    """
+    from alembic.config import Config
+    from alembic.runtime.migration import MigrationContext
+    from alembic.script import ScriptDirectory
+
+    config = Config(os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), "alembic.ini"))
+    heads = set(ScriptDirectory.from_config(config).get_heads())
+    with engine.connect() as conn:
+        current = set(MigrationContext.configure(conn).get_current_heads())
+    if current != heads:
+        raise RuntimeError(
+            f"Database schema is at {sorted(current) or 'no revision'}, expected {sorted(heads)}: "
+            "run 'alembic upgrade head' (a database created before migrations: 'alembic stamp 0001' first)"
+        )
+
+@app.on_event("startup")
+def prepare_database():
+    try:
+        _check_schema_revision()
+
+        from scripts.init_achievements import init_achievements
+        logger.info("Starting achievements initialization...")
+        init_achievements()
+    except Exception as e:
+        logger.error(f"Error preparing database: {str(e)}")
+        raise
+
+@app.on_event("startup")
+async def start_inline_jobs():
+    if settings.JOB_QUEUE_INLINE:
+        inline_runner.start()
+
+@app.on_event("shutdown")
+async def stop_inline_jobs():
+    await inline_runner.stop()
+
+@app.on_event("shutdown")
+async def close_http_clients():
+    await close_async_client()
+    mark_process_dead()
+
 app.include_router(auth.router)
 app.include_router(users.router)
 app.include_router(records.router)
@@ -68,13 +141,19 @@ async def root():
 @app.get("/health")
 async def health_check(db: Session = Depends(get_db)):
     try:
-        db.execute("SELECT 1")
+        db.execute(text("SELECT 1"))
         
         cleanup_expired_sessions(db)
         
         return {
             "status": "healthy",
             "database": "connected",
+            "replica": replica_stats(),
+            "transcoder": transcoder_pool.stats(),
+            "llm_cache": llm_cache.stats(),
+            "llm_calls": llm_call_stats(),
+            "admission": inline_admission.stats(),
+            "dependencies": dependency_stats(),
             "timestamp": datetime.now(timezone.utc).isoformat()
         }
     except Exception as e:
@@ -84,6 +163,11 @@ async def health_check(db: Session = Depends(get_db)):
             detail="Service unavailable"
         )
 
+@app.get("/metrics", include_in_schema=False)
+async def metrics():
+    body, content_type = render_metrics()
+    return Response(content=body, media_type=content_type)
+
 @app.get("/info")
 async def api_info():
     return {
@@ -114,6 +198,14 @@ async def internal_error_handler(request, exc):
         content={"message": "Internal server error"}
     )
 
+@app.exception_handler(DependencyUnavailableError)
+async def dependency_unavailable_handler(request: Request, exc: DependencyUnavailableError):
+    return JSONResponse(
+        status_code=503,
+        content={"message": "Service temporarily unavailable", "dependency": exc.dependency},
+        headers={"Retry-After": str(int(round(exc.retry_after)))}
+    )
+
 @app.exception_handler(429)
 async def rate_limit_handler(request: Request, exc: Exception):
     return JSONResponse(
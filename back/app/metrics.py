@@ -0,0 +1,137 @@
+"""
+Метрики Prometheus.
+
+С несколькими воркерами uvicorn (и с отдельным воркером очереди) у каждого
+процесса свои счётчики. Если задана переменная окружения
+PROMETHEUS_MULTIPROC_DIR, prometheus_client пишет значения в файлы этой
+папки, а /metrics собирает их по всем процессам. Папку нужно очищать
+перед запуском сервиса.
+"""
+import os
+import time
+from contextlib import contextmanager
+from urllib.parse import urlparse
+
+from prometheus_client import (
+    CONTENT_TYPE_LATEST, CollectorRegistry, Counter, Gauge, Histogram, REGISTRY, generate_latest, multiprocess
+)
+
+from .config import settings
+
+# Этапы длятся от миллисекунд (запись в БД) до минут (ожидание STT)
+_STAGE_BUCKETS = (0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10, 20, 30, 60, 120, 300)
+
+PIPELINE_STAGE_SECONDS = Histogram(
+    "voicebook_pipeline_stage_seconds",
+    "Duration of record processing stages",
+    ["stage"],
+    buckets=_STAGE_BUCKETS
+)
+PIPELINE_JOBS_IN_FLIGHT = Gauge(
+    "voicebook_pipeline_jobs_in_flight",
+    "Processing jobs currently executing",
+    ["job_type"],
+    multiprocess_mode="livesum"
+)
+
+HTTP_REQUEST_SECONDS = Histogram(
+    "voicebook_http_request_duration_seconds",
+    "HTTP request latency by route",
+    ["method", "route", "status"]
+)
+HTTP_REQUESTS_IN_FLIGHT = Gauge(
+    "voicebook_http_requests_in_flight",
+    "HTTP requests currently being served",
+    multiprocess_mode="livesum"
+)
+
+OUTBOUND_CALLS = Counter(
+    "voicebook_outbound_calls_total",
+    "Outbound calls by dependency and HTTP status",
+    ["dependency", "status"]
+)
+OUTBOUND_IN_FLIGHT = Gauge(
+    "voicebook_outbound_calls_in_flight",
+    "Outbound calls currently in flight",
+    ["dependency"],
+    multiprocess_mode="livesum"
+)
+
+TRANSCODES_ACTIVE = Gauge(
+    "voicebook_transcodes_active",
+    "ffmpeg processes currently running",
+    multiprocess_mode="livesum"
+)
+TRANSCODES_QUEUED = Gauge(
+    "voicebook_transcodes_queued",
+    "Transcodes waiting for a free ffmpeg slot",
+    multiprocess_mode="livesum"
+)
+
+AUDIO_PREPARE_TOTAL = Counter(
+    "voicebook_audio_prepare_total",
+    "How uploaded audio was turned into OGG Opus: copy, remux or encode",
+    ["container", "path"]
+)
+
+LLM_CALL_EVENTS = Counter(
+    "voicebook_llm_call_events_total",
+    "LLM completion calls, attempts, retries and hedges",
+    ["event"]
+)
+
+
+@contextmanager
+def track_stage(stage: str):
+    """with track_stage("transcode"): ... - подходит и для async-кода"""
+    started = time.perf_counter()
+    try:
+        yield
+    finally:
+        PIPELINE_STAGE_SECONDS.labels(stage=stage).observe(time.perf_counter() - started)
+
+
+def _dependency_hosts() -> dict:
+    urls = {
+        settings.LLM_COMPLETION_URL: "llm",
+        settings.STT_RECOGNIZE_URL: "speechkit",
+        settings.STT_LONG_RUNNING_URL: "speechkit",
+        settings.STT_OPERATION_URL: "speechkit",
+        settings.IAM_TOKEN_URL: "iam",
+        settings.S3_ENDPOINT_URL: "s3",
+    }
+    return {urlparse(url).hostname: name for url, name in urls.items() if url}
+
+
+_DEPENDENCY_HOSTS = _dependency_hosts()
+
+
+def dependency_for_url(url) -> str:
+    host = urlparse(str(url)).hostname or ""
+    if host in _DEPENDENCY_HOSTS:
+        return _DEPENDENCY_HOSTS[host]
+    # Виртуальные хосты бакетов: <bucket>.storage.yandexcloud.net
+    for known, name in _DEPENDENCY_HOSTS.items():
+        if known and host.endswith("." + known):
+            return name
+    return "other"
+
+
+def count_outbound(url, status) -> None:
+    OUTBOUND_CALLS.labels(dependency=dependency_for_url(url), status=str(status)).inc()
+
+
+def mark_process_dead() -> None:
+    """При остановке процесса: его gauge-значения перестают учитываться"""
+    if os.environ.get("PROMETHEUS_MULTIPROC_DIR"):
+        multiprocess.mark_process_dead(os.getpid())
+
+
+def render_metrics() -> tuple:
+    """(тело, content type) для /metrics"""
+    if os.environ.get("PROMETHEUS_MULTIPROC_DIR"):
+        registry = CollectorRegistry()
+        multiprocess.MultiProcessCollector(registry)
+    else:
+        registry = REGISTRY
+    return generate_latest(registry), CONTENT_TYPE_LATEST
@@ -3,5 +3,8 @@ from .record import Record
 from .achievement import Achievement
 from .user_achievement import UserAchievement
 from .daily_stats import DailyStats
+from .processing_job import ProcessingJob
+from .audio_analysis_cache import AudioAnalysisCache
+from .llm_response_cache import LlmResponseCache
 
-__all__ = ["User", "Record", "Achievement", "UserAchievement", "UserSession", "DailyStats"]
\ No newline at end of file
+__all__ = ["User", "Record", "Achievement", "UserAchievement", "UserSession", "DailyStats", "ProcessingJob", "AudioAnalysisCache", "LlmResponseCache"]
\ No newline at end of file
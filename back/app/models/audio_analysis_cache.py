@@ -0,0 +1,22 @@
+from sqlalchemy import Column, Integer, String, Text, Float, JSON, DateTime, ForeignKey
+from datetime import datetime, timezone
+from ..database import Base
+
+
+class AudioAnalysisCache(Base):
+    __tablename__ = "audio_analysis_cache"
+
+    # Кэш свой у каждого пользователя: по одному хешу нельзя получить чужой транскрипт
+    user_id = Column(Integer, ForeignKey("users.id"), primary_key=True)
+    content_hash = Column(String(64), primary_key=True)  # SHA-256 загруженного аудио
+    transcript = Column(Text, nullable=False)
+    summary = Column(Text, nullable=False)
+    emotion = Column(String, nullable=False)
+    insights = Column(JSON)
+    duration = Column(Float, nullable=True)
+    created_at = Column(DateTime, default=lambda: datetime.now(timezone.utc))
+    last_accessed_at = Column(DateTime, default=lambda: datetime.now(timezone.utc), index=True)
+    expires_at = Column(DateTime, nullable=False, index=True)
+
+    def __repr__(self):
+        return f"<AudioAnalysisCache(user_id={self.user_id}, content_hash='{self.content_hash}', emotion='{self.emotion}')>"
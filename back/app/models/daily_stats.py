@@ -1,10 +1,13 @@
-from sqlalchemy import Column, Float, Integer, String, JSON, DateTime, Date, ForeignKey, Text
+from sqlalchemy import Column, Float, Integer, String, JSON, DateTime, Date, ForeignKey, Text, UniqueConstraint
 from sqlalchemy.orm import relationship
 from datetime import datetime, timezone
 from ..database import Base
 
 class DailyStats(Base):
     __tablename__ = "daily_stats"
+    __table_args__ = (
+        UniqueConstraint("user_id", "date", name="uq_daily_stats_user_id_date"),
+    )
     
     id = Column(Integer, primary_key=True, index=True)
     user_id = Column(Integer, ForeignKey("users.id"), nullable=False)
@@ -0,0 +1,16 @@
+from sqlalchemy import Column, String, Text, DateTime
+from datetime import datetime, timezone
+from ..database import Base
+
+
+class LlmResponseCache(Base):
+    __tablename__ = "llm_response_cache"
+
+    cache_key = Column(String(64), primary_key=True)  # SHA-256 от модели, промпта, текста и параметров
+    model_uri = Column(String, nullable=False)
+    response = Column(Text, nullable=False)
+    created_at = Column(DateTime, default=lambda: datetime.now(timezone.utc))
+    expires_at = Column(DateTime, nullable=False, index=True)
+
+    def __repr__(self):
+        return f"<LlmResponseCache(cache_key='{self.cache_key}', model_uri='{self.model_uri}')>"
@@ -0,0 +1,63 @@
+from sqlalchemy import Column, Integer, String, Text, Float, DateTime, ForeignKey, JSON
+from sqlalchemy.orm import relationship
+from datetime import datetime, timezone
+from ..database import Base
+
+
+class JobStatus:
+    PENDING = "pending"
+    PROCESSING = "processing"
+    COMPLETED = "completed"
+    FAILED = "failed"  # ошибка, которую бессмысленно повторять
+    DEAD = "dead"  # исчерпаны все попытки
+
+
+class JobType:
+    PROCESS_AUDIO = "process_audio"
+    DAILY_STATS = "daily_stats"
+
+
+class JobStage:
+    UPLOADED = "uploaded"
+    TRANSCODING = "transcoding"
+    TRANSCRIBING = "transcribing"
+    ANALYSING = "analysing"
+    SAVING = "saving"
+    SAVED = "saved"
+
+
+class ProcessingJob(Base):
+    __tablename__ = "processing_jobs"
+
+    id = Column(Integer, primary_key=True, index=True)
+    job_type = Column(String, nullable=False, default=JobType.PROCESS_AUDIO)
+    user_id = Column(Integer, ForeignKey("users.id"), nullable=False, index=True)
+    status = Column(String, nullable=False, default=JobStatus.PENDING)
+    stage = Column(String, nullable=False, default=JobStage.UPLOADED)
+    payload = Column(JSON, nullable=True)
+    audio_path = Column(String, nullable=True)
+    audio_sha256 = Column(String(64), nullable=True)
+    audio_size = Column(Integer, nullable=True)
+    record_name = Column(String, nullable=True)
+    duration = Column(Float, nullable=False, default=0.0)
+    record_id = Column(Integer, ForeignKey("records.id", ondelete="SET NULL"), nullable=True)
+    error = Column(Text, nullable=True)
+    # Саммари по мере генерации LLM - для потока событий /records/jobs/{id}/events
+    partial_summary = Column(Text, nullable=True)
+
+    # Очередь: попытки, отложенный запуск и аренда задачи воркером
+    attempts = Column(Integer, nullable=False, default=0)
+    max_attempts = Column(Integer, nullable=False, default=3)
+    run_after = Column(DateTime, nullable=False, default=lambda: datetime.now(timezone.utc), index=True)
+    locked_by = Column(String, nullable=True)
+    locked_until = Column(DateTime, nullable=True)
+
+    created_at = Column(DateTime, default=lambda: datetime.now(timezone.utc))
+    updated_at = Column(DateTime, default=lambda: datetime.now(timezone.utc),
+                        onupdate=lambda: datetime.now(timezone.utc))
+
+    user = relationship("User", back_populates="processing_jobs")
+    record = relationship("Record")
+
+    def __repr__(self):
+        return f"<ProcessingJob(id={self.id}, type='{self.job_type}', user_id={self.user_id}, status='{self.status}', stage='{self.stage}')>"
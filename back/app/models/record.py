@@ -1,4 +1,4 @@
-from sqlalchemy import Column, Integer, String, JSON, DateTime, ForeignKey, Float
+from sqlalchemy import Column, Integer, String, JSON, DateTime, ForeignKey, Float, Index
 from sqlalchemy.orm import relationship
 from datetime import datetime, timezone
 from ..database import Base
@@ -6,6 +6,11 @@ from ..database import Base
 
 class Record(Base):
     __tablename__ = "records"
+    __table_args__ = (
+        # Записи пользователя по дате и по эмоции (см. migrations/versions)
+        Index("ix_records_user_id_created_at", "user_id", "created_at"),
+        Index("ix_records_user_id_emotion", "user_id", "emotion"),
+    )
 
     id = Column(Integer, primary_key=True, index=True)
     user_id = Column(Integer, ForeignKey("users.id"), nullable=False)
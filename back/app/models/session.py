@@ -1,4 +1,4 @@
-from sqlalchemy import Column, Integer, String, Boolean, DateTime, ForeignKey, Text
+from sqlalchemy import Column, Integer, String, Boolean, DateTime, ForeignKey, Text, Index
 from sqlalchemy.orm import relationship
 from datetime import datetime, timezone
 from ..database import Base
@@ -6,6 +6,9 @@ from ..database import Base
 
 class UserSession(Base):
     __tablename__ = "user_sessions"
+    __table_args__ = (
+        Index("ix_user_sessions_user_id_is_active", "user_id", "is_active"),
+    )
 
     id = Column(Integer, primary_key=True, index=True)
     user_id = Column(Integer, ForeignKey("users.id"), nullable=False)
@@ -2,8 +2,8 @@ from fastapi import APIRouter, Depends, HTTPException
 from sqlalchemy.orm import Session
 from typing import List
 
-from app.database import get_db
-from app.auth import get_current_user
+from app.database import get_db, get_replica_db
+from app.auth import get_current_user, get_read_db
 from app.models.user import User
 from services.achievement_service import AchievementService
 from app.schemas.achievement import AchievementResponse, UserAchievementResponse, AchievementProgress
@@ -12,21 +12,21 @@ router = APIRouter(prefix="/achievements", tags=["achievements"])
 
 @router.get("/", response_model=List[AchievementResponse])
 async def get_all_achievements(
-    db: Session = Depends(get_db),
+    db: Session = Depends(get_replica_db),
 ):
     """Получить все доступные достижения"""
     return AchievementService.get_all_achievements(db)
 
 @router.get("/my", response_model=List[UserAchievementResponse])
 async def get_my_achievements(
-    db: Session = Depends(get_db),
+    db: Session = Depends(get_read_db),
     current_user: User = Depends(get_current_user)
 ):
     return AchievementService.get_user_achievements(db, current_user.id)
 
 @router.get("/stats")
 async def get_achievement_stats(
-    db: Session = Depends(get_db),
+    db: Session = Depends(get_read_db),
     current_user: User = Depends(get_current_user)
 ):
     return AchievementService.get_achievement_stats(db, current_user.id)
@@ -34,7 +34,7 @@ async def get_achievement_stats(
 @router.get("/{achievement_id}/progress", response_model=AchievementProgress)
 async def get_achievement_progress(
     achievement_id: int,
-    db: Session = Depends(get_db),
+    db: Session = Depends(get_read_db),
     current_user: User = Depends(get_current_user)
 ):
     progress = AchievementService.get_achievement_progress(db, current_user.id, achievement_id)
@@ -4,7 +4,7 @@ from datetime import date, datetime
 from typing import List
 
 from ..database import get_db
-from ..auth import get_current_user
+from ..auth import get_current_user, get_read_db
 from ..models.user import User
 from ..schemas.daily_stats import CalendarResponse, CalendarDetailResponse
 from services.daily_stats_service import DailyStatsService
@@ -32,7 +32,7 @@ async def get_calendar_day_detail(
     daily_stats_service = DailyStatsService(db)
     
     # Получаем статистику
-    daily_stat = daily_stats_service.generate_daily_stats(current_user.id, date_obj)
+    daily_stat = await daily_stats_service.generate_daily_stats(current_user.id, date_obj)
     
     if not daily_stat:
         raise HTTPException(
@@ -61,7 +61,7 @@ async def generate_daily_stats(
         )
     
     daily_stats_service = DailyStatsService(db)
-    result = daily_stats_service.generate_daily_stats(current_user.id, date_obj)
+    result = await daily_stats_service.generate_daily_stats(current_user.id, date_obj)
     
     if not result:
         raise HTTPException(
@@ -80,7 +80,7 @@ async def get_calendar_month(
     year: int,
     month: int,
     current_user: User = Depends(get_current_user),
-    db: Session = Depends(get_db)
+    db: Session = Depends(get_read_db)
 ):
     """
     Получить данные календаря за месяц
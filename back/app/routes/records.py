@@ -1,16 +1,28 @@
-from fastapi import APIRouter, Depends, HTTPException, status, Query, UploadFile, File, Body, Form
+from fastapi import APIRouter, BackgroundTasks, Depends, HTTPException, Request, status, Query, Body
+from fastapi.responses import StreamingResponse
 from sqlalchemy.orm import Session
-from datetime import datetime
+from datetime import datetime, timedelta, timezone
 from typing import Any, Dict, List, Optional
-import uuid
 import os
 
+from ..config import settings
 from ..database import get_db
-from ..auth import get_current_user
+from ..metrics import track_stage
+from ..auth import get_current_user, get_read_db, pin_to_primary
 from ..models.user import User
 from ..schemas.record import RecordCreate, RecordUpdate, RecordResponse
 from ..schemas.common import Message
+from ..schemas.processing_job import ProcessingJobAccepted, ProcessingJobResponse
+from ..models.processing_job import JobStatus
 from services.record_service import RecordService
+from services.job_service import ProcessingJobService
+from services.admission import inline_admission, ensure_queue_capacity
+from services.job_events import job_event_stream
+from services.worker import run_job_inline
+from services.utils.file_utils import UploadTooLargeError
+from services.utils.multipart_upload import (
+    receive_multipart_upload, MultipartUploadError, UploadContentTypeError
+)
 
 router = APIRouter(prefix="/records", tags=["records"])
 
@@ -22,7 +34,7 @@ async def get_user_records(
     start_date: Optional[datetime] = Query(None, description="Start date for filtering"),
     end_date: Optional[datetime] = Query(None, description="End date for filtering"),
     current_user: User = Depends(get_current_user),
-    db: Session = Depends(get_db)
+    db: Session = Depends(get_read_db)
 ):
     record_service = RecordService(db)
     
@@ -40,7 +52,7 @@ async def get_user_records(
 @router.get("/stats", response_model=dict)
 async def get_records_stats(
     current_user: User = Depends(get_current_user),
-    db: Session = Depends(get_db)
+    db: Session = Depends(get_read_db)
 ):
     record_service = RecordService(db)
     stats = record_service.get_user_records_stats(current_user.id)
@@ -51,7 +63,7 @@ async def get_records_stats(
 async def get_emotion_timeline(
     days: int = Query(30, ge=1, le=365, description="Number of days to include"),
     current_user: User = Depends(get_current_user),
-    db: Session = Depends(get_db)
+    db: Session = Depends(get_read_db)
 ):
     """
     Get emotion timeline for the specified number of days.
@@ -74,51 +86,199 @@ async def get_recording_limits(
     
     return limit_info
 
-@router.post("/upload", response_model=RecordResponse, status_code=status.HTTP_201_CREATED)
+# Тело загрузки читается вручную (см. upload_audio_recording), поэтому схему описываем явно
+_UPLOAD_OPENAPI = {
+    "requestBody": {
+        "required": True,
+        "content": {
+            "multipart/form-data": {
+                "schema": {
+                    "type": "object",
+                    "required": ["file"],
+                    "properties": {
+                        "file": {"type": "string", "format": "binary"},
+                        "duration": {"type": "number", "default": 0.0}
+                    }
+                }
+            }
+        }
+    }
+}
+
+# Запас на границы и заголовки частей multipart сверх MAX_UPLOAD_BYTES
+_MULTIPART_OVERHEAD_BYTES = 64 * 1024
+
+
+@router.post(
+    "/upload",
+    response_model=ProcessingJobAccepted,
+    status_code=status.HTTP_202_ACCEPTED,
+    openapi_extra=_UPLOAD_OPENAPI
+)
 async def upload_audio_recording(
-    file: UploadFile = File(...),
-    duration: float = Form(0.0),
+    request: Request,
+    background_tasks: BackgroundTasks,
     current_user: User = Depends(get_current_user),
     db: Session = Depends(get_db)
-):    
-    if not file.content_type.startswith('audio/'):
+):
+    """
+    Принимает аудио (multipart: file, duration) и ставит его в обработку.
+    Результат доступен через GET /records/jobs/{job_id}.
+
+    file и duration не объявлены параметрами: FastAPI читает тело раньше
+    зависимостей. Авторизация, дневной лимит и допуск на обработку
+    проверяются до чтения тела, по заголовкам. Content-Length отсекает
+    заведомо большие загрузки сразу, а chunked-загрузки без него
+    обрываются, как только файл превысит MAX_UPLOAD_BYTES.
+    """
+    content_length = request.headers.get("content-length")
+    if content_length and content_length.isdigit() and \
+            int(content_length) > settings.MAX_UPLOAD_BYTES + _MULTIPART_OVERHEAD_BYTES:
+        raise HTTPException(
+            status_code=status.HTTP_413_REQUEST_ENTITY_TOO_LARGE,
+            detail=f"File is too large. Maximum size is {settings.MAX_UPLOAD_BYTES} bytes"
+        )
+
+    record_service = RecordService(db)
+    job_service = ProcessingJobService(db)
+    record_service.ensure_can_create_record(
+        current_user.id,
+        pending_records=job_service.count_active_jobs(current_user.id)
+    )
+
+    if settings.JOB_QUEUE_INLINE:
+        inline_admission.admit()
+    else:
+        ensure_queue_capacity(db)
+
+    upload = None
+    try:
+        with track_stage("body_read"):
+            os.makedirs(settings.AUDIO_PROCESSING_DIR, exist_ok=True)
+
+            # Тело разбирается по мере приёма: файл сразу пишется в папку обработки,
+            # лимит размера и SHA-256 проверяются по каждому чанку
+            upload = await receive_multipart_upload(
+                request.stream(),
+                request.headers.get("content-type"),
+                dest_dir=settings.AUDIO_PROCESSING_DIR,
+                max_bytes=settings.MAX_UPLOAD_BYTES,
+                file_field="file",
+                content_type_prefix="audio/",
+                buffer_size=settings.UPLOAD_CHUNK_SIZE
+            )
+            try:
+                duration = float(upload.fields.get("duration") or 0.0)
+            except ValueError:
+                raise HTTPException(
+                    status_code=status.HTTP_422_UNPROCESSABLE_ENTITY,
+                    detail="Field 'duration' must be a number"
+                )
+
+        record_name = f"Recording_{datetime.now().strftime('%Y-%m-%d %H:%M')}"
+
+        job = job_service.enqueue_audio_job(
+            user_id=current_user.id,
+            audio_path=upload.path,  # Файл удаляется после обработки задачи
+            record_name=record_name,
+            duration=duration,
+            audio_sha256=upload.sha256,
+            audio_size=upload.size
+        )
+
+    except UploadTooLargeError as e:
+        if settings.JOB_QUEUE_INLINE:
+            inline_admission.release()
+        raise HTTPException(
+            status_code=status.HTTP_413_REQUEST_ENTITY_TOO_LARGE,
+            detail=f"File is too large. Maximum size is {e.max_bytes} bytes"
+        )
+
+    except UploadContentTypeError:
+        if settings.JOB_QUEUE_INLINE:
+            inline_admission.release()
         raise HTTPException(
             status_code=status.HTTP_400_BAD_REQUEST,
             detail="File must be an audio file"
         )
+
+    except MultipartUploadError as e:
+        if settings.JOB_QUEUE_INLINE:
+            inline_admission.release()
+        raise HTTPException(
+            status_code=status.HTTP_422_UNPROCESSABLE_ENTITY,
+            detail=str(e)
+        )
+
+    except Exception:
+        if settings.JOB_QUEUE_INLINE:
+            inline_admission.release()
+        if upload and os.path.exists(upload.path):
+            os.remove(upload.path)
+        raise
+
+    if settings.JOB_QUEUE_INLINE:
+        # Место в очереди освободит задача, когда закончит анализ
+        background_tasks.add_task(run_job_inline, job.id, admitted=True)
+
+    return job
+
+@router.get("/jobs/{job_id}", response_model=ProcessingJobResponse)
+async def get_processing_job(
+    job_id: int,
+    request: Request,
+    current_user: User = Depends(get_current_user),
+    db: Session = Depends(get_db)
+):
+    """
+    Состояние обработки загруженной записи.
+
+    Запись и статистика задачи пишутся на primary; пока реплика может
+    отставать, клиент, увидевший готовую задачу, читает с primary.
+    """
+    job_service = ProcessingJobService(db)
     
-    current_dir = os.path.dirname(os.path.abspath(__file__))
-    project_root = os.path.dirname(os.path.dirname(current_dir))
-    processing_dir = os.path.join(project_root, "audio_processing")
-    os.makedirs(processing_dir, exist_ok=True)
+    job = job_service.get_user_job(current_user.id, job_id)
+    if not job:
+        raise HTTPException(
+            status_code=status.HTTP_404_NOT_FOUND,
+            detail="Job not found"
+        )
+
+    if job.status == JobStatus.COMPLETED and job.updated_at:
+        updated_at = job.updated_at
+        if updated_at.tzinfo is None:
+            updated_at = updated_at.replace(tzinfo=timezone.utc)
+        pin_until = updated_at + timedelta(seconds=settings.DB_READ_YOUR_WRITES_SECONDS)
+        if pin_until > datetime.now(timezone.utc):
+            pin_to_primary(request, until=pin_until.timestamp())
     
-    # Сохраняем файл в папку обработки
-    file_extension = os.path.splitext(file.filename)[1] or '.wav'
-    filename = f"audio_{uuid.uuid4()}{file_extension}"
-    filepath = os.path.join(processing_dir, filename)
+    return job
+
+@router.get("/jobs/{job_id}/events")
+async def stream_processing_job(
+    job_id: int,
+    current_user: User = Depends(get_current_user),
+    db: Session = Depends(get_db)
+):
+    """
+    Ход обработки в виде Server-Sent Events: этапы, саммари по мере генерации
+    и итоговая запись.
+    """
+    job_service = ProcessingJobService(db)
     
-    try:
-        # Сохраняем файл в папку обработки
-        with open(filepath, "wb") as buffer:
-            content = await file.read()
-            buffer.write(content)
-                
-        record_name = f"Recording_{datetime.now().strftime('%Y-%m-%d %H:%M')}"
-        
-        # Передаем обработку в сервис
-        record_service = RecordService(db)
-        record = record_service.process_and_create_record(
-            user_id=current_user.id,
-            audio_file_path=filepath,  # Сервис сам удалит файл после обработки
-            record_name=record_name,
-            duration=duration
+    job = job_service.get_user_job(current_user.id, job_id)
+    if not job:
+        raise HTTPException(
+            status_code=status.HTTP_404_NOT_FOUND,
+            detail="Job not found"
         )
-        
-        return record
     
-    finally:
-        if os.path.exists(filepath):
-            os.remove(filepath)
+    return StreamingResponse(
+        job_event_stream(job.id),
+        media_type="text/event-stream",
+        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"}
+    )
 
 @router.post("/", response_model=RecordResponse, status_code=status.HTTP_201_CREATED)
 async def create_record(
@@ -127,7 +287,7 @@ async def create_record(
     db: Session = Depends(get_db)
 ):
     record_service = RecordService(db)
-    record = record_service.create_record(current_user.id, record_data)
+    record = await record_service.create_record(current_user.id, record_data)
     
     return record
 
@@ -135,7 +295,7 @@ async def create_record(
 async def get_record(
     record_id: int,
     current_user: User = Depends(get_current_user),
-    db: Session = Depends(get_db)
+    db: Session = Depends(get_read_db)
 ):
     record_service = RecordService(db)
     
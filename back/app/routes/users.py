@@ -3,7 +3,7 @@ from sqlalchemy.orm import Session
 from typing import List
 
 from ..database import get_db
-from ..auth import get_current_user, get_current_session, logout_session, logout_all_sessions
+from ..auth import get_current_user, get_current_session, get_read_db, logout_session, logout_all_sessions
 from ..models.user import User
 from ..models.session import UserSession
 from ..schemas.user import UserResponse, UserUpdate, UserWithStats, SessionInfo
@@ -15,7 +15,7 @@ router = APIRouter(prefix="/users", tags=["users"])
 @router.get("/me", response_model=UserWithStats)
 async def get_current_user_info(
     current_user: User = Depends(get_current_user),
-    db: Session = Depends(get_db)
+    db: Session = Depends(get_read_db)
 ):
     user_service = UserService(db)
     return user_service.get_user_with_stats(current_user.id)
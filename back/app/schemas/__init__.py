@@ -3,6 +3,8 @@ from .record import RecordCreate, RecordUpdate, RecordResponse
 from .achievement import AchievementResponse
 from .common import Message
 from .daily_stats import DailyStatsResponse
+from .processing_job import ProcessingJobAccepted, ProcessingJobResponse
+from .analysis import AudioAnalysis
 
 __all__ = [
     "UserBase",
@@ -27,5 +29,8 @@ __all__ = [
     "TokenPayload",
     "LoginResponse",
     "LogoutResponse",
-    "DailyStatsResponse"
+    "DailyStatsResponse",
+    "ProcessingJobAccepted",
+    "ProcessingJobResponse",
+    "AudioAnalysis"
 ]
@@ -0,0 +1,27 @@
+from pydantic import BaseModel, Field, field_validator
+from typing import List, Literal
+
+Emotion = Literal["angry", "disgust", "fearful", "happy", "neutral", "sadness", "surprised"]
+
+class CopingStrategies(BaseModel):
+    effective: str = ""
+    ineffective: str = ""
+
+class AnalysisInsights(BaseModel):
+    emotional_dynamics: str = ""
+    key_triggers: List[str] = Field(default_factory=list)
+    physical_reaction: str = ""
+    coping_strategies: CopingStrategies = Field(default_factory=CopingStrategies)
+    support: str = ""
+    recommendations: List[str] = Field(default_factory=list)
+
+class AudioAnalysis(BaseModel):
+    """Ответ LLM в режиме одного запроса: саммари, эмоция и инсайты"""
+    summary: str = Field(min_length=1)
+    emotion: Emotion
+    insights: AnalysisInsights
+
+    @field_validator("emotion", mode="before")
+    @classmethod
+    def normalize_emotion(cls, value):
+        return value.strip().lower() if isinstance(value, str) else value
@@ -0,0 +1,24 @@
+from pydantic import BaseModel, ConfigDict
+from datetime import datetime
+from typing import Optional
+
+from .record import RecordResponse
+
+class ProcessingJobAccepted(BaseModel):
+    id: int
+    status: str
+    stage: str
+    created_at: datetime
+
+    model_config = ConfigDict(from_attributes=True)
+
+class ProcessingJobResponse(ProcessingJobAccepted):
+    record_id: Optional[int] = None
+    error: Optional[str] = None
+    # Для задачи в статусе pending - не раньше этого времени она будет выполнена (повтор или откладывание)
+    run_after: Optional[datetime] = None
+    partial_summary: Optional[str] = None
+    updated_at: datetime
+    record: Optional[RecordResponse] = None
+
+    model_config = ConfigDict(from_attributes=True)
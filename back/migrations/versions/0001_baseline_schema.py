@@ -0,0 +1,129 @@
+"""baseline schema
+
+Схема в том виде, в каком её создавал Base.metadata.create_all
+до появления миграций. На такой базе эту ревизию не выполняют, а отмечают
+(alembic stamp 0001) и затем выполняют alembic upgrade head.
+
+Revision ID: 0001
+Revises:
+Create Date: 2026-10-18 05:26:54.799834
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+revision = '0001'
+down_revision = None
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    op.create_table('achievements',
+    sa.Column('id', sa.Integer(), nullable=False),
+    sa.Column('title', sa.String(), nullable=False),
+    sa.Column('description', sa.Text(), nullable=False),
+    sa.Column('icon', sa.String(), nullable=False),
+    sa.Column('category', sa.String(), nullable=False),
+    sa.Column('category_icon', sa.String(), nullable=False),
+    sa.Column('rarity', sa.String(), nullable=False),
+    sa.Column('required_value', sa.Integer(), nullable=False),
+    sa.PrimaryKeyConstraint('id')
+    )
+    op.create_index(op.f('ix_achievements_id'), 'achievements', ['id'], unique=False)
+    op.create_table('users',
+    sa.Column('id', sa.Integer(), nullable=False),
+    sa.Column('username', sa.String(), nullable=False),
+    sa.Column('email', sa.String(), nullable=False),
+    sa.Column('hashed_password', sa.String(), nullable=False),
+    sa.Column('is_active', sa.Boolean(), nullable=True),
+    sa.Column('created_at', sa.DateTime(), nullable=True),
+    sa.Column('last_login', sa.DateTime(), nullable=True),
+    sa.Column('daily_records_used', sa.Integer(), nullable=False),
+    sa.Column('last_record_reset', sa.DateTime(timezone=True), nullable=True),
+    sa.Column('max_daily_records', sa.Integer(), nullable=False),
+    sa.PrimaryKeyConstraint('id')
+    )
+    op.create_index(op.f('ix_users_email'), 'users', ['email'], unique=True)
+    op.create_index(op.f('ix_users_id'), 'users', ['id'], unique=False)
+    op.create_index(op.f('ix_users_username'), 'users', ['username'], unique=True)
+    op.create_table('daily_stats',
+    sa.Column('id', sa.Integer(), nullable=False),
+    sa.Column('user_id', sa.Integer(), nullable=False),
+    sa.Column('date', sa.Date(), nullable=False),
+    sa.Column('dominant_emotion', sa.String(), nullable=True),
+    sa.Column('daily_summary', sa.Text(), nullable=True),
+    sa.Column('emotion_distribution', sa.JSON(), nullable=True),
+    sa.Column('records_count', sa.Integer(), nullable=True),
+    sa.Column('total_duration', sa.Float(), nullable=True),
+    sa.Column('created_at', sa.DateTime(), nullable=True),
+    sa.Column('updated_at', sa.DateTime(), nullable=True),
+    sa.ForeignKeyConstraint(['user_id'], ['users.id'], ),
+    sa.PrimaryKeyConstraint('id')
+    )
+    op.create_index(op.f('ix_daily_stats_date'), 'daily_stats', ['date'], unique=False)
+    op.create_index(op.f('ix_daily_stats_id'), 'daily_stats', ['id'], unique=False)
+    op.create_table('records',
+    sa.Column('id', sa.Integer(), nullable=False),
+    sa.Column('user_id', sa.Integer(), nullable=False),
+    sa.Column('name', sa.String(), nullable=False),
+    sa.Column('emotion', sa.String(), nullable=False),
+    sa.Column('summary', sa.String(), nullable=False),
+    sa.Column('feedback', sa.Integer(), nullable=True),
+    sa.Column('insights', sa.JSON(), nullable=True),
+    sa.Column('duration', sa.Float(), nullable=False),
+    sa.Column('created_at', sa.DateTime(), nullable=True),
+    sa.ForeignKeyConstraint(['user_id'], ['users.id'], ),
+    sa.PrimaryKeyConstraint('id')
+    )
+    op.create_index(op.f('ix_records_id'), 'records', ['id'], unique=False)
+    op.create_table('user_achievements',
+    sa.Column('id', sa.Integer(), nullable=False),
+    sa.Column('user_id', sa.Integer(), nullable=False),
+    sa.Column('achievement_id', sa.Integer(), nullable=False),
+    sa.Column('unlocked', sa.Boolean(), nullable=False),
+    sa.Column('progress', sa.Integer(), nullable=False),
+    sa.Column('date_unlocked', sa.DateTime(), nullable=True),
+    sa.ForeignKeyConstraint(['achievement_id'], ['achievements.id'], ),
+    sa.ForeignKeyConstraint(['user_id'], ['users.id'], ),
+    sa.PrimaryKeyConstraint('id')
+    )
+    op.create_index(op.f('ix_user_achievements_id'), 'user_achievements', ['id'], unique=False)
+    op.create_table('user_sessions',
+    sa.Column('id', sa.Integer(), nullable=False),
+    sa.Column('user_id', sa.Integer(), nullable=False),
+    sa.Column('session_token', sa.String(length=512), nullable=False),
+    sa.Column('refresh_token', sa.String(length=512), nullable=False),
+    sa.Column('user_agent', sa.Text(), nullable=True),
+    sa.Column('ip_address', sa.String(length=45), nullable=True),
+    sa.Column('expires_at', sa.DateTime(), nullable=False),
+    sa.Column('refresh_expires_at', sa.DateTime(), nullable=False),
+    sa.Column('is_active', sa.Boolean(), nullable=True),
+    sa.Column('created_at', sa.DateTime(), nullable=True),
+    sa.Column('last_used', sa.DateTime(), nullable=True),
+    sa.ForeignKeyConstraint(['user_id'], ['users.id'], ),
+    sa.PrimaryKeyConstraint('id')
+    )
+    op.create_index(op.f('ix_user_sessions_id'), 'user_sessions', ['id'], unique=False)
+    op.create_index(op.f('ix_user_sessions_refresh_token'), 'user_sessions', ['refresh_token'], unique=True)
+    op.create_index(op.f('ix_user_sessions_session_token'), 'user_sessions', ['session_token'], unique=True)
+
+
+def downgrade():
+    op.drop_index(op.f('ix_user_sessions_session_token'), table_name='user_sessions')
+    op.drop_index(op.f('ix_user_sessions_refresh_token'), table_name='user_sessions')
+    op.drop_index(op.f('ix_user_sessions_id'), table_name='user_sessions')
+    op.drop_table('user_sessions')
+    op.drop_index(op.f('ix_user_achievements_id'), table_name='user_achievements')
+    op.drop_table('user_achievements')
+    op.drop_index(op.f('ix_records_id'), table_name='records')
+    op.drop_table('records')
+    op.drop_index(op.f('ix_daily_stats_id'), table_name='daily_stats')
+    op.drop_index(op.f('ix_daily_stats_date'), table_name='daily_stats')
+    op.drop_table('daily_stats')
+    op.drop_index(op.f('ix_users_username'), table_name='users')
+    op.drop_index(op.f('ix_users_id'), table_name='users')
+    op.drop_index(op.f('ix_users_email'), table_name='users')
+    op.drop_table('users')
+    op.drop_index(op.f('ix_achievements_id'), table_name='achievements')
+    op.drop_table('achievements')
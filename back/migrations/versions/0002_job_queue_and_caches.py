@@ -0,0 +1,86 @@
+"""job queue and caches
+
+Таблицы, которые добавились вместе с очередью задач и кэшами:
+processing_jobs, audio_analysis_cache и llm_response_cache.
+
+Revision ID: 0002
+Revises: 0001
+Create Date: 2026-10-18 05:30:00.000000
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+revision = '0002'
+down_revision = '0001'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    op.create_table('audio_analysis_cache',
+    sa.Column('content_hash', sa.String(length=64), nullable=False),
+    sa.Column('transcript', sa.Text(), nullable=False),
+    sa.Column('summary', sa.Text(), nullable=False),
+    sa.Column('emotion', sa.String(), nullable=False),
+    sa.Column('insights', sa.JSON(), nullable=True),
+    sa.Column('duration', sa.Float(), nullable=True),
+    sa.Column('created_at', sa.DateTime(), nullable=True),
+    sa.Column('last_accessed_at', sa.DateTime(), nullable=True),
+    sa.Column('expires_at', sa.DateTime(), nullable=False),
+    sa.PrimaryKeyConstraint('content_hash')
+    )
+    op.create_index(op.f('ix_audio_analysis_cache_expires_at'), 'audio_analysis_cache', ['expires_at'], unique=False)
+    op.create_index(op.f('ix_audio_analysis_cache_last_accessed_at'), 'audio_analysis_cache', ['last_accessed_at'], unique=False)
+    op.create_table('llm_response_cache',
+    sa.Column('cache_key', sa.String(length=64), nullable=False),
+    sa.Column('model_uri', sa.String(), nullable=False),
+    sa.Column('response', sa.Text(), nullable=False),
+    sa.Column('created_at', sa.DateTime(), nullable=True),
+    sa.Column('expires_at', sa.DateTime(), nullable=False),
+    sa.PrimaryKeyConstraint('cache_key')
+    )
+    op.create_index(op.f('ix_llm_response_cache_expires_at'), 'llm_response_cache', ['expires_at'], unique=False)
+    op.create_table('processing_jobs',
+    sa.Column('id', sa.Integer(), nullable=False),
+    sa.Column('job_type', sa.String(), nullable=False),
+    sa.Column('user_id', sa.Integer(), nullable=False),
+    sa.Column('status', sa.String(), nullable=False),
+    sa.Column('stage', sa.String(), nullable=False),
+    sa.Column('payload', sa.JSON(), nullable=True),
+    sa.Column('audio_path', sa.String(), nullable=True),
+    sa.Column('audio_sha256', sa.String(length=64), nullable=True),
+    sa.Column('audio_size', sa.Integer(), nullable=True),
+    sa.Column('record_name', sa.String(), nullable=True),
+    sa.Column('duration', sa.Float(), nullable=False),
+    sa.Column('record_id', sa.Integer(), nullable=True),
+    sa.Column('error', sa.Text(), nullable=True),
+    sa.Column('partial_summary', sa.Text(), nullable=True),
+    sa.Column('attempts', sa.Integer(), nullable=False),
+    sa.Column('max_attempts', sa.Integer(), nullable=False),
+    sa.Column('run_after', sa.DateTime(), nullable=False),
+    sa.Column('locked_by', sa.String(), nullable=True),
+    sa.Column('locked_until', sa.DateTime(), nullable=True),
+    sa.Column('created_at', sa.DateTime(), nullable=True),
+    sa.Column('updated_at', sa.DateTime(), nullable=True),
+    sa.ForeignKeyConstraint(['record_id'], ['records.id'], ondelete='SET NULL'),
+    sa.ForeignKeyConstraint(['user_id'], ['users.id'], ),
+    sa.PrimaryKeyConstraint('id')
+    )
+    op.create_index(op.f('ix_processing_jobs_id'), 'processing_jobs', ['id'], unique=False)
+    op.create_index(op.f('ix_processing_jobs_run_after'), 'processing_jobs', ['run_after'], unique=False)
+    op.create_index(op.f('ix_processing_jobs_user_id'), 'processing_jobs', ['user_id'], unique=False)
+
+
+
+
+def downgrade():
+    op.drop_index(op.f('ix_processing_jobs_user_id'), table_name='processing_jobs')
+    op.drop_index(op.f('ix_processing_jobs_run_after'), table_name='processing_jobs')
+    op.drop_index(op.f('ix_processing_jobs_id'), table_name='processing_jobs')
+    op.drop_table('processing_jobs')
+    op.drop_index(op.f('ix_llm_response_cache_expires_at'), table_name='llm_response_cache')
+    op.drop_table('llm_response_cache')
+    op.drop_index(op.f('ix_audio_analysis_cache_last_accessed_at'), table_name='audio_analysis_cache')
+    op.drop_index(op.f('ix_audio_analysis_cache_expires_at'), table_name='audio_analysis_cache')
+    op.drop_table('audio_analysis_cache')
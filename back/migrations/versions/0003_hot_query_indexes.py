@@ -0,0 +1,104 @@
+"""hot query indexes
+
+Составные индексы для самых частых фильтров и уникальность
+daily_stats(user_id, date) и user_achievements(user_id, achievement_id).
+
+В PostgreSQL индексы строятся CREATE INDEX CONCURRENTLY, вне транзакции:
+таблицы не блокируются на запись. Уникальное ограничение добавляется
+поверх готового уникального индекса (ADD CONSTRAINT ... USING INDEX).
+Перед этим удаляются дубликаты, которые могли появиться без ограничения.
+
+Revision ID: 0003
+Revises: 0002
+Create Date: 2026-10-18 05:40:00.000000
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+revision = '0003'
+down_revision = '0002'
+branch_labels = None
+depends_on = None
+
+INDEXES = (
+    ("ix_records_user_id_created_at", "records", ["user_id", "created_at"]),
+    ("ix_records_user_id_emotion", "records", ["user_id", "emotion"]),
+    ("ix_user_sessions_user_id_is_active", "user_sessions", ["user_id", "is_active"]),
+)
+
+UNIQUE_CONSTRAINTS = (
+    ("uq_daily_stats_user_id_date", "daily_stats", ["user_id", "date"]),
+    ("uq_user_achievements_user_id_achievement_id", "user_achievements", ["user_id", "achievement_id"]),
+)
+
+# Из дубликатов остаётся самая свежая статистика за день
+# и самый продвинутый прогресс достижения
+DEDUPLICATE = (
+    """
+    DELETE FROM daily_stats WHERE id IN (
+        SELECT id FROM (
+            SELECT id, ROW_NUMBER() OVER (
+                PARTITION BY user_id, date ORDER BY updated_at DESC NULLS LAST, id DESC
+            ) AS rn
+            FROM daily_stats
+        ) ranked WHERE rn > 1
+    )
+    """,
+    """
+    DELETE FROM user_achievements WHERE id IN (
+        SELECT id FROM (
+            SELECT id, ROW_NUMBER() OVER (
+                PARTITION BY user_id, achievement_id ORDER BY unlocked DESC, progress DESC, id
+            ) AS rn
+            FROM user_achievements
+        ) ranked WHERE rn > 1
+    )
+    """,
+)
+
+
+def _is_postgresql() -> bool:
+    return op.get_context().dialect.name == "postgresql"
+
+
+def upgrade():
+    for statement in DEDUPLICATE:
+        op.execute(sa.text(statement))
+
+    if not _is_postgresql():
+        for name, table, columns in INDEXES:
+            op.create_index(name, table, columns)
+        for name, table, columns in UNIQUE_CONSTRAINTS:
+            with op.batch_alter_table(table) as batch_op:
+                batch_op.create_unique_constraint(name, columns)
+        return
+
+    # autocommit_block сначала фиксирует удаление дубликатов
+    with op.get_context().autocommit_block():
+        for unique, indexes in ((False, INDEXES), (True, UNIQUE_CONSTRAINTS)):
+            for name, table, columns in indexes:
+                # После прерванного CONCURRENTLY остаётся невалидный индекс - пересоздаём
+                op.drop_index(name, table_name=table, postgresql_concurrently=True, if_exists=True)
+                op.create_index(name, table, columns, unique=unique, postgresql_concurrently=True)
+    for name, table, _ in UNIQUE_CONSTRAINTS:
+        # Индекс уже построен, ограничение только ссылается на него - блокировка короткая
+        op.execute(sa.text(f"ALTER TABLE {table} ADD CONSTRAINT {name} UNIQUE USING INDEX {name}"))
+
+
+def downgrade():
+    for name, table, _ in UNIQUE_CONSTRAINTS:
+        if _is_postgresql():
+            op.drop_constraint(name, table, type_="unique")
+        else:
+            with op.batch_alter_table(table) as batch_op:
+                batch_op.drop_constraint(name, type_="unique")
+
+    if not _is_postgresql():
+        for name, table, _ in INDEXES:
+            op.drop_index(name, table_name=table)
+        return
+
+    with op.get_context().autocommit_block():
+        for name, table, _ in INDEXES:
+            op.drop_index(name, table_name=table, postgresql_concurrently=True, if_exists=True)
@@ -0,0 +1,57 @@
+"""user scoped analysis cache
+
+Кэш анализа аудио привязан к пользователю: ключ - (user_id, content_hash).
+Раньше запись с тем же SHA-256 отдавала транскрипт и анализ любому
+пользователю. Владельца старых записей не узнать, а это только кэш,
+поэтому таблица создаётся заново.
+
+Revision ID: 0004
+Revises: 0003
+Create Date: 2026-10-18 09:10:00.000000
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+revision = '0004'
+down_revision = '0003'
+branch_labels = None
+depends_on = None
+
+
+def _drop_cache_table():
+    op.drop_index(op.f('ix_audio_analysis_cache_last_accessed_at'), table_name='audio_analysis_cache')
+    op.drop_index(op.f('ix_audio_analysis_cache_expires_at'), table_name='audio_analysis_cache')
+    op.drop_table('audio_analysis_cache')
+
+
+def _create_cache_table(*key_columns, foreign_keys=()):
+    op.create_table('audio_analysis_cache',
+    *key_columns,
+    sa.Column('transcript', sa.Text(), nullable=False),
+    sa.Column('summary', sa.Text(), nullable=False),
+    sa.Column('emotion', sa.String(), nullable=False),
+    sa.Column('insights', sa.JSON(), nullable=True),
+    sa.Column('duration', sa.Float(), nullable=True),
+    sa.Column('created_at', sa.DateTime(), nullable=True),
+    sa.Column('last_accessed_at', sa.DateTime(), nullable=True),
+    sa.Column('expires_at', sa.DateTime(), nullable=False),
+    *foreign_keys,
+    sa.PrimaryKeyConstraint(*(column.name for column in key_columns))
+    )
+    op.create_index(op.f('ix_audio_analysis_cache_expires_at'), 'audio_analysis_cache', ['expires_at'], unique=False)
+    op.create_index(op.f('ix_audio_analysis_cache_last_accessed_at'), 'audio_analysis_cache', ['last_accessed_at'], unique=False)
+
+
+def upgrade():
+    _drop_cache_table()
+    _create_cache_table(
+        sa.Column('user_id', sa.Integer(), nullable=False),
+        sa.Column('content_hash', sa.String(length=64), nullable=False),
+        foreign_keys=(sa.ForeignKeyConstraint(['user_id'], ['users.id']),)
+    )
+
+
+def downgrade():
+    _drop_cache_table()
+    _create_cache_table(sa.Column('content_hash', sa.String(length=64), nullable=False))
@@ -3,6 +3,7 @@ from .record_service import RecordService
 from .limit_service import RecordLimitService
 from .achievement_service import AchievementService
 from .daily_stats_service import DailyStatsService
+from .job_service import ProcessingJobService
 # from .competition_service import CompetitionService
 
 __all__ = [
@@ -11,5 +12,6 @@ __all__ = [
     "AchievementService",
     "CompetitionService",
     "RecordLimitService",
-    "DailyStatsService"
+    "DailyStatsService",
+    "ProcessingJobService"
 ]
\ No newline at end of file
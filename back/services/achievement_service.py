@@ -1,3 +1,4 @@
+from sqlalchemy.exc import IntegrityError
 from sqlalchemy.orm import Session
 from typing import List, Optional
 from app.models.achievement import Achievement
@@ -79,8 +80,21 @@ class AchievementService:
                 progress=0,
                 unlocked=False
             )
-            db.add(user_achievement)
-            db.flush()  # Получаем ID без коммита
+            try:
+                # Savepoint: при гонке откатывается только эта вставка
+                with db.begin_nested():
+                    db.add(user_achievement)
+                    db.flush()  # Получаем ID без коммита
+            except IntegrityError:
+                # Запись параллельно создал другой запрос (уникальность user_id + achievement_id)
+                user_achievement = (
+                    db.query(UserAchievement)
+                    .filter(
+                        UserAchievement.user_id == user_id,
+                        UserAchievement.achievement_id == achievement_id
+                    )
+                    .one()
+                )
         
         if not user_achievement.unlocked:
             user_achievement.progress += progress_increment
@@ -0,0 +1,143 @@
+"""
+Контроль допуска загрузок на обработку.
+
+В режиме JOB_QUEUE_INLINE анализ выполняется в процессе API: одновременно
+идёт не больше ADMISSION_MAX_IN_FLIGHT анализов, ещё ADMISSION_MAX_QUEUE
+ждут своей очереди. Если очередь заполнена, загрузка отклоняется с 503 и
+Retry-After ещё до чтения тела запроса: лучше быстро отказать части
+клиентов, чем замедлить всех.
+
+Когда задачи выполняют отдельные воркеры, ограничивается длина очереди
+в таблице processing_jobs (ADMISSION_MAX_QUEUED_JOBS).
+"""
+import asyncio
+import logging
+import math
+import threading
+import time
+from contextlib import asynccontextmanager
+from typing import Any, Dict, Optional
+
+from fastapi import HTTPException, status
+from sqlalchemy.orm import Session
+
+from app.config import settings
+from app.models.processing_job import ProcessingJob, JobStatus
+
+logger = logging.getLogger(__name__)
+
+
+def _overloaded(retry_after: float, reason: str) -> HTTPException:
+    return HTTPException(
+        status_code=status.HTTP_503_SERVICE_UNAVAILABLE,
+        detail={"error": "Server is busy, try again later", "reason": reason},
+        headers={"Retry-After": str(max(1, math.ceil(retry_after)))}
+    )
+
+
+class AdmissionController:
+    """
+    Допуск (admit) резервирует место в очереди, run() ждёт свободный слот
+    и освобождает место после анализа. Семафор создаётся в цикле событий API.
+    """
+
+    # Сглаживание оценки длительности анализа для Retry-After
+    _EWMA_ALPHA = 0.2
+
+    def __init__(self, max_in_flight: int, max_queue: int, default_retry_after: float):
+        self.max_in_flight = max_in_flight
+        self.max_queue = max_queue
+        self.default_retry_after = default_retry_after
+        self._lock = threading.Lock()
+        self._admitted = 0
+        self._running = 0
+        self._rejected = 0
+        self._avg_seconds: Optional[float] = None
+        self._slots: Optional[asyncio.Semaphore] = None
+
+    @property
+    def capacity(self) -> int:
+        return self.max_in_flight + self.max_queue
+
+    def retry_after(self) -> float:
+        """Примерное время, через которое освободится место в очереди"""
+        with self._lock:
+            avg = self._avg_seconds
+            queued = max(0, self._admitted - self._running)
+        if avg is None:
+            return self.default_retry_after
+        return avg * (queued / self.max_in_flight + 1)
+
+    def admit(self):
+        """Резервирует место или бросает HTTPException 503 с Retry-After"""
+        with self._lock:
+            if self._admitted < self.capacity:
+                self._admitted += 1
+                return
+            self._rejected += 1
+        logger.warning(f"Upload rejected: {self.capacity} analyses already admitted")
+        raise _overloaded(self.retry_after(), "analysis queue is full")
+
+    def try_admit(self, limit: Optional[int] = None) -> bool:
+        """
+        Резервирует место без исключения, если занято меньше limit мест
+        (по умолчанию - вся ёмкость). Для задач, которые процесс подбирает сам.
+        """
+        with self._lock:
+            if self._admitted < (self.capacity if limit is None else limit):
+                self._admitted += 1
+                return True
+            return False
+
+    def release(self):
+        """Место, которое так и не дошло до run() (например, задачу не удалось создать)"""
+        with self._lock:
+            self._admitted -= 1
+
+    @asynccontextmanager
+    async def run(self):
+        if self._slots is None:
+            self._slots = asyncio.Semaphore(self.max_in_flight)
+
+        try:
+            async with self._slots:
+                with self._lock:
+                    self._running += 1
+                started = time.monotonic()
+                try:
+                    yield
+                finally:
+                    elapsed = time.monotonic() - started
+                    with self._lock:
+                        self._running -= 1
+                        self._avg_seconds = elapsed if self._avg_seconds is None else (
+                            self._EWMA_ALPHA * elapsed + (1 - self._EWMA_ALPHA) * self._avg_seconds
+                        )
+        finally:
+            self.release()
+
+    def stats(self) -> Dict[str, Any]:
+        with self._lock:
+            return {
+                "max_in_flight": self.max_in_flight,
+                "max_queue": self.max_queue,
+                "running": self._running,
+                "queued": self._admitted - self._running,
+                "rejected": self._rejected,
+                "avg_seconds": round(self._avg_seconds, 2) if self._avg_seconds is not None else None
+            }
+
+
+inline_admission = AdmissionController(
+    max_in_flight=settings.ADMISSION_MAX_IN_FLIGHT,
+    max_queue=settings.ADMISSION_MAX_QUEUE,
+    default_retry_after=settings.ADMISSION_RETRY_AFTER_SECONDS
+)
+
+
+def ensure_queue_capacity(db: Session):
+    """Режим с отдельными воркерами: не принимаем, если очередь задач слишком длинная"""
+    queued = db.query(ProcessingJob).filter(ProcessingJob.status == JobStatus.PENDING).count()
+    if queued >= settings.ADMISSION_MAX_QUEUED_JOBS:
+        logger.warning(f"Upload rejected: {queued} jobs pending")
+        raise _overloaded(settings.ADMISSION_RETRY_AFTER_SECONDS, "job queue is full")
@@ -0,0 +1,88 @@
+from sqlalchemy import tuple_
+from sqlalchemy.orm import Session
+from datetime import datetime, timezone, timedelta
+from typing import Any, Dict, Optional
+import logging
+
+from app.config import settings
+from app.models.audio_analysis_cache import AudioAnalysisCache
+
+logger = logging.getLogger(__name__)
+
+
+class AudioAnalysisCacheService:
+    """
+    Кэш транскрипта и анализа, адресуемый по пользователю и SHA-256 аудио.
+    Повторная загрузка той же записи не вызывает ни распознавание, ни LLM.
+    Записи других пользователей не используются: совпадение хеша не должно
+    раскрывать содержимое чужой записи.
+    """
+
+    def __init__(self, db: Session):
+        self.db = db
+
+    def get(self, user_id: int, content_hash: str) -> Optional[Dict[str, Any]]:
+        now = datetime.now(timezone.utc)
+        entry = self.db.query(AudioAnalysisCache).filter(
+            AudioAnalysisCache.user_id == user_id,
+            AudioAnalysisCache.content_hash == content_hash,
+            AudioAnalysisCache.expires_at > now
+        ).first()
+
+        if not entry:
+            return None
+
+        entry.last_accessed_at = now
+        self.db.commit()
+
+        logger.info(f"Analysis cache hit for user {user_id}: {content_hash}")
+        return {
+            "transcript": entry.transcript,
+            "duration": entry.duration,
+            "summary": entry.summary,
+            "emotion": entry.emotion,
+            "insights": entry.insights
+        }
+
+    def put(self, user_id: int, content_hash: str, result: Dict[str, Any]):
+        now = datetime.now(timezone.utc)
+        try:
+            entry = self.db.get(AudioAnalysisCache, (user_id, content_hash))
+            if not entry:
+                entry = AudioAnalysisCache(user_id=user_id, content_hash=content_hash)
+                self.db.add(entry)
+
+            entry.transcript = result["transcript"]
+            entry.duration = result.get("duration")
+            entry.summary = result["summary"]
+            entry.emotion = result["emotion"]
+            entry.insights = result["insights"]
+            entry.created_at = now
+            entry.last_accessed_at = now
+            entry.expires_at = now + timedelta(seconds=settings.ANALYSIS_CACHE_TTL_SECONDS)
+            self.db.commit()
+
+            self.evict()
+
+        except Exception as e:
+            self.db.rollback()
+            logger.error(f"Error storing analysis cache entry {content_hash} for user {user_id}: {str(e)}")
+
+    def evict(self):
+        """Удаляет просроченные записи и самые давно использованные сверх лимита"""
+        now = datetime.now(timezone.utc)
+        self.db.query(AudioAnalysisCache).filter(
+            AudioAnalysisCache.expires_at <= now
+        ).delete(synchronize_session=False)
+
+        overflow = self.db.query(AudioAnalysisCache).count() - settings.ANALYSIS_CACHE_MAX_ENTRIES
+        if overflow > 0:
+            stale = self.db.query(AudioAnalysisCache.user_id, AudioAnalysisCache.content_hash).order_by(
+                AudioAnalysisCache.last_accessed_at
+            ).limit(overflow).subquery()
+            self.db.query(AudioAnalysisCache).filter(
+                tuple_(AudioAnalysisCache.user_id, AudioAnalysisCache.content_hash).in_(stale.select())
+            ).delete(synchronize_session=False)
+            logger.info(f"Evicted {overflow} analysis cache entries")
+
+        self.db.commit()
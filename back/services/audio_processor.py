@@ -1,13 +1,22 @@
-import json
+import asyncio
 import logging
-import subprocess
-from typing import Dict, Any
+from typing import Awaitable, Callable, Dict, Any, List, Optional, Tuple
 import os
-import subprocess
 
+from app.config import settings
+from app.metrics import AUDIO_PREPARE_TOTAL, track_stage
+from app.models.processing_job import JobStage
+from app.schemas.analysis import AudioAnalysis
+from pydantic import ValidationError
 from .stt_service import transcribe_audio
-from .gpt_service import call_gpt
-from .utils.iam_token import get_iam_token
+from .gpt_service import call_gpt, stream_gpt
+from .transcoder import encode_ogg_opus, decode_pcm, pcm_input_args, remux_ogg_opus
+from .utils.audio_format import AudioFormat, sniff_file
+from .utils.ogg_parser import inspect_ogg_opus, InvalidOggError, OggOpusInfo
+from .utils.resilience import DependencyUnavailableError
+from .utils.vad import trim_silence, find_pauses, plan_segments, SilentAudioError, VadResult
+from .utils.iam_token import get_iam_token_async
+from .utils.json_repair import parse_llm_json
 
 logger = logging.getLogger(__name__)
 
@@ -44,152 +53,350 @@ class AudioProcessor:
     recommendations: Предложи 3–5 конкретных и практических рекомендаций, которые могут помочь улучшить эмоциональное состояние или решить проблему. Рекомендации должны быть добрыми и направленными на заботу о себе.
 
 Если информации недостаточно для заполнения поля — оставь его пустым. Избегай домыслов."""
+        self.combined_prompt = self.insight_prompt.replace(
+            '{\n  "emotion": "",',
+            '{\n  "summary": "",\n  "emotion": "",'
+        ) + """
+
+В поле summary: """ + self.summary_prompt + """
+
+Верни только JSON-объект, без пояснений и без markdown."""
+        self.json_retry_hint = """
+
+Предыдущий ответ не был корректным JSON. Строго соблюдай структуру и верни только JSON-объект."""
 
     def _file_exists(self, audio_path: str) -> bool:
         exists = os.path.exists(audio_path)
         return exists
 
     @staticmethod
-    def wav_to_ogg_opus(input_path: str, output_path: str, logger, bitrate="64k"):
+    def to_ogg_opus(input_path: str, bitrate: str = "64k") -> bytes:
+        """
+        Кодирует файл в OGG Opus через пул ffmpeg. Файл подаётся в stdin,
+        результат возвращается байтами без записи на диск.
+        """
         if not os.path.isfile(input_path):
             logger.error(f"Input file does not exist: {input_path}")
             raise FileNotFoundError(f"Input file not found: {input_path}")
 
-        # Проверяем, что входной и выходной файлы разные
-        if os.path.abspath(input_path) == os.path.abspath(output_path):
-            logger.error("Input and output paths are the same")
-            raise ValueError("Input and output paths must be different")
-
-        # Удаляем существующий выходной файл только если он отличается от входного
-        if os.path.exists(output_path) and os.path.abspath(input_path) != os.path.abspath(output_path):
-            os.remove(output_path)
-            logger.info(f"Removed existing output file: {output_path}")
-
-        logger.info(f"Starting conversion WAV → OGG Opus")
-
-        cmd = [
-            "ffmpeg", "-y",
-            "-i", input_path,
-            "-c:a", "libopus",
-            "-b:a", bitrate,
-            "-application", "voip",
-            "-frame_duration", "60",
-            output_path
-        ]
-
-        try:
-            result = subprocess.run(
-                cmd,
-                stdout=subprocess.PIPE,
-                stderr=subprocess.PIPE,
-                text=True,
-                check=True
-            )
-
-        except subprocess.CalledProcessError as e:
-            logger.error("ffmpeg conversion failed")
-            logger.error(f"Return code: {e.returncode}")
-            logger.error(f"Command: {' '.join(cmd)}")
-            raise
-
-        logger.info(f"Conversion finished successfully: {output_path}")
-        return True
+        logger.info(f"Starting conversion → OGG Opus")
+        audio_data = encode_ogg_opus(input_path=input_path, bitrate=bitrate)
+        logger.info(f"Conversion finished successfully: {len(audio_data)} bytes")
+        return audio_data
 
     @staticmethod
-    def is_valid_ogg_opus(path: str) -> bool:
+    def probe_ogg_opus(source) -> Optional[OggOpusInfo]:
         """
-        Проверяет корректность OGG Opus без ffprobe.
+        Проверяет OGG Opus (страницы, CRC, заголовки) и возвращает параметры потока.
+        Принимает байты или открытый бинарный файл; читаются только нужные страницы.
         """
-        if not os.path.isfile(path):
-            return False
-
         try:
-            with open(path, "rb") as f:
-                data = f.read()
+            return inspect_ogg_opus(source)
+        except InvalidOggError as e:
+            logger.error(f"Invalid OGG Opus: {str(e)}")
+            return None
+
+    @classmethod
+    def _load_ogg(cls, audio_path: str):
+        """Проверяет существующий OGG файл до чтения целиком"""
+        with open(audio_path, "rb") as f:
+            ogg_info = cls.probe_ogg_opus(f)
+            if not ogg_info:
+                return None, None
+            f.seek(0)
+            return f.read(), ogg_info
+
+    @classmethod
+    def _load_opus(cls, audio_path: str, audio_format: AudioFormat) -> Tuple[Optional[bytes], Optional[OggOpusInfo], str]:
+        """
+        Opus в OGG без перекодирования: OGG Opus - как есть, Opus в другом
+        контейнере (WebM из браузера) - переупаковка. Третий элемент - способ
+        (copy или remux) для AUDIO_PREPARE_TOTAL.
+        """
+        if audio_format.container == "ogg":
+            audio_data, ogg_info = cls._load_ogg(audio_path)
+            return audio_data, ogg_info, "copy"
 
-            if len(data) < 100:
-                return False
+        audio_data = remux_ogg_opus(input_path=audio_path)
+        logger.info(f"Remuxed {audio_format.container}/opus to OGG without re-encoding")
+        return audio_data, cls.probe_ogg_opus(audio_data), "remux"
 
-            if not data.startswith(b"OggS"):
-                return False
+    @classmethod
+    def _load_untrimmed(cls, audio_path: str, audio_format: AudioFormat):
+        """
+        Запись целиком в OGG Opus самым дешёвым способом: Opus - без
+        перекодирования (см. _load_opus), остальное (PCM, MP3, ...) - кодирование.
+        """
+        if audio_format.is_opus:
+            audio_data, ogg_info, path = cls._load_opus(audio_path, audio_format)
+            AUDIO_PREPARE_TOTAL.labels(container=audio_format.container, path=path).inc()
+            return audio_data, ogg_info
 
-            if b"OpusHead" not in data:
-                return False
+        AUDIO_PREPARE_TOTAL.labels(container=audio_format.container, path="encode").inc()
+        audio_data = cls.to_ogg_opus(audio_path)
+        return audio_data, cls.probe_ogg_opus(audio_data)
 
-            if b"OpusTags" not in data:
-                return False
+    @classmethod
+    def _load_trimmed(cls, audio_path: str, audio_format: AudioFormat):
+        """
+        Декодирует запись в PCM, вырезает тишину и кодирует в OGG Opus только речь.
+        Если речи нет - SilentAudioError, до любых сетевых запросов.
+        Opus сначала переупаковывается без перекодирования, и VAD работает по
+        этому потоку. Если тишины меньше VAD_MIN_TRIM_RATIO, в распознавание
+        уходит он же: кодирование окупается, только когда вырезать есть что.
+        """
+        sample_rate = settings.VAD_SAMPLE_RATE
+        opus = cls._load_opus(audio_path, audio_format) if audio_format.is_opus else None
+        if opus and opus[1]:
+            pcm = decode_pcm(input_data=opus[0], sample_rate=sample_rate)
+        else:
+            opus = None
+            pcm = decode_pcm(input_path=audio_path, sample_rate=sample_rate)
+
+        vad: VadResult = trim_silence(
+            pcm,
+            sample_rate=sample_rate,
+            frame_ms=settings.VAD_FRAME_MS,
+            padding_ms=settings.VAD_PADDING_MS,
+            max_pause_ms=settings.VAD_MAX_PAUSE_MS,
+            min_speech_ms=settings.VAD_MIN_SPEECH_MS
+        )
+        logger.info(f"Silence trimmed: {vad.original_duration:.2f}s -> {vad.trimmed_duration:.2f}s")
+
+        if opus and vad.trimmed_duration >= vad.original_duration * (1 - settings.VAD_MIN_TRIM_RATIO):
+            audio_data, ogg_info, path = opus
+            AUDIO_PREPARE_TOTAL.labels(container=audio_format.container, path=path).inc()
+            untrimmed = VadResult(
+                pcm=pcm,
+                sample_rate=sample_rate,
+                original_duration=vad.original_duration,
+                trimmed_duration=vad.original_duration
+            )
+            return audio_data, ogg_info, untrimmed
 
-            return True
+        AUDIO_PREPARE_TOTAL.labels(container=audio_format.container, path="encode").inc()
+        audio_data = encode_ogg_opus(input_data=vad.pcm, input_args=pcm_input_args(sample_rate))
+        return audio_data, cls.probe_ogg_opus(audio_data), vad
 
-        except Exception:
-            return False
+    async def _split_for_transcription(self, audio_data: bytes, duration: float,
+                                       vad: Optional[VadResult]) -> Optional[List[Tuple[bytes, float]]]:
+        """
+        Режет длинную запись по паузам на части не длиннее STT_SEGMENT_MAX_SECONDS
+        и кодирует каждую в OGG Opus. None - если резать не нужно.
+        """
+        if not settings.STT_SPLIT_ENABLED or duration <= settings.STT_SEGMENT_MAX_SECONDS:
+            return None
+
+        sample_rate = settings.VAD_SAMPLE_RATE
+        pcm = vad.pcm if vad else await asyncio.to_thread(
+            decode_pcm, input_data=audio_data, sample_rate=sample_rate)
+
+        pauses = await asyncio.to_thread(
+            find_pauses, pcm, sample_rate, settings.VAD_FRAME_MS, settings.STT_SPLIT_MIN_PAUSE_MS)
+        bounds = plan_segments(
+            len(pcm) / 2 / sample_rate,
+            pauses,
+            settings.STT_SEGMENT_MAX_SECONDS,
+            settings.STT_SEGMENT_MIN_SECONDS
+        )
+
+        def encode(start: float, end: float) -> bytes:
+            chunk = pcm[int(start * sample_rate) * 2:int(end * sample_rate) * 2]
+            return encode_ogg_opus(input_data=chunk, input_args=pcm_input_args(sample_rate))
+
+        encoded = await asyncio.gather(*(asyncio.to_thread(encode, start, end) for start, end in bounds))
+        logger.info(f"Split {duration:.1f}s of audio into {len(bounds)} segments at pauses")
+        return [(data, end - start) for data, (start, end) in zip(encoded, bounds)]
+
+    async def process_audio(
+        self,
+        audio_path: str,
+        on_stage: Optional[Callable[[str], None]] = None,
+        on_partial: Optional[Callable[[str], None]] = None
+    ) -> Dict[str, Any]:
+        """
+        on_stage вызывается при переходе к очередному этапу обработки (см. JobStage),
+        on_partial - с текстом саммари по мере его генерации.
+        Сетевые вызовы ожидаются асинхронно, ffmpeg и чтение файла - в отдельном потоке.
+        """
+        def report(stage: str):
+            if on_stage:
+                on_stage(stage)
 
-    def process_audio(self, audio_path: str) -> Dict[str, Any]:
         try:
-            iam_token = get_iam_token()
-
             if not self._file_exists(audio_path):
                 logger.error(f"Audio file does not exist: {audio_path}")
                 return self._get_fallback_response()
 
-            # Определяем тип файла и обрабатываем соответственно
-            file_extension = os.path.splitext(audio_path)[1].lower()
-
-            if file_extension == '.wav':
-                # Конвертируем WAV в OGG
-                converted_path = audio_path.replace('.wav', '.ogg')
-
-                if os.path.exists(converted_path):
-                    os.remove(converted_path)
+            # Формат - по содержимому: расширение от браузера может не совпадать с ним
+            audio_format = await asyncio.to_thread(sniff_file, audio_path)
+            if not audio_format:
+                logger.error(f"Unsupported audio format: {audio_path}")
+                return self._get_fallback_response()
+            logger.info(f"Detected audio format: {audio_format.container}/{audio_format.codec or 'unknown'}")
 
-                self.wav_to_ogg_opus(audio_path, converted_path, logger)
+            report(JobStage.TRANSCODING)
 
-                # Проверяем результат конвертации
-                if self.is_valid_ogg_opus(converted_path):
-                    logger.info(
-                        f"Successfully converted WAV to OGG Opus: {converted_path}")
-                    audio_path = converted_path  # Используем конвертированный файл
+            vad = None
+            with track_stage("transcode"):
+                if settings.VAD_ENABLED:
+                    # В распознавание уходит только речь, без тишины по краям и длинных пауз
+                    audio_data, ogg_info, vad = await asyncio.to_thread(self._load_trimmed, audio_path, audio_format)
                 else:
-                    logger.error("Converted file is not valid OGG Opus")
-                    return self._get_fallback_response()
-
-            elif file_extension == '.ogg':
-                # Проверяем существующий OGG файл
-                if not self.is_valid_ogg_opus(audio_path):
-                    logger.error("Existing OGG file is not valid OGG Opus")
-                    return self._get_fallback_response()
-            else:
-                logger.error(f"Unsupported file format: {file_extension}")
+                    audio_data, ogg_info = await asyncio.to_thread(self._load_untrimmed, audio_path, audio_format)
+
+            if not ogg_info:
+                logger.error("Prepared audio is not valid OGG Opus")
                 return self._get_fallback_response()
 
+            with track_stage("iam_token"):
+                iam_token = await get_iam_token_async()
+
             # Транскрибация
+            report(JobStage.TRANSCRIBING)
+            logger.info(f"Audio duration: {ogg_info.duration:.2f}s")
             logger.info(f"Starting transcription for: {audio_path}")
-            transcript = transcribe_audio(iam_token, audio_path)
+            with track_stage("segment_split"):
+                segments = await self._split_for_transcription(audio_data, ogg_info.duration, vad)
+            transcript = await transcribe_audio(iam_token, audio_data, ogg_info.duration, segments=segments)
             logger.info(f"Transcript completed: {len(transcript)} characters")
 
             if not transcript or len(transcript.strip()) < 10:
                 logger.warning("Transcript too short or empty")
                 return self._get_fallback_response()
 
-            insights = call_gpt(
-                transcript, self.insight_prompt, "yandexgpt", iam_token)
-            summary = call_gpt(transcript, self.summary_prompt,
-                               "yandexgpt-lite", iam_token)
-            
-            if os.path.exists(audio_path):
-                os.remove(audio_path)
+            report(JobStage.ANALYSING)
+            analysis = await self._analyse_transcript(transcript, iam_token, on_partial)
+            if analysis is None:
+                return self._get_fallback_response()
 
             return {
                 "transcript": transcript,
-                "summary": summary,
-                "emotion": json.loads(insights)["emotion"],
-                "insights": json.loads(insights)["insights"]
+                # Длительность записи - исходная, а не после обрезки тишины
+                "duration": vad.original_duration if vad else ogg_info.duration,
+                "speech_duration": ogg_info.duration,
+                **analysis
             }
 
+        except SilentAudioError as e:
+            # Повтор и fallback-запись не нужны: в записи просто нет речи
+            logger.warning(f"Rejected silent audio {audio_path}: {str(e)}")
+            raise
+
+        except DependencyUnavailableError as e:
+            # Зависимость недоступна - задачу лучше отложить, чем сохранить запись-заглушку
+            logger.warning(f"Audio processing deferred: {str(e)}")
+            raise
+
         except Exception as e:
             logger.error(f"Error processing audio: {str(e)}")
             return self._get_fallback_response()
 
+    async def _analyse_transcript(
+        self,
+        transcript: str,
+        iam_token: str,
+        on_partial: Optional[Callable[[str], None]] = None
+    ) -> Optional[Dict[str, Any]]:
+        """
+        В режиме LLM_COMBINED_ANALYSIS - один запрос на всё.
+        Иначе инсайты и саммари независимы, поэтому запрашиваются параллельно.
+        Если один из вызовов упал, результат другого сохраняется, а вместо
+        упавшего подставляется fallback. None - если не удались оба.
+        """
+        if settings.LLM_COMBINED_ANALYSIS:
+            return await self._analyse_transcript_combined(transcript, iam_token)
+
+        calls = [
+            asyncio.ensure_future(self._collect_llm_result(
+                call_gpt(transcript, self.insight_prompt, "yandexgpt", iam_token), "insights")),
+            asyncio.ensure_future(self._collect_llm_result(
+                self._summarise(transcript, iam_token, on_partial), "summary"))
+        ]
+        try:
+            insights, summary = await asyncio.gather(*calls)
+        except BaseException:
+            # DependencyUnavailableError одного вызова откладывает задачу целиком:
+            # второй вызов больше не нужен, а держит место в bulkhead LLM
+            for call in calls:
+                call.cancel()
+            await asyncio.gather(*calls, return_exceptions=True)
+            raise
+
+        fallback = self._get_fallback_response()
+        result = {}
+
+        if insights is not None:
+            try:
+                parsed = parse_llm_json(insights)
+                result["emotion"] = parsed["emotion"]
+                result["insights"] = parsed["insights"]
+            except (ValueError, KeyError, TypeError) as e:
+                logger.error(f"Could not parse insights response: {str(e)}")
+
+        if summary is not None:
+            result["summary"] = summary
+
+        if not result:
+            return None
+
+        if len(result) < 3:
+            result.setdefault("summary", fallback["summary"])
+            result.setdefault("emotion", fallback["emotion"])
+            result.setdefault("insights", fallback["insights"])
+            result["partial"] = True
+
+        return result
+
+    async def _summarise(self, transcript: str, iam_token: str,
+                         on_partial: Optional[Callable[[str], None]]) -> str:
+        """Саммари; если есть кому показывать текст по мере генерации - потоком"""
+        if not (on_partial and settings.LLM_STREAM_SUMMARY):
+            return await call_gpt(transcript, self.summary_prompt, "yandexgpt-lite", iam_token)
+
+        summary = ""
+        async for summary in stream_gpt(transcript, self.summary_prompt, "yandexgpt-lite", iam_token):
+            on_partial(summary)
+        return summary
+
+    async def _analyse_transcript_combined(self, transcript: str, iam_token: str) -> Optional[Dict[str, Any]]:
+        """
+        Саммари, эмоция и инсайты одним запросом: транскрипт отправляется один раз.
+        Ответ проверяется схемой AudioAnalysis; битый JSON сначала исправляется
+        локально, и только если это не помогло - запрос повторяется.
+        """
+        prompt = self.combined_prompt
+        for attempt in range(settings.LLM_COMBINED_RETRIES + 1):
+            response = await self._collect_llm_result(
+                call_gpt(transcript, prompt, "yandexgpt", iam_token,
+                         max_tokens=settings.LLM_COMBINED_MAX_TOKENS),
+                "combined analysis"
+            )
+            if response is None:
+                return None
+
+            try:
+                return AudioAnalysis.model_validate(parse_llm_json(response)).model_dump()
+            except (ValueError, ValidationError) as e:
+                logger.warning(f"Invalid combined analysis response (attempt {attempt + 1}): {str(e)}")
+                # Другой промпт - другой ключ кэша, поэтому повтор действительно идёт в LLM
+                prompt = self.combined_prompt + self.json_retry_hint
+
+        return None
+
+    @staticmethod
+    async def _collect_llm_result(call: Awaitable[str], name: str) -> Optional[str]:
+        try:
+            with track_stage("llm_" + name.replace(" ", "_")):
+                return await asyncio.wait_for(call, timeout=settings.LLM_CALL_TIMEOUT_SECONDS)
+        except asyncio.TimeoutError:
+            logger.error(f"LLM call for {name} timed out")
+        except DependencyUnavailableError:
+            raise
+        except Exception as e:
+            logger.error(f"LLM call for {name} failed: {str(e)}")
+        return None
+
     def _cleanup_files(self, original_path: str, converted_path: str = None):
         """Очистка временных файлов"""
         files_to_delete = []
@@ -213,5 +420,6 @@ class AudioProcessor:
             "transcript": "Речь не распознана",
             "summary": "Не удалось проанализировать запись",
             "emotion": "neutral",
-            "insights": ["Требуется повторная запись"]
+            "insights": ["Требуется повторная запись"],
+            "fallback": True
         }
@@ -1,14 +1,15 @@
 import json
 from sqlalchemy.orm import Session
-from sqlalchemy import func
-from datetime import date, timedelta
+from sqlalchemy.exc import IntegrityError
+from datetime import date, datetime, time, timedelta
 from typing import List, Optional, Dict, Any
 import logging
 
 from app.models.daily_stats import DailyStats
 from app.models.record import Record
 from services.gpt_service import call_gpt
-from services.utils.iam_token import get_iam_token
+from services.utils.iam_token import get_iam_token_async
+from services.utils.json_repair import parse_llm_json
 
 logger = logging.getLogger(__name__)
 
@@ -74,13 +75,16 @@ class DailyStatsService:
 
         return calendar_data
 
-    def generate_daily_stats(self, user_id: int, target_date: date) -> Optional[DailyStats]:
+    async def generate_daily_stats(self, user_id: int, target_date: date) -> Optional[DailyStats]:
         """Генерация статистики за день на основе записей"""
         try:
-            # Получаем все записи пользователя за указанный день
+            # Получаем все записи пользователя за указанный день.
+            # Диапазон, а не func.date(created_at): так используется индекс (user_id, created_at)
+            day_start = datetime.combine(target_date, time.min)
             records = self.db.query(Record).filter(
                 Record.user_id == user_id,
-                func.date(Record.created_at) == target_date
+                Record.created_at >= day_start,
+                Record.created_at < day_start + timedelta(days=1)
             ).all()
 
             if not records:
@@ -103,7 +107,7 @@ class DailyStatsService:
             fallback_dominant_emotion = max(emotion_count.items(), key=lambda x: x[1])[
                 0] if emotion_count else None
 
-            iam_token = get_iam_token()
+            iam_token = await get_iam_token_async()
             # Инициализируем переменные для GPT-анализа
             gpt_dominant_emotion = None
             daily_summary_from_gpt = None
@@ -115,7 +119,7 @@ class DailyStatsService:
                     combined_summaries = "\n\n".join(all_summaries)
 
                     # Вызываем GPT для анализа дневных записей
-                    gpt_response = call_gpt(
+                    gpt_response = await call_gpt(
                         text=combined_summaries,
                         prompt=self.DAILY_SUMMARY_PROMPT,
                         model_name="yandexgpt",
@@ -123,7 +127,7 @@ class DailyStatsService:
                     )
 
                     # Парсим ответ GPT
-                    gpt_data = json.loads(gpt_response.strip())
+                    gpt_data = parse_llm_json(gpt_response.strip())
                     gpt_dominant_emotion = gpt_data.get("dominant_emotion")
                     daily_summary_from_gpt = gpt_data.get("summary")
 
@@ -142,33 +146,38 @@ class DailyStatsService:
             final_dominant_emotion = gpt_dominant_emotion if gpt_dominant_emotion else fallback_dominant_emotion
             final_summary = daily_summary_from_gpt if daily_summary_from_gpt else None
 
+            values = {
+                "dominant_emotion": final_dominant_emotion,
+                "emotion_distribution": emotion_count,
+                "records_count": len(records),
+                "total_duration": total_duration,
+                "daily_summary": final_summary
+            }
+
             # Создаем или обновляем статистику
             existing_stat = self.get_daily_stats(user_id, target_date)
 
-            if existing_stat:
-                # Обновляем существующую запись
-                existing_stat.dominant_emotion = final_dominant_emotion
-                existing_stat.emotion_distribution = emotion_count
-                existing_stat.records_count = len(records)
-                existing_stat.total_duration = total_duration
-                existing_stat.daily_summary = final_summary
-                self.db.commit()
-                self.db.refresh(existing_stat)
-                return existing_stat
-            else:
-                daily_stat = DailyStats(
-                    user_id=user_id,
-                    date=target_date,
-                    dominant_emotion=final_dominant_emotion,
-                    emotion_distribution=emotion_count,
-                    records_count=len(records),
-                    total_duration=total_duration,
-                    daily_summary=final_summary
-                )
+            if not existing_stat:
+                daily_stat = DailyStats(user_id=user_id, date=target_date, **values)
                 self.db.add(daily_stat)
-                self.db.commit()
-                self.db.refresh(daily_stat)
-                return daily_stat
+                try:
+                    self.db.commit()
+                    self.db.refresh(daily_stat)
+                    return daily_stat
+                except IntegrityError:
+                    # Статистику за этот день параллельно создала другая задача
+                    # (уникальность user_id + date) - обновляем её запись
+                    self.db.rollback()
+                    existing_stat = self.get_daily_stats(user_id, target_date)
+                    if not existing_stat:
+                        raise
+
+            # Обновляем существующую запись
+            for field, value in values.items():
+                setattr(existing_stat, field, value)
+            self.db.commit()
+            self.db.refresh(existing_stat)
+            return existing_stat
 
         except Exception as e:
             logger.error(
@@ -1,34 +1,253 @@
-import requests
+import asyncio
+import json
+import logging
+import sys
+import time
+from contextlib import AsyncExitStack
+from typing import Any, AsyncIterator, Awaitable, Callable, Dict, Optional, Tuple
 from app.config import settings
+from app.metrics import LLM_CALL_EVENTS
+from .llm_cache import llm_cache
+from .utils.hedging import CallStats, HedgeBudget, LatencyTracker, decorrelated_jitter, hedged
+from .utils.http_client import get_async_client, async_timeout
+from .utils.resilience import llm
 
-def call_gpt(text: str, prompt: str, model_name: str, iam_token: str) -> str:
+logger = logging.getLogger(__name__)
+
+_latency = LatencyTracker(settings.LLM_LATENCY_WINDOW, settings.LLM_LATENCY_MIN_SAMPLES)
+# Для потоковых запросов хедж ждёт первого фрагмента, а не всего ответа
+_first_chunk_latency = LatencyTracker(settings.LLM_LATENCY_WINDOW, settings.LLM_LATENCY_MIN_SAMPLES)
+_hedge_budget = HedgeBudget(settings.LLM_HEDGE_BUDGET_RATIO)
+_call_stats = CallStats(LLM_CALL_EVENTS)
+
+
+class UpstreamError(RuntimeError):
+    """429 или 5xx от API - запрос можно повторить"""
+
+    def __init__(self, status_code: int, text: str, retry_after: Optional[float] = None):
+        self.status_code = status_code
+        self.retry_after = retry_after
+        super().__init__(f"API error: {status_code}, {text}")
+
+
+def _is_upstream_error(status_code: int) -> bool:
+    """Ответы, которые говорят о перегрузке или сбое API, а не об ошибке в запросе"""
+    return status_code >= 500 or status_code == 429
+
+
+def _completion_options(max_tokens: int, stream: bool = False) -> Dict[str, Any]:
+    return {
+        "stream": stream,
+        "temperature": 0.3,
+        "maxTokens": max_tokens
+    }
+
+
+def _build_request(text: str, prompt: str, model_uri: str, iam_token: str,
+                   completion_options: Dict[str, Any]) -> tuple:
     headers = {
         "Authorization": f"Bearer {iam_token}",
         "Content-Type": "application/json",
     }
 
     data = {
-        "modelUri": f"gpt://{settings.FOLDER_ID}/{model_name}",
-        "completionOptions": {
-            "stream": False,
-            "temperature": 0.3,
-            "maxTokens": 500
-        },
+        "modelUri": model_uri,
+        "completionOptions": completion_options,
         "messages": [
             {"role": "system", "text": prompt},
             {"role": "user", "text": text}
         ]
     }
+    return headers, data
 
-    resp = requests.post(
-        "https://llm.api.cloud.yandex.net/foundationModels/v1/completion",
-        headers=headers,
-        json=data,
-        timeout=30
-    )
+
+def _cache_key(model_uri: str, prompt: str, text: str, max_tokens: int) -> Optional[str]:
+    # Потоковый и обычный ответ одинаковы по содержанию, поэтому ключ общий
+    if not settings.LLM_CACHE_ENABLED:
+        return None
+    return llm_cache.make_key(model_uri, prompt, text, _completion_options(max_tokens))
+
+
+def _message_text(payload: Dict[str, Any]) -> str:
+    return payload["result"]["alternatives"][0]["message"]["text"].replace("`", "")
+
+
+def _retry_after(resp) -> Optional[float]:
+    try:
+        return float(resp.headers.get("Retry-After"))
+    except (TypeError, ValueError):
+        return None
+
+
+def _hedge_delay(latency: LatencyTracker) -> float:
+    observed = latency.percentile(settings.LLM_HEDGE_PERCENTILE)
+    if observed is None:
+        return settings.LLM_HEDGE_DEFAULT_DELAY_SECONDS
+    return max(settings.LLM_HEDGE_MIN_DELAY_SECONDS, observed)
+
+
+async def _request_completion(headers: Dict[str, str], data: Dict[str, Any]) -> str:
+    """Одна попытка запроса к API"""
+    started = time.monotonic()
+    async with llm.guard():
+        resp = await get_async_client().post(
+            settings.LLM_COMPLETION_URL,
+            headers=headers,
+            json=data,
+            timeout=async_timeout(settings.LLM_ATTEMPT_TIMEOUT_SECONDS)
+        )
+        if _is_upstream_error(resp.status_code):
+            raise UpstreamError(resp.status_code, resp.text, _retry_after(resp))
 
     if resp.status_code != 200:
         raise RuntimeError(f"API error: {resp.status_code}, {resp.text}")
 
-    response_text = resp.json()["result"]["alternatives"][0]["message"]["text"]
-    return response_text.replace("`", "")
\ No newline at end of file
+    text = _message_text(resp.json())
+    _latency.record(time.monotonic() - started)
+    return text
+
+
+async def _with_retries(attempt: Callable[[], Awaitable[Any]], latency: LatencyTracker,
+                        discard: Optional[Callable[[Any], Awaitable[None]]] = None) -> Any:
+    """Запрос с повторами при 429/5xx и, если включено, с хеджированием"""
+    _call_stats.inc("calls")
+    _hedge_budget.on_request()
+
+    delay = settings.LLM_RETRY_BASE_DELAY_SECONDS
+    for number in range(1, settings.LLM_MAX_ATTEMPTS + 1):
+        _call_stats.inc("attempts")
+        try:
+            if settings.LLM_HEDGING_ENABLED:
+                result, _ = await hedged(
+                    attempt,
+                    _hedge_delay(latency),
+                    _hedge_budget,
+                    _call_stats,
+                    discard=discard
+                )
+                return result
+            return await attempt()
+        except UpstreamError as e:
+            if number >= settings.LLM_MAX_ATTEMPTS:
+                raise
+            delay = decorrelated_jitter(
+                delay, settings.LLM_RETRY_BASE_DELAY_SECONDS, settings.LLM_RETRY_MAX_DELAY_SECONDS
+            )
+            if e.retry_after:
+                delay = min(max(delay, e.retry_after), settings.LLM_RETRY_MAX_DELAY_SECONDS)
+            _call_stats.inc("retries")
+            logger.warning(f"LLM API returned {e.status_code} (attempt {number}), retrying in {delay:.1f}s")
+            await asyncio.sleep(delay)
+
+
+async def _complete(headers: Dict[str, str], data: Dict[str, Any]) -> str:
+    return await _with_retries(lambda: _request_completion(headers, data), _latency)
+
+
+async def _first_chunk(lines: AsyncIterator[str]) -> str:
+    async for line in lines:
+        if line.strip():
+            return _message_text(json.loads(line))
+    return ""
+
+
+async def _open_stream(headers: Dict[str, str], data: Dict[str, Any]) -> Tuple[AsyncExitStack, AsyncIterator[str], str]:
+    """
+    Одна попытка потокового запроса: до первого фрагмента ответа, не дольше
+    LLM_ATTEMPT_TIMEOUT_SECONDS. Возвращает открытый поток (стек закрывает
+    его и освобождает место в bulkhead), оставшиеся строки и первый фрагмент.
+    """
+    started = time.monotonic()
+    stack = AsyncExitStack()
+    try:
+        await stack.enter_async_context(llm.guard())
+        resp = await stack.enter_async_context(get_async_client().stream(
+            "POST",
+            settings.LLM_COMPLETION_URL,
+            headers=headers,
+            json=data,
+            timeout=async_timeout(settings.LLM_ATTEMPT_TIMEOUT_SECONDS)
+        ))
+        if resp.status_code != 200:
+            body = (await resp.aread()).decode(errors="replace")
+            if _is_upstream_error(resp.status_code):
+                raise UpstreamError(resp.status_code, body, _retry_after(resp))
+            # Ошибка в запросе, а не отказ API - закрываем guard без ошибки
+            await stack.aclose()
+            raise RuntimeError(f"API error: {resp.status_code}, {body}")
+
+        lines = resp.aiter_lines()
+        remaining = settings.LLM_ATTEMPT_TIMEOUT_SECONDS - (time.monotonic() - started)
+        first = await asyncio.wait_for(_first_chunk(lines), timeout=max(remaining, 0.0))
+    except BaseException:
+        await stack.__aexit__(*sys.exc_info())
+        raise
+
+    _first_chunk_latency.record(time.monotonic() - started)
+    return stack, lines, first
+
+
+async def _close_stream(opened: Tuple[AsyncExitStack, AsyncIterator[str], str]):
+    await opened[0].aclose()
+
+
+def llm_call_stats() -> Dict[str, Any]:
+    return {**_call_stats.stats(), "latency": _latency.stats(), "first_chunk_latency": _first_chunk_latency.stats()}
+
+
+async def call_gpt(text: str, prompt: str, model_name: str, iam_token: str, max_tokens: int = 500) -> str:
+    model_uri = f"gpt://{settings.FOLDER_ID}/{model_name}"
+
+    # Одинаковый запрос (модель, промпт, текст, параметры) не отправляем повторно
+    cache_key = _cache_key(model_uri, prompt, text, max_tokens)
+    if cache_key:
+        # Промах в памяти идёт в Postgres - не блокируем цикл событий
+        cached = await asyncio.to_thread(llm_cache.get, cache_key)
+        if cached is not None:
+            return cached
+
+    headers, data = _build_request(text, prompt, model_uri, iam_token, _completion_options(max_tokens))
+    response_text = await _complete(headers, data)
+
+    if cache_key:
+        await asyncio.to_thread(llm_cache.set, cache_key, model_uri, response_text)
+
+    return response_text
+
+
+async def stream_gpt(text: str, prompt: str, model_name: str, iam_token: str,
+                     max_tokens: int = 500) -> AsyncIterator[str]:
+    """
+    Запрос с "stream": true. API присылает JSON-объекты построчно, в каждом -
+    весь сгенерированный к этому моменту текст; его и отдаём. Последнее
+    значение - полный ответ. Ошибки те же, что у call_gpt.
+    """
+    model_uri = f"gpt://{settings.FOLDER_ID}/{model_name}"
+
+    cache_key = _cache_key(model_uri, prompt, text, max_tokens)
+    if cache_key:
+        cached = await asyncio.to_thread(llm_cache.get, cache_key)
+        if cached is not None:
+            yield cached
+            return
+
+    headers, data = _build_request(text, prompt, model_uri, iam_token, _completion_options(max_tokens, stream=True))
+
+    # Повторы и хедж - только до первого фрагмента: потом текст уже отдан
+    stack, lines, response_text = await _with_retries(
+        lambda: _open_stream(headers, data), _first_chunk_latency, discard=_close_stream
+    )
+    async with stack:
+        if response_text:
+            yield response_text
+
+        async for line in lines:
+            if not line.strip():
+                continue
+            chunk = _message_text(json.loads(line))
+            if chunk != response_text:
+                response_text = chunk
+                yield response_text
+
+    if cache_key and response_text:
+        await asyncio.to_thread(llm_cache.set, cache_key, model_uri, response_text)
@@ -0,0 +1,90 @@
+"""
+Поток событий обработки записи в формате Server-Sent Events.
+
+Задачу может выполнять как API, так и отдельный воркер, поэтому события
+строятся по строке processing_jobs: поток опрашивает её и отправляет
+изменения этапа и частичного саммари.
+
+События:
+    stage   - {"stage": ..., "status": ...}; для отложенной или повторяемой задачи ещё
+              "run_after" и "error" - когда и после какой ошибки обработка продолжится
+    summary - {"text": ...}, саммари, сгенерированное к этому моменту
+    done    - ProcessingJobResponse с созданной записью и "read_primary_until":
+              cookie после начала потока не поставить, поэтому клиент до этого
+              времени передаёт его в заголовке X-Read-Primary-Until
+    error   - {"status": ..., "error": ...}
+"""
+import asyncio
+import json
+import logging
+import time
+from typing import Any, AsyncIterator, Optional
+
+from app.config import settings
+from app.database import SessionLocal
+from app.models.processing_job import ProcessingJob, JobStatus
+from app.schemas.processing_job import ProcessingJobResponse
+
+logger = logging.getLogger(__name__)
+
+_FINAL_STATUSES = (JobStatus.COMPLETED, JobStatus.FAILED, JobStatus.DEAD)
+
+
+def format_event(event: str, data: Any) -> str:
+    payload = data if isinstance(data, str) else json.dumps(data, ensure_ascii=False)
+    return f"event: {event}\ndata: {payload}\n\n"
+
+
+def _read_job(job_id: int) -> Optional[ProcessingJobResponse]:
+    """
+    Снимок задачи в короткой сессии: поток живёт до JOB_EVENTS_MAX_SECONDS,
+    и одна сессия на всё это время держала бы соединение пула в открытой транзакции
+    """
+    with SessionLocal() as db:
+        job = db.query(ProcessingJob).filter(ProcessingJob.id == job_id).first()
+        return ProcessingJobResponse.model_validate(job) if job else None
+
+
+async def job_event_stream(job_id: int) -> AsyncIterator[str]:
+    """Отдаёт события, пока задача не завершится"""
+    last_stage = None
+    last_summary = None
+    started_at = last_sent_at = time.monotonic()
+
+    while time.monotonic() - started_at < settings.JOB_EVENTS_MAX_SECONDS:
+        job = await asyncio.to_thread(_read_job, job_id)
+        if not job:
+            yield format_event("error", {"status": None, "error": "Job not found"})
+            return
+
+        if (job.stage, job.status, job.run_after) != last_stage:
+            last_stage = (job.stage, job.status, job.run_after)
+            event = {"stage": job.stage, "status": job.status}
+            if job.status == JobStatus.PENDING and job.error:
+                event.update(run_after=job.run_after.isoformat(), error=job.error)
+            yield format_event("stage", event)
+            last_sent_at = time.monotonic()
+
+        if job.partial_summary and job.partial_summary != last_summary:
+            last_summary = job.partial_summary
+            yield format_event("summary", {"text": job.partial_summary})
+            last_sent_at = time.monotonic()
+
+        if job.status == JobStatus.COMPLETED:
+            # Запись создана в primary: следующие чтения клиента - оттуда же
+            done = job.model_dump(mode="json")
+            done["read_primary_until"] = round(time.time() + settings.DB_READ_YOUR_WRITES_SECONDS, 3)
+            yield format_event("done", done)
+            return
+        if job.status in _FINAL_STATUSES:
+            yield format_event("error", {"status": job.status, "error": job.error})
+            return
+
+        if time.monotonic() - last_sent_at >= settings.JOB_EVENTS_KEEPALIVE_SECONDS:
+            # Комментарий не даёт прокси закрыть простаивающее соединение
+            yield ": keepalive\n\n"
+            last_sent_at = time.monotonic()
+
+        await asyncio.sleep(settings.JOB_EVENTS_POLL_INTERVAL_SECONDS)
+
+    logger.warning(f"Event stream for job {job_id} closed after {settings.JOB_EVENTS_MAX_SECONDS:.0f}s")
@@ -0,0 +1,247 @@
+from sqlalchemy.orm import Session
+from sqlalchemy import and_, or_
+from datetime import date, datetime, timezone, timedelta
+from typing import Any, Dict, Optional
+import logging
+
+from app.config import settings
+from app.database import SessionLocal
+from app.models.processing_job import ProcessingJob, JobStatus, JobStage, JobType
+from app.models.record import Record
+
+logger = logging.getLogger(__name__)
+
+
+class ProcessingJobService:
+    """
+    Очередь задач поверх таблицы processing_jobs.
+    Задачи забираются через SELECT ... FOR UPDATE SKIP LOCKED, поэтому несколько
+    воркеров (и API в inline-режиме) не получают одну и ту же задачу.
+    """
+
+    def __init__(self, db: Session):
+        self.db = db
+
+    def enqueue(
+        self,
+        job_type: str,
+        user_id: int,
+        payload: Optional[Dict[str, Any]] = None,
+        **fields
+    ) -> ProcessingJob:
+        try:
+            job = ProcessingJob(
+                job_type=job_type,
+                user_id=user_id,
+                status=JobStatus.PENDING,
+                payload=payload,
+                max_attempts=settings.JOB_MAX_ATTEMPTS,
+                run_after=datetime.now(timezone.utc),
+                **fields
+            )
+
+            self.db.add(job)
+            self.db.commit()
+            self.db.refresh(job)
+
+            logger.info(f"Enqueued {job_type} job {job.id} for user {user_id}")
+            return job
+
+        except Exception as e:
+            self.db.rollback()
+            logger.error(f"Error enqueueing {job_type} job for user {user_id}: {str(e)}")
+            raise
+
+    def enqueue_audio_job(
+        self,
+        user_id: int,
+        audio_path: str,
+        record_name: str,
+        duration: float,
+        audio_sha256: Optional[str] = None,
+        audio_size: Optional[int] = None
+    ) -> ProcessingJob:
+        return self.enqueue(
+            JobType.PROCESS_AUDIO,
+            user_id,
+            stage=JobStage.UPLOADED,
+            audio_path=audio_path,
+            audio_sha256=audio_sha256,
+            audio_size=audio_size,
+            record_name=record_name,
+            duration=duration
+        )
+
+    def enqueue_daily_stats_job(self, user_id: int, target_date: date) -> ProcessingJob:
+        """Ставит пересчёт статистики дня, если такой пересчёт ещё не ждёт в очереди"""
+        date_str = target_date.isoformat()
+        existing = self.db.query(ProcessingJob).filter(
+            ProcessingJob.job_type == JobType.DAILY_STATS,
+            ProcessingJob.user_id == user_id,
+            ProcessingJob.status == JobStatus.PENDING,
+            ProcessingJob.payload["date"].as_string() == date_str
+        ).first()
+        if existing:
+            return existing
+
+        return self.enqueue(JobType.DAILY_STATS, user_id, payload={"date": date_str})
+
+    def get_job(self, job_id: int) -> Optional[ProcessingJob]:
+        return self.db.query(ProcessingJob).filter(ProcessingJob.id == job_id).first()
+
+    def get_user_job(self, user_id: int, job_id: int) -> Optional[ProcessingJob]:
+        return self.db.query(ProcessingJob).filter(
+            ProcessingJob.id == job_id,
+            ProcessingJob.user_id == user_id
+        ).first()
+
+    def count_active_jobs(self, user_id: int) -> int:
+        """Количество загрузок пользователя, которые ещё не превратились в запись"""
+        return self.db.query(ProcessingJob).filter(
+            ProcessingJob.job_type == JobType.PROCESS_AUDIO,
+            ProcessingJob.user_id == user_id,
+            ProcessingJob.status.in_([JobStatus.PENDING, JobStatus.PROCESSING])
+        ).count()
+
+    def claim(self, worker_id: str, job_id: Optional[int] = None) -> Optional[ProcessingJob]:
+        """
+        Забирает следующую готовую к выполнению задачу (или конкретную, если передан job_id).
+        Задачи, чья аренда истекла (воркер упал или перезапустился), снова становятся доступны.
+        """
+        while True:
+            now = datetime.now(timezone.utc)
+            query = self.db.query(ProcessingJob).filter(
+                or_(
+                    and_(ProcessingJob.status == JobStatus.PENDING, ProcessingJob.run_after <= now),
+                    and_(ProcessingJob.status == JobStatus.PROCESSING, ProcessingJob.locked_until < now)
+                )
+            )
+            if job_id is not None:
+                query = query.filter(ProcessingJob.id == job_id)
+
+            job = query.order_by(
+                ProcessingJob.run_after, ProcessingJob.id
+            ).with_for_update(skip_locked=True).first()
+
+            if not job:
+                self.db.commit()
+                return None
+
+            job.attempts += 1
+            if job.attempts > job.max_attempts:
+                # Аренда истекла на последней попытке
+                job.status = JobStatus.DEAD
+                job.error = job.error or "Visibility timeout expired on the last attempt"
+                job.locked_by = None
+                job.locked_until = None
+                self.db.commit()
+                logger.error(f"Job {job.id} moved to dead letter after {job.max_attempts} attempts")
+                continue
+
+            job.status = JobStatus.PROCESSING
+            job.locked_by = worker_id
+            job.locked_until = now + timedelta(seconds=settings.JOB_VISIBILITY_TIMEOUT_SECONDS)
+            self.db.commit()
+
+            logger.info(f"Worker {worker_id} claimed {job.job_type} job {job.id} (attempt {job.attempts}/{job.max_attempts})")
+            return job
+
+    def heartbeat(self, job: ProcessingJob):
+        """Продлевает аренду задачи, чтобы её не забрал другой воркер"""
+        job.locked_until = datetime.now(timezone.utc) + timedelta(seconds=settings.JOB_VISIBILITY_TIMEOUT_SECONDS)
+        self.db.commit()
+
+    @staticmethod
+    def extend_lease(job_id: int, worker_id: str) -> bool:
+        """
+        Продлевает аренду в отдельной сессии: сессия задачи может быть
+        посреди транзакции, и коммитить её здесь нельзя.
+        False - задача уже не наша (завершена или забрана после истечения аренды).
+        """
+        return ProcessingJobService.update_progress(job_id, worker_id, {})
+
+    @staticmethod
+    def update_progress(job_id: int, worker_id: str, values: Dict[str, Any]) -> bool:
+        """
+        Записывает ход обработки (stage, partial_summary) и продлевает аренду,
+        как extend_lease. Вызывается из потока, а не из цикла событий.
+        """
+        db = SessionLocal()
+        try:
+            updated = db.query(ProcessingJob).filter(
+                ProcessingJob.id == job_id,
+                ProcessingJob.status == JobStatus.PROCESSING,
+                ProcessingJob.locked_by == worker_id
+            ).update(
+                {
+                    **values,
+                    "locked_until": datetime.now(timezone.utc) + timedelta(seconds=settings.JOB_VISIBILITY_TIMEOUT_SECONDS)
+                },
+                synchronize_session=False
+            )
+            db.commit()
+        finally:
+            db.close()
+
+        if updated and "stage" in values:
+            logger.info(f"Processing job {job_id} moved to stage '{values['stage']}'")
+        return updated > 0
+
+    def mark_completed(self, job: ProcessingJob, record: Optional[Record] = None):
+        job.status = JobStatus.COMPLETED
+        if record is not None:
+            job.stage = JobStage.SAVED
+            job.record_id = record.id
+        job.error = None
+        job.locked_by = None
+        job.locked_until = None
+        self.db.commit()
+        logger.info(f"Job {job.id} completed")
+
+    def defer(self, job: ProcessingJob, delay: float, reason: str):
+        """
+        Откладывает задачу, не тратя попытку: зависимость недоступна,
+        и сама задача в этом не виновата. Задачу снова заберёт воркер
+        или, в inline-режиме, InlineJobRunner процесса API.
+        Если зависимость недоступна дольше JOB_MAX_DEFER_SECONDS,
+        откладывание считается обычной неудачной попыткой.
+        """
+        created_at = (job.created_at or datetime.now(timezone.utc)).replace(tzinfo=timezone.utc)
+        if (datetime.now(timezone.utc) - created_at).total_seconds() > settings.JOB_MAX_DEFER_SECONDS:
+            self.mark_failed(job, reason)
+            return
+
+        job.status = JobStatus.PENDING
+        job.error = reason
+        job.attempts = max(0, job.attempts - 1)
+        job.locked_by = None
+        job.locked_until = None
+        job.run_after = datetime.now(timezone.utc) + timedelta(seconds=delay)
+        self.db.commit()
+        logger.warning(f"Job {job.id} deferred for {delay:.0f}s: {reason}")
+
+    def mark_failed(self, job: ProcessingJob, error: str, retryable: bool = True):
+        """
+        Повторяет задачу с экспоненциальной задержкой; когда попытки исчерпаны,
+        задача переходит в dead letter.
+        """
+        job.error = error
+        job.locked_by = None
+        job.locked_until = None
+
+        if retryable and job.attempts < job.max_attempts:
+            delay = min(
+                settings.JOB_RETRY_BACKOFF_SECONDS * (2 ** (job.attempts - 1)),
+                settings.JOB_RETRY_BACKOFF_MAX_SECONDS
+            )
+            job.status = JobStatus.PENDING
+            job.run_after = datetime.now(timezone.utc) + timedelta(seconds=delay)
+            logger.warning(f"Job {job.id} failed (attempt {job.attempts}/{job.max_attempts}), retrying in {delay:.0f}s: {error}")
+        elif retryable:
+            job.status = JobStatus.DEAD
+            logger.error(f"Job {job.id} moved to dead letter: {error}")
+        else:
+            job.status = JobStatus.FAILED
+            logger.error(f"Job {job.id} failed: {error}")
+
+        self.db.commit()
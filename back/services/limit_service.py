@@ -25,13 +25,14 @@ class RecordLimitService:
             "reset_time": self._get_next_reset_time(user.last_record_reset)
         }
     
-    def can_user_create_record(self, user_id: int) -> bool:
+    def can_user_create_record(self, user_id: int, pending_records: int = 0) -> bool:
         user = self.db.query(User).filter(User.id == user_id).first()
         if not user:
             return False
         
         self._reset_if_needed(user)
-        return user.daily_records_used < user.max_daily_records
+        # pending_records - загрузки, которые уже приняты, но ещё обрабатываются
+        return user.daily_records_used + pending_records < user.max_daily_records
     
     def increment_record_count(self, user_id: int) -> bool:
         user = self.db.query(User).filter(User.id == user_id).first()
@@ -0,0 +1,138 @@
+"""
+Кэш ответов YandexGPT.
+
+Ключ - SHA-256 от URI модели, хэша системного промпта, хэша текста пользователя
+и параметров генерации. Два уровня: LRU в памяти процесса и таблица
+llm_response_cache в Postgres (общая для всех процессов, с TTL).
+"""
+import hashlib
+import json
+import logging
+import threading
+from collections import OrderedDict
+from datetime import datetime, timezone, timedelta
+from typing import Any, Dict, Optional
+
+from app.config import settings
+from app.database import SessionLocal
+from app.models.llm_response_cache import LlmResponseCache
+
+logger = logging.getLogger(__name__)
+
+_PURGE_EVERY_WRITES = 100
+
+
+def _sha256(value: str) -> str:
+    return hashlib.sha256(value.encode("utf-8")).hexdigest()
+
+
+class LlmResponseCacheStore:
+    def __init__(self, memory_entries: int, ttl_seconds: int, persistent: bool):
+        self.memory_entries = memory_entries
+        self.ttl_seconds = ttl_seconds
+        self.persistent = persistent
+        self._memory: "OrderedDict[str, tuple]" = OrderedDict()
+        self._lock = threading.Lock()
+        self._writes = 0
+        self._stats = {"memory_hits": 0, "db_hits": 0, "misses": 0}
+
+    @staticmethod
+    def make_key(model_uri: str, prompt: str, text: str, completion_options: Dict[str, Any]) -> str:
+        return _sha256(json.dumps({
+            "model": model_uri,
+            "prompt": _sha256(prompt),
+            "text": _sha256(text),
+            "options": completion_options
+        }, sort_keys=True))
+
+    def _count(self, name: str):
+        with self._lock:
+            self._stats[name] += 1
+
+    def get(self, key: str) -> Optional[str]:
+        now = datetime.now(timezone.utc)
+
+        with self._lock:
+            entry = self._memory.get(key)
+            if entry and entry[1] > now:
+                self._memory.move_to_end(key)
+                self._stats["memory_hits"] += 1
+                return entry[0]
+
+        if self.persistent:
+            response = self._get_persistent(key, now)
+            if response is not None:
+                self._count("db_hits")
+                return response
+
+        self._count("misses")
+        return None
+
+    def set(self, key: str, model_uri: str, response: str):
+        expires_at = datetime.now(timezone.utc) + timedelta(seconds=self.ttl_seconds)
+        self._remember(key, response, expires_at)
+
+        if self.persistent:
+            self._set_persistent(key, model_uri, response, expires_at)
+
+    def stats(self) -> Dict[str, int]:
+        with self._lock:
+            return {**self._stats, "memory_entries": len(self._memory)}
+
+    def _remember(self, key: str, response: str, expires_at: datetime):
+        with self._lock:
+            self._memory[key] = (response, expires_at)
+            self._memory.move_to_end(key)
+            while len(self._memory) > self.memory_entries:
+                self._memory.popitem(last=False)
+
+    def _get_persistent(self, key: str, now: datetime) -> Optional[str]:
+        db = SessionLocal()
+        try:
+            entry = db.query(LlmResponseCache).filter(
+                LlmResponseCache.cache_key == key,
+                LlmResponseCache.expires_at > now
+            ).first()
+            if not entry:
+                return None
+            self._remember(key, entry.response, entry.expires_at.replace(tzinfo=timezone.utc))
+            return entry.response
+        except Exception as e:
+            logger.warning(f"LLM cache lookup failed: {str(e)}")
+            return None
+        finally:
+            db.close()
+
+    def _set_persistent(self, key: str, model_uri: str, response: str, expires_at: datetime):
+        db = SessionLocal()
+        try:
+            entry = db.query(LlmResponseCache).filter(LlmResponseCache.cache_key == key).first()
+            if not entry:
+                entry = LlmResponseCache(cache_key=key, model_uri=model_uri)
+                db.add(entry)
+            entry.response = response
+            entry.created_at = datetime.now(timezone.utc)
+            entry.expires_at = expires_at
+            db.commit()
+
+            with self._lock:
+                self._writes += 1
+                purge = self._writes % _PURGE_EVERY_WRITES == 0
+            if purge:
+                deleted = db.query(LlmResponseCache).filter(
+                    LlmResponseCache.expires_at <= datetime.now(timezone.utc)
+                ).delete(synchronize_session=False)
+                db.commit()
+                logger.info(f"Purged {deleted} expired LLM cache entries")
+        except Exception as e:
+            db.rollback()
+            logger.warning(f"LLM cache write failed: {str(e)}")
+        finally:
+            db.close()
+
+
+llm_cache = LlmResponseCacheStore(
+    memory_entries=settings.LLM_CACHE_MEMORY_ENTRIES,
+    ttl_seconds=settings.LLM_CACHE_TTL_SECONDS,
+    persistent=settings.LLM_CACHE_PERSISTENT
+)
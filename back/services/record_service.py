@@ -1,16 +1,22 @@
 from sqlalchemy.orm import Session
 from sqlalchemy import desc, func
 from datetime import datetime, timezone, timedelta
-from typing import List, Optional, Dict, Any
+from typing import Callable, List, Optional, Dict, Any
 import logging
 
+from app.config import settings
+from app.metrics import track_stage
 from app.models.record import Record
 from app.models.user import User
+from app.models.processing_job import JobStage
 from app.schemas.record import RecordCreate, RecordUpdate, RecordResponse, RecordWithUser
 from .audio_processor import AudioProcessor
+from .analysis_cache_service import AudioAnalysisCacheService
 from .limit_service import RecordLimitService
 from .achievement_service import AchievementService
 from .daily_stats_service import DailyStatsService
+from .job_service import ProcessingJobService
+from .utils.file_utils import sha256_file
 
 
 logger = logging.getLogger(__name__)
@@ -31,8 +37,8 @@ class RecordService:
             Record.user_id == user_id
         ).first()
 
-    def process_and_create_record(self, user_id: int, audio_file_path: str, record_name: str, duration: float) -> Record:
-        if not self.limit_service.can_user_create_record(user_id):
+    def ensure_can_create_record(self, user_id: int, pending_records: int = 0):
+        if not self.limit_service.can_user_create_record(user_id, pending_records):
             from fastapi import HTTPException
             raise HTTPException(
                 status_code=429, 
@@ -41,9 +47,28 @@ class RecordService:
                     "limit_info": self.limit_service.get_user_limit_info(user_id)
                 }
             )
+
+    async def process_and_create_record(
+        self,
+        user_id: int,
+        audio_file_path: str,
+        record_name: str,
+        duration: float,
+        on_stage: Optional[Callable[[str], None]] = None,
+        audio_sha256: Optional[str] = None,
+        on_partial: Optional[Callable[[str], None]] = None
+    ) -> Record:
+        self.ensure_can_create_record(user_id)
         
         try:
-            ml_result = self.audio_processor.process_audio(audio_file_path)
+            ml_result = await self._analyse_audio(user_id, audio_file_path, on_stage, audio_sha256, on_partial)
+
+            if on_stage:
+                on_stage(JobStage.SAVING)
+
+            # Длительность, посчитанная по самому аудио, надёжнее значения от клиента
+            if ml_result.get("duration"):
+                duration = ml_result["duration"]
 
             record_data = RecordCreate(
                 name=record_name,
@@ -54,9 +79,10 @@ class RecordService:
                 duration=duration
             )
 
-            record = self.create_record(user_id, record_data)
+            record = await self.create_record(user_id, record_data)
 
-            self._check_achievements_after_record_creation(user_id, record)
+            with track_stage("achievements"):
+                self._check_achievements_after_record_creation(user_id, record)
 
             success = self.limit_service.increment_record_count(user_id)
             if not success:
@@ -71,6 +97,30 @@ class RecordService:
                 f"Error processing audio and creating record: {str(e)}")
             raise
 
+    async def _analyse_audio(
+        self,
+        user_id: int,
+        audio_file_path: str,
+        on_stage: Optional[Callable[[str], None]],
+        audio_sha256: Optional[str],
+        on_partial: Optional[Callable[[str], None]] = None
+    ) -> Dict[str, Any]:
+        """Анализ аудио с кэшем по содержимому: повторная загрузка того же пользователя не идёт в STT и LLM"""
+        if not settings.ANALYSIS_CACHE_ENABLED:
+            return await self.audio_processor.process_audio(audio_file_path, on_stage=on_stage, on_partial=on_partial)
+
+        cache = AudioAnalysisCacheService(self.db)
+        content_hash = audio_sha256 or sha256_file(audio_file_path)
+
+        ml_result = cache.get(user_id, content_hash)
+        if ml_result:
+            return ml_result
+
+        ml_result = await self.audio_processor.process_audio(audio_file_path, on_stage=on_stage, on_partial=on_partial)
+        if not ml_result.get("fallback") and not ml_result.get("partial"):
+            cache.put(user_id, content_hash, ml_result)
+        return ml_result
+
     def get_user_recording_limit(self, user_id: int) -> dict:
         return self.limit_service.get_user_limit_info(user_id)
     
@@ -96,7 +146,7 @@ class RecordService:
 
         return query.order_by(desc(Record.created_at)).offset(skip).limit(limit).all()
 
-    def create_record(self, user_id: int, record_data: RecordCreate) -> Record:
+    async def create_record(self, user_id: int, record_data: RecordCreate) -> Record:
         try:
             record = Record(
                 user_id=user_id,
@@ -109,16 +159,20 @@ class RecordService:
                 created_at=datetime.now(timezone.utc)
             )
 
-            self.db.add(record)
-            self.db.commit()
-            self.db.refresh(record)
+            with track_stage("db_insert"):
+                self.db.add(record)
+                self.db.commit()
+                self.db.refresh(record)
 
             logger.info(f"Created record {record.id} for user {user_id}")
 
             try:
-                daily_stats_service = DailyStatsService(self.db)
                 record_date = datetime.now(timezone.utc).date()
-                daily_stats_service.generate_daily_stats(user_id, record_date)
+                if settings.JOB_QUEUE_INLINE:
+                    with track_stage("daily_stats"):
+                        await DailyStatsService(self.db).generate_daily_stats(user_id, record_date)
+                else:
+                    ProcessingJobService(self.db).enqueue_daily_stats_job(user_id, record_date)
             except Exception as e:
                 logger.error(f"Error generating daily stats: {str(e)}")
     
@@ -284,13 +338,15 @@ class RecordService:
                     AchievementService.update_achievement_progress(self.db, user_id, 6, 1)
 
                 # 3. Общая длительность записей - достижение ID 7 (Голос сердца)
+                # duration хранится в секундах, прогресс достижения - в полных минутах
                 total_duration = self.db.query(func.coalesce(func.sum(Record.duration), 0)).filter(
                     Record.user_id == user_id
                 ).scalar()
-                if total_duration >= 100:  # 100 минут
-                    AchievementService.update_achievement_progress(self.db, user_id, 7, int(total_duration))
-                elif total_duration > 0:
-                    AchievementService.update_achievement_progress(self.db, user_id, 7, int(record.duration))
+                total_minutes = int(total_duration // 60)
+                previous_minutes = int(max(0, total_duration - record.duration) // 60)
+                if total_minutes > previous_minutes:
+                    AchievementService.update_achievement_progress(
+                        self.db, user_id, 7, total_minutes - previous_minutes)
 
                 # 4. Проверяем разнообразие эмоций - достижение ID 4 (Радуга эмоций)
                 unique_emotions = self.db.query(Record.emotion).filter(
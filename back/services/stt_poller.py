@@ -0,0 +1,202 @@
+"""
+Мультиплексированный опрос операций SpeechKit.
+
+Все незавершённые операции распознавания отслеживаются одной корутиной в фоновом
+цикле asyncio, а не отдельным блокирующим циклом на каждую загрузку.
+Первый опрос назначается на ожидаемое время завершения (по длительности аудио),
+дальше интервал растёт экспоненциально. У каждой операции есть дедлайн.
+
+Опросы идут через speechkit.guard(): 429 и 5xx считаются отказами SpeechKit,
+а пока цепь разомкнута, операции не падают, а опрашиваются позже - распознавание
+на стороне SpeechKit продолжается. Операции, которые больше никто не ждёт
+(future отменён), из опроса убираются.
+"""
+import asyncio
+import concurrent.futures
+import logging
+import threading
+import time
+from dataclasses import dataclass, field
+from typing import Any, Dict, Optional
+
+import httpx
+
+from app.config import settings
+from .utils.http_client import create_async_client
+from .utils.resilience import DependencyUnavailableError, speechkit
+
+logger = logging.getLogger(__name__)
+
+
+class TranscriptionTimeoutError(TimeoutError):
+    pass
+
+
+def _retry_after(resp: httpx.Response) -> Optional[float]:
+    try:
+        return float(resp.headers.get("Retry-After"))
+    except (TypeError, ValueError):
+        return None
+
+
+def extract_transcript(data: Dict[str, Any]) -> str:
+    """Собирает текст из ответа завершённой операции longRunningRecognize"""
+    if "error" in data:
+        raise RuntimeError(f"Ошибка распознавания: {data['error']}")
+    if "response" not in data:
+        raise RuntimeError("Ошибка распознавания: нет response в ответе")
+
+    chunks = data["response"].get("chunks", [])
+    text_parts = []
+    for ch in chunks:
+        alt = ch.get("alternatives", [])
+        if alt:
+            text_parts.append(alt[0].get("text", ""))
+    return " ".join(text_parts)
+
+
+@dataclass
+class _Operation:
+    operation_id: str
+    iam_token: str
+    future: concurrent.futures.Future
+    next_poll_at: float
+    deadline: float
+    interval: float = field(default_factory=lambda: settings.STT_POLL_MIN_INTERVAL_SECONDS)
+    polls: int = 0
+
+
+class TranscriptionPoller:
+    def __init__(self):
+        self._loop: Optional[asyncio.AbstractEventLoop] = None
+        self._wakeup: Optional[asyncio.Event] = None
+        self._operations: Dict[str, _Operation] = {}
+        self._start_lock = threading.Lock()
+
+    def _ensure_started(self):
+        with self._start_lock:
+            if self._loop is not None:
+                return
+
+            loop = asyncio.new_event_loop()
+            ready = threading.Event()
+
+            def run():
+                asyncio.set_event_loop(loop)
+                self._wakeup = asyncio.Event()
+                loop.create_task(self._run())
+                ready.set()
+                loop.run_forever()
+
+            threading.Thread(target=run, name="stt-poller", daemon=True).start()
+            ready.wait()
+            self._loop = loop
+
+    @staticmethod
+    def _schedule(audio_duration: Optional[float]) -> tuple:
+        """Время первого опроса и дедлайн относительно текущего момента"""
+        duration = audio_duration or 0.0
+        expected = settings.STT_EXPECTED_BASE_SECONDS + duration * settings.STT_EXPECTED_SECONDS_PER_AUDIO_SECOND
+        deadline = settings.STT_DEADLINE_BASE_SECONDS + duration * settings.STT_DEADLINE_SECONDS_PER_AUDIO_SECOND
+        now = time.monotonic()
+        return now + expected, now + deadline
+
+    def submit(self, iam_token: str, operation_id: str,
+               audio_duration: Optional[float] = None) -> concurrent.futures.Future:
+        """Добавляет операцию в опрос. Future завершится текстом распознавания."""
+        self._ensure_started()
+
+        next_poll_at, deadline = self._schedule(audio_duration)
+        operation = _Operation(
+            operation_id=operation_id,
+            iam_token=iam_token,
+            future=concurrent.futures.Future(),
+            next_poll_at=next_poll_at,
+            deadline=deadline
+        )
+        self._loop.call_soon_threadsafe(self._add, operation)
+        return operation.future
+
+    def pending_count(self) -> int:
+        return len(self._operations)
+
+    def _add(self, operation: _Operation):
+        self._operations[operation.operation_id] = operation
+        self._wakeup.set()
+
+    def _finish(self, operation: _Operation, result: Optional[str] = None, error: Optional[BaseException] = None):
+        self._operations.pop(operation.operation_id, None)
+        if operation.future.done():
+            return  # ожидание отменили (например, по таймауту задачи)
+        if error is not None:
+            operation.future.set_exception(error)
+        else:
+            operation.future.set_result(result)
+
+    async def _poll(self, client: httpx.AsyncClient, operation: _Operation):
+        operation.polls += 1
+        retry_after = None
+        try:
+            async with speechkit.guard():
+                resp = await client.get(
+                    f"{settings.STT_OPERATION_URL}/{operation.operation_id}",
+                    headers={"Authorization": f"Bearer {operation.iam_token}"}
+                )
+                resp.raise_for_status()
+            data = resp.json()
+            if data.get("done"):
+                logger.info(f"STT operation {operation.operation_id} done after {operation.polls} polls")
+                self._finish(operation, result=extract_transcript(data))
+                return
+        except httpx.HTTPStatusError as e:
+            status_code = e.response.status_code
+            if status_code < 500 and status_code != 429:
+                self._finish(operation, error=e)
+                return
+            retry_after = _retry_after(e.response)
+            logger.warning(f"STT operation {operation.operation_id} poll returned {status_code}, will retry")
+        except DependencyUnavailableError as e:
+            retry_after = e.retry_after
+            logger.warning(f"STT operation {operation.operation_id} poll postponed: {str(e)}")
+        except httpx.TransportError as e:
+            logger.warning(f"STT operation {operation.operation_id} poll failed: {str(e)}, will retry")
+        except Exception as e:
+            self._finish(operation, error=e)
+            return
+
+        operation.next_poll_at = time.monotonic() + max(operation.interval, retry_after or 0.0)
+        operation.interval = min(
+            operation.interval * settings.STT_POLL_BACKOFF_FACTOR,
+            settings.STT_POLL_MAX_INTERVAL_SECONDS
+        )
+
+    async def _run(self):
+        async with create_async_client(settings.STT_POLL_REQUEST_TIMEOUT_SECONDS) as client:
+            while True:
+                now = time.monotonic()
+
+                for operation in list(self._operations.values()):
+                    if operation.future.cancelled():
+                        self._operations.pop(operation.operation_id, None)
+                    elif now >= operation.deadline:
+                        self._finish(operation, error=TranscriptionTimeoutError(
+                            f"STT operation {operation.operation_id} did not finish before the deadline"
+                        ))
+
+                due = [op for op in self._operations.values() if op.next_poll_at <= now]
+                if due:
+                    await asyncio.gather(*(self._poll(client, op) for op in due))
+                    continue
+
+                self._wakeup.clear()
+                timeout = None
+                if self._operations:
+                    next_event = min(min(op.next_poll_at, op.deadline) for op in self._operations.values())
+                    timeout = max(0.0, next_event - time.monotonic())
+                try:
+                    await asyncio.wait_for(self._wakeup.wait(), timeout)
+                except asyncio.TimeoutError:
+                    pass
+
+
+transcription_poller = TranscriptionPoller()
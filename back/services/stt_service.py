@@ -1,52 +1,38 @@
+import asyncio
 from datetime import datetime
-import time
+from typing import List, Optional, Tuple
 import uuid
 import logging
-import requests
-import boto3
-from botocore.client import Config
 from app.config import settings
-
-# === Константы API ===
-UPLOAD_URL = f"https://storage.yandexcloud.net/{settings.BUCKET_NAME}"
-STT_URL = "https://transcribe.api.cloud.yandex.net/speech/stt/v2/longRunningRecognize"
-OPERATION_URL = "https://operation.api.cloud.yandex.net/operations"
+from app.metrics import track_stage
+from .stt_poller import transcription_poller
+from .utils.http_client import get_async_client, async_timeout
+from .utils.resilience import speechkit
+from .utils.s3_client import upload_bytes, delete_object, object_url
 
 
 logger = logging.getLogger(__name__)
 
 
-def upload_to_bucket(local_file_path: str) -> str:
+async def upload_to_bucket(audio_data: bytes) -> str:
     """
-    Загружает файл в Object Storage через S3-совместимый API.
-    Возвращает URI для STT API.
+    Загружает аудио в Object Storage через общий S3-клиент.
+    Возвращает имя объекта.
     """
-    # S3-совместимый клиент
-    s3 = boto3.client(
-        "s3",
-        endpoint_url="https://storage.yandexcloud.net",
-        aws_access_key_id=settings.SECRET_KEY_ID,
-        aws_secret_access_key=settings.SECRET_KEY,
-        config=Config(signature_version="s3v4"),
-    )
-
     # Уникальное имя объекта
-    object_name = f"stt/{datetime.now().strftime('%m-%d_%H:%M:%S')}_{uuid.uuid4().hex}.ogg"
+    object_name = f"{settings.S3_STT_PREFIX}{datetime.now().strftime('%m-%d_%H:%M:%S')}_{uuid.uuid4().hex}.ogg"
 
-    # Загрузка файла
-    s3.upload_file(local_file_path, settings.BUCKET_NAME, object_name)
+    await upload_bytes(audio_data, object_name)
     logger.info(f"Uploaded file to: {object_name}")
 
-    # Возвращаем URI в формате для SpeechKit
-    return f"storage.yandexcloud.net/{settings.BUCKET_NAME}/{object_name}"
+    return object_name
 
 
-def start_transcription(iam_token: str, audio_uri: str) -> str:
+async def start_transcription(iam_token: str, audio_url: str) -> str:
     """
     Отправляет запрос на асинхронное распознавание.
     Возвращает operation_id.
     """
-    print(audio_uri)
     payload = {
         "config": {
             "specification": {
@@ -57,65 +43,126 @@ def start_transcription(iam_token: str, audio_uri: str) -> str:
                 "audioEncoding": "OGG_OPUS",
             }
         },
-        "audio": {"uri": f"https://{audio_uri}"},
+        "audio": {"uri": audio_url},
     }
 
     headers = {"Authorization": f"Bearer {iam_token}"}
-    resp = requests.post(STT_URL, headers=headers, json=payload)
-    if resp.status_code != 200:
-            logger.error(f"STT API error {resp.status_code}: {resp.text}")
-            try:
-                error_detail = resp.json()
-                logger.error(f"Error details: {error_detail}")
-            except:
-                logger.error(f"Raw error response: {resp.text}")
-            resp.raise_for_status()
+    async with speechkit.guard():
+        resp = await get_async_client().post(settings.STT_LONG_RUNNING_URL, headers=headers, json=payload)
+        if resp.status_code != 200:
+                logger.error(f"STT API error {resp.status_code}: {resp.text}")
+                try:
+                    error_detail = resp.json()
+                    logger.error(f"Error details: {error_detail}")
+                except:
+                    logger.error(f"Raw error response: {resp.text}")
+                resp.raise_for_status()
     # resp.raise_for_status()
     logger.info(f"Transcription started: {resp.json()['id']}")
     return resp.json()["id"]
 
 
-def get_transcription_result(iam_token: str, operation_id: str, poll_interval: int = 5) -> str:
+async def recognize_short_audio(iam_token: str, audio_data: bytes) -> str:
     """
-    Ожидает завершения распознавания и возвращает текст.
+    Синхронное распознавание короткой записи: аудио передаётся в теле запроса,
+    без загрузки в Object Storage и без опроса операции.
     """
+    params = {
+        "lang": "ru-RU",
+        "topic": "general",
+        "format": "oggopus",
+        "folderId": settings.FOLDER_ID,
+    }
     headers = {"Authorization": f"Bearer {iam_token}"}
-    url = f"{OPERATION_URL}/{operation_id}"
-
-    while True:
-        resp = requests.get(url, headers=headers)
-        resp.raise_for_status()
-        data = resp.json()
-
-        if data.get("done"):
-            if "response" in data:
-                chunks = data["response"].get("chunks", [])
-                text_parts = []
-                for ch in chunks:
-                    alt = ch.get("alternatives", [])
-                    if alt:
-                        text_parts.append(alt[0].get("text", ""))
-                return " ".join(text_parts)
-            else:
-                raise RuntimeError("Ошибка распознавания: нет response в ответе")
-        time.sleep(poll_interval)
-        
-
-
-def transcribe_audio(iam_token: str, local_file_path: str) -> str:
+
+    async with speechkit.guard():
+        resp = await get_async_client().post(
+            settings.STT_RECOGNIZE_URL,
+            params=params,
+            headers=headers,
+            content=audio_data,
+            timeout=async_timeout(settings.STT_SYNC_TIMEOUT_SECONDS)
+        )
+        if resp.status_code != 200:
+            logger.error(f"STT recognize error {resp.status_code}: {resp.text}")
+            resp.raise_for_status()
+
+    return resp.json().get("result", "")
+
+
+def fits_sync_recognition(audio_data: bytes, audio_duration: Optional[float]) -> bool:
+    return (
+        settings.STT_SYNC_ENABLED
+        and audio_duration is not None
+        and audio_duration <= settings.STT_SYNC_MAX_DURATION_SECONDS
+        and len(audio_data) <= settings.STT_SYNC_MAX_BYTES
+    )
+
+
+async def get_transcription_result(iam_token: str, operation_id: str, audio_duration: Optional[float] = None) -> str:
     """
-    Основная функция: загружает файл, запускает распознавание и возвращает текст.
+    Ожидает завершения распознавания и возвращает текст.
+    Опрос выполняет общий асинхронный поллер, интервалы зависят от длительности аудио.
     """
-    print("[INFO] Загружаю файл в Object Storage...")
-    audio_uri = upload_to_bucket(local_file_path)
+    return await asyncio.wrap_future(transcription_poller.submit(iam_token, operation_id, audio_duration))
+
+
+async def transcribe_audio(
+    iam_token: str,
+    audio_data: bytes,
+    audio_duration: Optional[float] = None,
+    segments: Optional[List[Tuple[bytes, float]]] = None
+) -> str:
+    """
+    Основная функция: загружает OGG Opus, запускает распознавание и возвращает текст.
+    Если запись заранее разрезана по паузам (segments: OGG Opus и длительность
+    каждой части), части распознаются параллельно и склеиваются по порядку.
+    """
+    if segments and len(segments) > 1:
+        return await transcribe_segments(iam_token, segments)
+    return await _transcribe_single(iam_token, audio_data, audio_duration)
+
 
-    print("[INFO] Отправляю на распознавание...")
-    operation_id = start_transcription(iam_token, audio_uri)
+async def transcribe_segments(iam_token: str, segments: List[Tuple[bytes, float]]) -> str:
+    """Не больше STT_MAX_PARALLEL_SEGMENTS частей одновременно; время - как у самой долгой части"""
+    slots = asyncio.Semaphore(settings.STT_MAX_PARALLEL_SEGMENTS)
 
-    print("[INFO] Жду результат...")
-    transcript = get_transcription_result(iam_token, operation_id)
+    async def transcribe_segment(audio_data: bytes, duration: float) -> str:
+        async with slots:
+            return await _transcribe_single(iam_token, audio_data, duration)
+
+    logger.info(f"Transcribing {len(segments)} segments, up to {settings.STT_MAX_PARALLEL_SEGMENTS} in parallel")
+    parts = await asyncio.gather(*(transcribe_segment(data, duration) for data, duration in segments))
+    return " ".join(part.strip() for part in parts if part and part.strip())
+
+
+async def _transcribe_single(iam_token: str, audio_data: bytes, audio_duration: Optional[float] = None) -> str:
+    """
+    Одна запись или часть. Короткие (по длительности, посчитанной на сервере)
+    распознаются синхронно, остальные - через Object Storage и longRunningRecognize.
+    """
+    if fits_sync_recognition(audio_data, audio_duration):
+        logger.info(f"Using synchronous recognition for {audio_duration:.1f}s clip")
+        with track_stage("stt_recognize"):
+            transcript = await recognize_short_audio(iam_token, audio_data)
+        logger.info(f"Transcript: {transcript}")
+        return transcript
+
+    logger.info("Uploading audio to Object Storage")
+    with track_stage("s3_upload"):
+        object_name = await upload_to_bucket(audio_data)
+
+    logger.info(f"Starting long-running recognition for {object_name}")
+    with track_stage("stt_start"):
+        operation_id = await start_transcription(iam_token, object_url(object_name))
+
+    logger.info(f"Waiting for recognition operation {operation_id}")
+    with track_stage("stt_wait"):
+        transcript = await get_transcription_result(iam_token, operation_id, audio_duration)
+
+    # Операция завершена - объект больше не нужен. Если распознавание упало,
+    # объект удалит периодическая очистка (sweep_stale_objects)
+    await delete_object(object_name)
     
     logger.info(f"Transcript: {transcript}")
-
-    print("[INFO] Готово!")
     return transcript
\ No newline at end of file
@@ -0,0 +1,183 @@
+"""
+Пул транскодирования на ffmpeg.
+
+Байты из памяти подаются в stdin, файл ffmpeg читает сам (ему нужен произвольный
+доступ: в MP4/M4A индекс moov часто лежит в конце файла). Результат читается из
+stdout - без промежуточных файлов.
+Число одновременно запущенных ffmpeg ограничено (по умолчанию - числом CPU),
+остальные вызовы ждут в очереди.
+"""
+import logging
+import os
+import subprocess
+import threading
+from contextlib import contextmanager
+from typing import Dict, List, Optional
+
+from app.config import settings
+from app.metrics import TRANSCODES_ACTIVE, TRANSCODES_QUEUED
+
+logger = logging.getLogger(__name__)
+
+
+class TranscodeError(RuntimeError):
+    pass
+
+
+class TranscoderPool:
+    def __init__(self, max_workers: Optional[int] = None, timeout: Optional[float] = None):
+        self.max_workers = max_workers or os.cpu_count() or 1
+        self.timeout = timeout
+        self._slots = threading.BoundedSemaphore(self.max_workers)
+        self._lock = threading.Lock()
+        self._waiting = 0
+        self._active = 0
+        self._completed = 0
+        self._failed = 0
+
+    @contextmanager
+    def _slot(self):
+        with self._lock:
+            self._waiting += 1
+        TRANSCODES_QUEUED.inc()
+        try:
+            self._slots.acquire()
+        finally:
+            with self._lock:
+                self._waiting -= 1
+            TRANSCODES_QUEUED.dec()
+        with self._lock:
+            self._active += 1
+        TRANSCODES_ACTIVE.inc()
+        try:
+            yield
+        finally:
+            with self._lock:
+                self._active -= 1
+            TRANSCODES_ACTIVE.dec()
+            self._slots.release()
+
+    def run(
+        self,
+        output_args: List[str],
+        input_path: Optional[str] = None,
+        input_data: Optional[bytes] = None,
+        input_args: Optional[List[str]] = None
+    ) -> bytes:
+        """
+        Запускает ffmpeg: вход из файла по пути или из байтов через stdin, выход - байты из stdout.
+        output_args должен содержать формат вывода (-f ...), так как у pipe нет расширения.
+        """
+        if (input_path is None) == (input_data is None):
+            raise ValueError("Exactly one of input_path and input_data must be provided")
+
+        cmd = [
+            "ffmpeg", "-hide_banner", "-loglevel", "error",
+            *(input_args or []),
+            # file: - чтобы имя файла не разбиралось как протокол или опция
+            "-i", f"file:{input_path}" if input_path is not None else "pipe:0",
+            *output_args,
+            "pipe:1"
+        ]
+
+        with self._slot():
+            proc = subprocess.Popen(
+                cmd,
+                stdin=subprocess.PIPE if input_data is not None else subprocess.DEVNULL,
+                stdout=subprocess.PIPE,
+                stderr=subprocess.PIPE
+            )
+            try:
+                stdout, stderr = proc.communicate(input=input_data, timeout=self.timeout)
+            except subprocess.TimeoutExpired:
+                proc.kill()
+                proc.communicate()
+                self._record_result(False)
+                raise TranscodeError(f"ffmpeg timed out after {self.timeout}s")
+
+        if proc.returncode != 0:
+            self._record_result(False)
+            logger.error(f"ffmpeg failed with code {proc.returncode}: {stderr.decode(errors='replace').strip()}")
+            logger.error(f"Command: {' '.join(cmd)}")
+            raise TranscodeError(f"ffmpeg exited with code {proc.returncode}")
+
+        self._record_result(True)
+        return stdout
+
+    def _record_result(self, success: bool):
+        with self._lock:
+            if success:
+                self._completed += 1
+            else:
+                self._failed += 1
+
+    def stats(self) -> Dict[str, int]:
+        with self._lock:
+            return {
+                "max_workers": self.max_workers,
+                "active": self._active,
+                "queue_depth": self._waiting,
+                "completed": self._completed,
+                "failed": self._failed
+            }
+
+
+transcoder_pool = TranscoderPool(
+    max_workers=settings.TRANSCODER_MAX_WORKERS,
+    timeout=settings.TRANSCODE_TIMEOUT_SECONDS
+)
+
+
+def encode_ogg_opus(input_path: Optional[str] = None, input_data: Optional[bytes] = None,
+                    bitrate: str = "64k", input_args: Optional[List[str]] = None) -> bytes:
+    """Кодирует аудио в OGG Opus с настройками под распознавание речи"""
+    return transcoder_pool.run(
+        [
+            "-vn",
+            "-c:a", "libopus",
+            "-b:a", bitrate,
+            "-application", "voip",
+            "-frame_duration", "60",
+            "-f", "ogg"
+        ],
+        input_path=input_path,
+        input_data=input_data,
+        input_args=input_args
+    )
+
+
+def remux_ogg_opus(input_path: Optional[str] = None, input_data: Optional[bytes] = None) -> bytes:
+    """
+    Переупаковывает Opus (например, из WebM) в OGG без перекодирования:
+    пакеты копируются как есть, поэтому это в разы дешевле encode_ogg_opus.
+    """
+    return transcoder_pool.run(
+        [
+            "-vn",
+            "-c:a", "copy",
+            "-f", "ogg"
+        ],
+        input_path=input_path,
+        input_data=input_data
+    )
+
+
+def pcm_input_args(sample_rate: int) -> List[str]:
+    """Аргументы ffmpeg для входа PCM s16le моно"""
+    return ["-f", "s16le", "-ar", str(sample_rate), "-ac", "1"]
+
+
+def decode_pcm(input_path: Optional[str] = None, input_data: Optional[bytes] = None,
+               sample_rate: int = 16000) -> bytes:
+    """Декодирует аудио в PCM s16le моно (для анализа сигнала, например VAD)"""
+    return transcoder_pool.run(
+        [
+            "-vn",
+            "-ac", "1",
+            "-ar", str(sample_rate),
+            "-c:a", "pcm_s16le",
+            "-f", "s16le"
+        ],
+        input_path=input_path,
+        input_data=input_data
+    )
@@ -0,0 +1,70 @@
+"""
+Определение формата аудио по первым байтам файла, а не по расширению.
+
+Браузерный MediaRecorder пишет Opus в WebM, и имя файла не всегда
+соответствует содержимому. Если кодек уже Opus, поток достаточно
+переупаковать в OGG без перекодирования (-c:a copy).
+"""
+from dataclasses import dataclass
+from typing import Optional
+
+# Первых килобайт достаточно: заголовки контейнера и описание дорожек в начале файла
+SNIFF_BYTES = 4096
+
+_EBML_MAGIC = b"\x1a\x45\xdf\xa3"
+
+
+@dataclass(frozen=True)
+class AudioFormat:
+    container: str  # ogg, webm, matroska, wav, mp3, mp4, flac
+    codec: Optional[str] = None  # opus, vorbis, pcm, ... None - не удалось определить
+
+    @property
+    def is_opus(self) -> bool:
+        return self.codec == "opus"
+
+
+def _wav_codec(header: bytes) -> Optional[str]:
+    # fmt-чанк обычно сразу после RIFF-заголовка; audio format: 1 - PCM, 3 - float
+    pos = header.find(b"fmt ")
+    if pos == -1 or len(header) < pos + 10:
+        return None
+    audio_format = int.from_bytes(header[pos + 8:pos + 10], "little")
+    return {1: "pcm", 3: "pcm_float", 0xFFFE: "pcm"}.get(audio_format, "other")
+
+
+def sniff_audio_format(header: bytes) -> Optional[AudioFormat]:
+    """Формат по первым SNIFF_BYTES байтам; None - если формат неизвестен"""
+    if header.startswith(b"OggS"):
+        if b"OpusHead" in header:
+            return AudioFormat("ogg", "opus")
+        if b"\x01vorbis" in header:
+            return AudioFormat("ogg", "vorbis")
+        return AudioFormat("ogg")
+
+    if header.startswith(_EBML_MAGIC):
+        container = "webm" if b"webm" in header[:64] else "matroska"
+        if b"A_OPUS" in header:
+            return AudioFormat(container, "opus")
+        if b"A_VORBIS" in header:
+            return AudioFormat(container, "vorbis")
+        return AudioFormat(container)
+
+    if header[:4] == b"RIFF" and header[8:12] == b"WAVE":
+        return AudioFormat("wav", _wav_codec(header))
+
+    if header.startswith(b"fLaC"):
+        return AudioFormat("flac", "flac")
+
+    if header[4:8] == b"ftyp":
+        return AudioFormat("mp4", "opus" if b"Opus" in header else None)
+
+    if header.startswith(b"ID3") or (len(header) > 1 and header[0] == 0xFF and header[1] & 0xE0 == 0xE0):
+        return AudioFormat("mp3", "mp3")
+
+    return None
+
+
+def sniff_file(path: str) -> Optional[AudioFormat]:
+    with open(path, "rb") as f:
+        return sniff_audio_format(f.read(SNIFF_BYTES))
@@ -1,3 +1,4 @@
+import hashlib
 import os
 
 def load_prompt(file_path: str) -> str:
@@ -5,4 +6,18 @@ def load_prompt(file_path: str) -> str:
         with open(file_path, 'r', encoding='utf-8') as f:
             return f.read().strip()
     except Exception as e:
-        raise Exception(f"Failed to load prompt from {file_path}: {str(e)}")
\ No newline at end of file
+        raise Exception(f"Failed to load prompt from {file_path}: {str(e)}")
+
+
+def sha256_file(file_path: str, chunk_size: int = 64 * 1024) -> str:
+    hasher = hashlib.sha256()
+    with open(file_path, "rb") as f:
+        for chunk in iter(lambda: f.read(chunk_size), b""):
+            hasher.update(chunk)
+    return hasher.hexdigest()
+
+
+class UploadTooLargeError(Exception):
+    def __init__(self, max_bytes: int):
+        super().__init__(f"Upload exceeds {max_bytes} bytes")
+        self.max_bytes = max_bytes
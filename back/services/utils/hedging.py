@@ -0,0 +1,152 @@
+"""
+Повторы с decorrelated jitter и хеджирование запросов.
+
+Хеджирование: если ответ не пришёл за время, которое обычно укладывается
+в p95 задержек, отправляется второй такой же запрос и берётся тот ответ,
+что придёт первым. Чтобы не удваивать нагрузку на API, хеджи ограничены
+бюджетом: каждый обычный запрос добавляет budget_ratio жетона, хедж тратит
+один жетон.
+
+Состояние общее для всех потоков и циклов событий процесса, поэтому
+защищено threading.Lock.
+"""
+import asyncio
+import random
+import threading
+from collections import deque
+from typing import Any, Awaitable, Callable, Dict, Optional, Tuple
+
+import numpy as np
+
+
+def decorrelated_jitter(previous: float, base: float, cap: float) -> float:
+    """Следующая пауза перед повтором: случайная в [base, 3 * previous], не больше cap"""
+    return min(cap, random.uniform(base, max(base, previous * 3)))
+
+
+class LatencyTracker:
+    """Задержки последних успешных вызовов в скользящем окне"""
+
+    def __init__(self, window_size: int, min_samples: int):
+        self.min_samples = min_samples
+        self._lock = threading.Lock()
+        self._samples: deque = deque(maxlen=window_size)
+
+    def record(self, seconds: float):
+        with self._lock:
+            self._samples.append(seconds)
+
+    def percentile(self, q: float) -> Optional[float]:
+        """None, пока замеров меньше min_samples"""
+        with self._lock:
+            if len(self._samples) < self.min_samples:
+                return None
+            samples = list(self._samples)
+        return float(np.percentile(samples, q))
+
+    def stats(self) -> Dict[str, Any]:
+        p50, p95 = self.percentile(50), self.percentile(95)
+        with self._lock:
+            samples = len(self._samples)
+        return {
+            "samples": samples,
+            "p50_seconds": round(p50, 3) if p50 is not None else None,
+            "p95_seconds": round(p95, 3) if p95 is not None else None
+        }
+
+
+class HedgeBudget:
+    def __init__(self, budget_ratio: float, max_tokens: float = 10.0):
+        self.budget_ratio = budget_ratio
+        self.max_tokens = max_tokens
+        self._lock = threading.Lock()
+        self._tokens = 0.0
+
+    def on_request(self):
+        with self._lock:
+            self._tokens = min(self.max_tokens, self._tokens + self.budget_ratio)
+
+    def try_spend(self) -> bool:
+        with self._lock:
+            if self._tokens < 1.0:
+                return False
+            self._tokens -= 1.0
+            return True
+
+
+class CallStats:
+    """
+    Счётчики попыток, повторов и хеджей. Если передан counter (Prometheus Counter
+    с меткой event), значения дублируются в него.
+    """
+
+    _FIELDS = ("calls", "attempts", "retries", "hedges", "hedge_wins", "hedges_over_budget")
+
+    def __init__(self, counter=None):
+        self._lock = threading.Lock()
+        self._counters = dict.fromkeys(self._FIELDS, 0)
+        self._counter = counter
+
+    def inc(self, name: str, value: int = 1):
+        with self._lock:
+            self._counters[name] += value
+        if self._counter is not None:
+            self._counter.labels(event=name).inc(value)
+
+    def stats(self) -> Dict[str, int]:
+        with self._lock:
+            return dict(self._counters)
+
+
+async def hedged(
+    call: Callable[[], Awaitable[Any]],
+    delay: float,
+    budget: HedgeBudget,
+    stats: CallStats,
+    discard: Optional[Callable[[Any], Awaitable[None]]] = None
+) -> Tuple[Any, bool]:
+    """
+    Вызывает call(); если ответа нет через delay секунд и бюджет позволяет,
+    запускает второй call() и возвращает первый успешный результат.
+    Возвращает (результат, победил ли хедж). Проигравший запрос отменяется;
+    если он тоже успел завершиться, его результат передаётся в discard
+    (например, чтобы закрыть открытый поток ответа).
+    """
+    primary = asyncio.ensure_future(call())
+    tasks = [primary]
+    winner = None
+    try:
+        done, _ = await asyncio.wait({primary}, timeout=delay)
+        if done:
+            winner = primary
+            return primary.result(), False
+
+        if not budget.try_spend():
+            stats.inc("hedges_over_budget")
+            result = await primary
+            winner = primary
+            return result, False
+
+        stats.inc("hedges")
+        hedge = asyncio.ensure_future(call())
+        tasks.append(hedge)
+        pending = set(tasks)
+        error = None
+        while pending:
+            done, pending = await asyncio.wait(pending, return_when=asyncio.FIRST_COMPLETED)
+            for task in done:
+                if task.exception() is None:
+                    winner = task
+                    if task is hedge:
+                        stats.inc("hedge_wins")
+                    return task.result(), task is hedge
+                error = task.exception()
+        raise error
+    finally:
+        # Проигравший запрос и запросы, прерванные снаружи (wait_for), отменяем
+        for task in tasks:
+            if not task.done():
+                task.cancel()
+            elif discard is not None and task is not winner and \
+                    not task.cancelled() and task.exception() is None:
+                await discard(task.result())
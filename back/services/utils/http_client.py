@@ -0,0 +1,167 @@
+"""
+Общий HTTP-клиент для исходящих запросов в Yandex Cloud (LLM, SpeechKit, IAM).
+
+Одна сессия на процесс: keep-alive соединения переиспользуются из пула для
+каждого хоста, поэтому TCP+TLS рукопожатие не повторяется на каждый вызов.
+У всех запросов есть таймауты на соединение и чтение. Идемпотентные запросы
+(GET, HEAD, PUT, DELETE, OPTIONS) повторяются при 429/5xx и сетевых ошибках.
+"""
+import asyncio
+import threading
+import weakref
+from typing import Optional, Tuple, Union
+
+import httpx
+import requests
+from requests.adapters import HTTPAdapter
+from urllib3.util.retry import Retry
+
+from app.config import settings
+from app.metrics import count_outbound
+
+Timeout = Union[float, Tuple[float, float]]
+
+_IDEMPOTENT_METHODS = frozenset({"GET", "HEAD", "PUT", "DELETE", "OPTIONS"})
+_RETRY_STATUSES = (429, 500, 502, 503, 504)
+_MAX_RETRY_DELAY_SECONDS = 10.0
+
+_session: Optional[requests.Session] = None
+_session_lock = threading.Lock()
+
+# Асинхронный клиент привязан к циклу событий: по одному на цикл
+_async_clients: "weakref.WeakKeyDictionary[asyncio.AbstractEventLoop, httpx.AsyncClient]" = weakref.WeakKeyDictionary()
+
+
+def _build_session() -> requests.Session:
+    retry = Retry(
+        total=settings.HTTP_MAX_RETRIES,
+        backoff_factor=settings.HTTP_RETRY_BACKOFF_SECONDS,
+        status_forcelist=_RETRY_STATUSES,
+        allowed_methods=_IDEMPOTENT_METHODS,
+        respect_retry_after_header=True,
+        raise_on_status=False
+    )
+    adapter = HTTPAdapter(
+        pool_connections=settings.HTTP_POOL_CONNECTIONS,
+        pool_maxsize=settings.HTTP_POOL_MAXSIZE,
+        max_retries=retry
+    )
+
+    session = requests.Session()
+    session.mount("https://", adapter)
+    session.mount("http://", adapter)
+    session.hooks["response"].append(_count_sync_response)
+    return session
+
+
+def _count_sync_response(response: requests.Response, *args, **kwargs):
+    count_outbound(response.url, response.status_code)
+
+
+async def _count_async_response(response: httpx.Response):
+    count_outbound(response.request.url, response.status_code)
+
+
+def get_session() -> requests.Session:
+    global _session
+    if _session is None:
+        with _session_lock:
+            if _session is None:
+                _session = _build_session()
+    return _session
+
+
+def default_timeout(read_timeout: Optional[float] = None) -> Tuple[float, float]:
+    return (settings.HTTP_CONNECT_TIMEOUT_SECONDS, read_timeout or settings.HTTP_READ_TIMEOUT_SECONDS)
+
+
+def async_timeout(read_timeout: Optional[float] = None) -> httpx.Timeout:
+    connect_timeout, read_timeout = default_timeout(read_timeout)
+    return httpx.Timeout(read_timeout, connect=connect_timeout)
+
+
+def request(method: str, url: str, timeout: Optional[Timeout] = None, **kwargs) -> requests.Response:
+    return get_session().request(method, url, timeout=timeout or default_timeout(), **kwargs)
+
+
+def get(url: str, **kwargs) -> requests.Response:
+    return request("GET", url, **kwargs)
+
+
+def post(url: str, **kwargs) -> requests.Response:
+    return request("POST", url, **kwargs)
+
+
+def _retry_delay(response: httpx.Response, retry: int) -> float:
+    """Как у urllib3 Retry: экспоненциальная пауза или Retry-After, если он больше"""
+    delay = settings.HTTP_RETRY_BACKOFF_SECONDS * (2 ** retry)
+    try:
+        delay = max(delay, float(response.headers.get("Retry-After")))
+    except (TypeError, ValueError):
+        pass
+    return min(delay, _MAX_RETRY_DELAY_SECONDS)
+
+
+class _StatusRetryTransport(httpx.AsyncBaseTransport):
+    """
+    Повторяет идемпотентные запросы при 429/5xx - то же, что Retry в сессии
+    requests. Запросы с потоковым телом не повторяются: его нельзя отправить второй раз.
+    """
+
+    def __init__(self, transport: httpx.AsyncBaseTransport, retries: int):
+        self._transport = transport
+        self._retries = retries
+
+    async def handle_async_request(self, request: httpx.Request) -> httpx.Response:
+        retryable = request.method in _IDEMPOTENT_METHODS and isinstance(request.stream, httpx.ByteStream)
+        retry = 0
+        while True:
+            response = await self._transport.handle_async_request(request)
+            if not retryable or retry >= self._retries or response.status_code not in _RETRY_STATUSES:
+                return response
+            delay = _retry_delay(response, retry)
+            await response.aclose()
+            retry += 1
+            await asyncio.sleep(delay)
+
+    async def aclose(self):
+        await self._transport.aclose()
+
+
+def create_async_client(read_timeout: Optional[float] = None) -> httpx.AsyncClient:
+    """
+    Асинхронный клиент с теми же лимитами пула, таймаутами и повторами.
+    Клиент привязан к циклу событий, поэтому создаётся владельцем цикла.
+    """
+    # Лимиты задаются транспорту: при явном transport параметр limits клиента не действует
+    return httpx.AsyncClient(
+        timeout=async_timeout(read_timeout),
+        transport=_StatusRetryTransport(
+            httpx.AsyncHTTPTransport(
+                limits=httpx.Limits(
+                    max_connections=settings.HTTP_POOL_MAXSIZE * settings.HTTP_POOL_CONNECTIONS,
+                    max_keepalive_connections=settings.HTTP_POOL_MAXSIZE
+                ),
+                retries=settings.HTTP_MAX_RETRIES  # ошибки установки соединения
+            ),
+            retries=settings.HTTP_MAX_RETRIES
+        ),
+        event_hooks={"response": [_count_async_response]}
+    )
+
+
+def get_async_client() -> httpx.AsyncClient:
+    """Общий асинхронный клиент текущего цикла событий"""
+    loop = asyncio.get_running_loop()
+    client = _async_clients.get(loop)
+    if client is None or client.is_closed:
+        client = create_async_client()
+        _async_clients[loop] = client
+    return client
+
+
+async def close_async_client():
+    """Закрывает клиент текущего цикла (при остановке приложения или потока воркера)"""
+    client = _async_clients.pop(asyncio.get_running_loop(), None)
+    if client is not None:
+        await client.aclose()
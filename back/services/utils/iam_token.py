@@ -1,26 +1,197 @@
+import asyncio
+import json
 import jwt
+import logging
+import os
+import re
+import tempfile
+import threading
 import time
-import requests
+from datetime import datetime
+from typing import Optional, Tuple
 from app.config import settings
+from . import http_client
+from .resilience import iam
 
-def get_iam_token() -> str:    
+try:
+    import fcntl
+except ImportError:  # Windows: межпроцессная блокировка недоступна
+    fcntl = None
+
+logger = logging.getLogger(__name__)
+
+
+def _parse_expires_at(value: Optional[str]) -> float:
+    """expiresAt приходит в RFC 3339 с наносекундами - обрезаем до микросекунд"""
+    if not value:
+        return time.time() + settings.IAM_TOKEN_DEFAULT_TTL_SECONDS
+    value = re.sub(r"(\.\d{6})\d+", r"\1", value).replace("Z", "+00:00")
+    return datetime.fromisoformat(value).timestamp()
+
+
+def request_iam_token() -> Tuple[str, float]:
+    """Обменивает подписанный PS256 JWT сервисного аккаунта на IAM-токен"""
     now = int(time.time())
     payload = {
-        'aud': 'https://iam.api.cloud.yandex.net/iam/v1/tokens',
+        'aud': settings.IAM_TOKEN_URL,
         'iss': settings.SERVICE_ACCOUNT_ID,
         'iat': now,
         'exp': now + 3600
     }
-    
+
     encoded_token = jwt.encode(
         payload,
         settings.PRIVATE_KEY,
         algorithm='PS256',
         headers={'kid': settings.KEY_ID}
     )
-    
-    response = requests.post('https://iam.api.cloud.yandex.net/iam/v1/tokens', 
-                           json={'jwt': encoded_token})
-    response.raise_for_status()
-    
-    return response.json()['iamToken']
\ No newline at end of file
+
+    with iam.breaker.track():
+        response = http_client.post(settings.IAM_TOKEN_URL, json={'jwt': encoded_token})
+        response.raise_for_status()
+
+    data = response.json()
+    return data['iamToken'], _parse_expires_at(data.get('expiresAt'))
+
+
+class IamTokenProvider:
+    """
+    Кэширует IAM-токен до истечения и обновляет его заранее в фоне.
+    Одновременные обновления схлопываются в одно; при заданном cache_file
+    токен разделяется между процессами (например, воркерами uvicorn).
+    """
+
+    def __init__(self, refresh_ahead_seconds: float, min_validity_seconds: float, cache_file: Optional[str] = None):
+        self.refresh_ahead_seconds = refresh_ahead_seconds
+        self.min_validity_seconds = min_validity_seconds
+        self.cache_file = cache_file
+        self._token: Optional[str] = None
+        self._expires_at = 0.0
+        self._refresh_lock = threading.Lock()
+        self._state_lock = threading.Lock()
+        self._background_refresh = False
+
+    def _is_usable(self, expires_at: float) -> bool:
+        return time.time() < expires_at - self.min_validity_seconds
+
+    def _is_fresh(self, expires_at: float) -> bool:
+        return time.time() < expires_at - self.refresh_ahead_seconds
+
+    def get_token(self) -> str:
+        token, expires_at = self._token, self._expires_at
+
+        if token and self._is_fresh(expires_at):
+            return token
+
+        if token and self._is_usable(expires_at):
+            # Токен ещё действует: отдаём его, а новый получаем в фоне
+            self._start_background_refresh()
+            return token
+
+        with self._refresh_lock:
+            if not (self._token and self._is_usable(self._expires_at)):
+                self._refresh()
+            return self._token
+
+    async def get_token_async(self) -> str:
+        """
+        Для async-кода: действующий токен отдаётся без ожидания, а редкий
+        синхронный обмен JWT (с блокировками) выполняется в отдельном потоке.
+        """
+        token, expires_at = self._token, self._expires_at
+
+        if token and self._is_fresh(expires_at):
+            return token
+
+        if token and self._is_usable(expires_at):
+            self._start_background_refresh()
+            return token
+
+        return await asyncio.to_thread(self.get_token)
+
+    def _start_background_refresh(self):
+        with self._state_lock:
+            if self._background_refresh:
+                return
+            self._background_refresh = True
+        threading.Thread(target=self._refresh_in_background, name="iam-token-refresh", daemon=True).start()
+
+    def _refresh_in_background(self):
+        try:
+            with self._refresh_lock:
+                if not self._is_fresh(self._expires_at):
+                    self._refresh()
+        except Exception as e:
+            logger.error(f"Background IAM token refresh failed: {str(e)}")
+        finally:
+            with self._state_lock:
+                self._background_refresh = False
+
+    def _refresh(self):
+        if self._adopt_shared_token():
+            return
+
+        lock_file = self._lock_shared_cache()
+        try:
+            # Пока ждали блокировку, токен мог обновить другой процесс
+            if self._adopt_shared_token():
+                return
+
+            token, expires_at = request_iam_token()
+            self._token, self._expires_at = token, expires_at
+            self._write_shared_token(token, expires_at)
+            logger.info(f"IAM token refreshed, expires at {datetime.fromtimestamp(expires_at).isoformat()}")
+        finally:
+            if lock_file:
+                fcntl.flock(lock_file, fcntl.LOCK_UN)
+                lock_file.close()
+
+    def _lock_shared_cache(self):
+        if not self.cache_file or not fcntl:
+            return None
+        lock_file = open(f"{self.cache_file}.lock", "a")
+        fcntl.flock(lock_file, fcntl.LOCK_EX)
+        return lock_file
+
+    def _adopt_shared_token(self) -> bool:
+        if not self.cache_file:
+            return False
+        try:
+            with open(self.cache_file, "r") as f:
+                data = json.load(f)
+        except (OSError, ValueError):
+            return False
+
+        if not self._is_fresh(data.get("expires_at", 0)):
+            return False
+
+        self._token, self._expires_at = data["iam_token"], data["expires_at"]
+        return True
+
+    def _write_shared_token(self, token: str, expires_at: float):
+        if not self.cache_file:
+            return
+        try:
+            directory = os.path.dirname(os.path.abspath(self.cache_file))
+            fd, tmp_path = tempfile.mkstemp(dir=directory, prefix=".iam_token_")
+            with os.fdopen(fd, "w") as f:
+                json.dump({"iam_token": token, "expires_at": expires_at}, f)
+            os.chmod(tmp_path, 0o600)
+            os.replace(tmp_path, self.cache_file)
+        except OSError as e:
+            logger.warning(f"Could not write shared IAM token cache: {str(e)}")
+
+
+iam_token_provider = IamTokenProvider(
+    refresh_ahead_seconds=settings.IAM_TOKEN_REFRESH_AHEAD_SECONDS,
+    min_validity_seconds=settings.IAM_TOKEN_MIN_VALIDITY_SECONDS,
+    cache_file=settings.IAM_TOKEN_CACHE_FILE
+)
+
+
+def get_iam_token() -> str:
+    return iam_token_provider.get_token()
+
+
+async def get_iam_token_async() -> str:
+    return await iam_token_provider.get_token_async()
@@ -0,0 +1,33 @@
+"""
+Локальное исправление JSON из ответов LLM.
+
+Модель иногда оборачивает ответ в markdown-блок (после удаления обратных
+кавычек в call_gpt от него остаётся метка "json"), добавляет текст до или
+после объекта и оставляет запятые перед закрывающей скобкой.
+"""
+import json
+import re
+from typing import Any
+
+# Строки пропускаем целиком, чтобы не трогать запятые внутри текста
+_TRAILING_COMMA = re.compile(r'("(?:\\.|[^"\\])*")|,(\s*[}\]])')
+_FENCE = re.compile(r"^json\s*\n", re.IGNORECASE)
+
+
+def repair_json(text: str) -> str:
+    """Убирает обёртку и висячие запятые; возвращает текст JSON-объекта"""
+    text = _FENCE.sub("", text.replace("```", "").strip())
+
+    start, end = text.find("{"), text.rfind("}")
+    if start != -1 and end > start:
+        text = text[start:end + 1]
+
+    return _TRAILING_COMMA.sub(lambda m: m.group(1) or m.group(2), text)
+
+
+def parse_llm_json(text: str) -> Any:
+    """json.loads с исправлением ответа, если он не разобрался как есть"""
+    try:
+        return json.loads(text)
+    except ValueError:
+        return json.loads(repair_json(text))
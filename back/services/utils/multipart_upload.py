@@ -0,0 +1,240 @@
+"""
+Потоковый приём multipart/form-data прямо из request.stream().
+
+request.form() в Starlette сначала складывает всё тело во временный файл,
+и только потом его можно прочитать: лимит размера не проверяется, пока
+байты идут из сети, а файл пишется на диск дважды. Здесь тело разбирается
+по мере поступления (python-multipart): файл сразу пишется в каталог
+обработки, лимит и SHA-256 считаются по каждому чанку, а запись на диск
+выполняется в потоке, чтобы не блокировать цикл событий.
+"""
+import asyncio
+import hashlib
+import os
+import uuid
+from dataclasses import dataclass, field
+from typing import AsyncIterator, BinaryIO, Dict, List, Optional
+
+from python_multipart.multipart import MultipartParser, parse_options_header
+
+from .file_utils import UploadTooLargeError
+
+# Текстовые поля (duration) и части, которые не нужны, - в памяти не больше этого
+MAX_FIELD_BYTES = 64 * 1024
+MAX_PARTS = 16
+
+
+class MultipartUploadError(ValueError):
+    """Тело запроса - не multipart/form-data или в нём нет нужного поля"""
+
+
+class UploadContentTypeError(MultipartUploadError):
+    """Content-Type загружаемого файла не подходит"""
+
+
+@dataclass
+class ReceivedUpload:
+    path: str
+    size: int
+    sha256: str
+    filename: Optional[str]
+    content_type: Optional[str]
+    fields: Dict[str, str] = field(default_factory=dict)
+
+
+@dataclass
+class _Part:
+    headers: Dict[bytes, bytes] = field(default_factory=dict)
+    name: Optional[str] = None
+    is_file: bool = False
+    data: bytearray = field(default_factory=bytearray)
+
+
+def _write_block(out: BinaryIO, hasher, block: bytes):
+    hasher.update(block)
+    out.write(block)
+
+
+class _UploadReceiver:
+    def __init__(self, dest_dir: str, max_bytes: int, file_field: str, content_type_prefix: str, buffer_size: int):
+        self.dest_dir = dest_dir
+        self.max_bytes = max_bytes
+        self.file_field = file_field
+        self.content_type_prefix = content_type_prefix
+        self.buffer_size = buffer_size
+
+        self.fields: Dict[str, str] = {}
+        self.path: Optional[str] = None
+        self.filename: Optional[str] = None
+        self.content_type: Optional[str] = None
+        self.size = 0
+        self.hasher = hashlib.sha256()
+
+        self._parts = 0
+        self._part = _Part()
+        self._header_name = b""
+        self._header_value = b""
+        # Колбэки парсера синхронные: данные файла копятся здесь и пишутся после parser.write()
+        self._pending: List[bytes] = []
+        self._pending_size = 0
+        self._out: Optional[BinaryIO] = None
+        self.finished = False
+
+    # Колбэки python-multipart
+
+    def on_part_begin(self):
+        self._parts += 1
+        if self._parts > MAX_PARTS:
+            raise MultipartUploadError(f"Too many form parts, maximum is {MAX_PARTS}")
+        self._part = _Part()
+
+    def on_header_field(self, data: bytes, start: int, end: int):
+        self._header_name += data[start:end]
+
+    def on_header_value(self, data: bytes, start: int, end: int):
+        self._header_value += data[start:end]
+
+    def on_header_end(self):
+        self._part.headers[self._header_name.lower()] = self._header_value
+        self._header_name = b""
+        self._header_value = b""
+
+    def on_headers_finished(self):
+        _, options = parse_options_header(self._part.headers.get(b"content-disposition", b""))
+        if b"name" not in options:
+            raise MultipartUploadError('Form part without a "name" in Content-Disposition')
+        self._part.name = options[b"name"].decode("utf-8", "replace")
+
+        if self._part.name != self.file_field or b"filename" not in options:
+            return
+
+        if self.path is not None:
+            raise MultipartUploadError(f"Field '{self.file_field}' must contain a single file")
+        content_type = self._part.headers.get(b"content-type", b"").decode("latin-1")
+        if not content_type.startswith(self.content_type_prefix):
+            # Отказываем по заголовкам части, не принимая сам файл
+            raise UploadContentTypeError(f"File content type '{content_type}' is not allowed")
+
+        self._part.is_file = True
+        self.filename = options[b"filename"].decode("utf-8", "replace")
+        self.content_type = content_type
+        extension = os.path.splitext(os.path.basename(self.filename))[1][:16]
+        if not extension[1:].isalnum():
+            extension = ""
+        self.path = os.path.join(self.dest_dir, f"audio_{uuid.uuid4()}{extension or '.wav'}")
+
+    def on_part_data(self, data: bytes, start: int, end: int):
+        chunk = data[start:end]
+        if self._part.is_file:
+            self.size += len(chunk)
+            if self.size > self.max_bytes:
+                raise UploadTooLargeError(self.max_bytes)
+            self._pending.append(chunk)
+            self._pending_size += len(chunk)
+        else:
+            # Поля и лишние части держим в памяти, поэтому они маленькие
+            self._part.data.extend(chunk)
+            if len(self._part.data) > MAX_FIELD_BYTES:
+                raise MultipartUploadError(f"Form field '{self._part.name}' is too large")
+
+    def on_part_end(self):
+        if not self._part.is_file and self._part.name is not None:
+            self.fields[self._part.name] = self._part.data.decode("utf-8", "replace")
+
+    def on_end(self):
+        self.finished = True
+
+    # Запись файла вне цикла событий
+
+    async def flush(self, force: bool = False):
+        """Пишет накопленное, когда набрался buffer_size (или всё, если force)"""
+        if self.path is None or (self._pending_size < self.buffer_size and not force):
+            return
+        if self._out is None:
+            self._out = await asyncio.to_thread(open, self.path, "wb")
+        if self._pending:
+            block = b"".join(self._pending)
+            self._pending.clear()
+            self._pending_size = 0
+            await asyncio.to_thread(_write_block, self._out, self.hasher, block)
+
+    async def close(self):
+        if self._out is not None:
+            await asyncio.to_thread(self._out.close)
+            self._out = None
+
+    async def discard(self):
+        await self.close()
+        if self.path and os.path.exists(self.path):
+            await asyncio.to_thread(os.remove, self.path)
+
+
+def _feed(method, *args):
+    """Ошибки разбора python-multipart - это ошибки клиента"""
+    try:
+        method(*args)
+    except (MultipartUploadError, UploadTooLargeError):
+        raise
+    except Exception as e:
+        raise MultipartUploadError(f"Malformed multipart body: {str(e)}")
+
+
+async def receive_multipart_upload(
+    stream: AsyncIterator[bytes],
+    content_type: Optional[str],
+    dest_dir: str,
+    max_bytes: int,
+    file_field: str = "file",
+    content_type_prefix: str = "",
+    buffer_size: int = 64 * 1024
+) -> ReceivedUpload:
+    """
+    Разбирает multipart-тело из stream, записывая файл из поля file_field
+    в dest_dir. Остальные поля возвращаются строками в ReceivedUpload.fields.
+
+    UploadTooLargeError - файл больше max_bytes (проверяется по мере приёма),
+    UploadContentTypeError - Content-Type файла не начинается с content_type_prefix,
+    MultipartUploadError - тело не разобрать, оно обрезано или в нём нет файла.
+    При любой ошибке частично записанный файл удаляется.
+    """
+    mime_type, params = parse_options_header(content_type or "")
+    if mime_type != b"multipart/form-data" or b"boundary" not in params:
+        raise MultipartUploadError("Request body must be multipart/form-data")
+
+    receiver = _UploadReceiver(dest_dir, max_bytes, file_field, content_type_prefix, buffer_size)
+    parser = MultipartParser(params[b"boundary"], {
+        "on_part_begin": receiver.on_part_begin,
+        "on_part_data": receiver.on_part_data,
+        "on_part_end": receiver.on_part_end,
+        "on_header_field": receiver.on_header_field,
+        "on_header_value": receiver.on_header_value,
+        "on_header_end": receiver.on_header_end,
+        "on_headers_finished": receiver.on_headers_finished,
+        "on_end": receiver.on_end,
+    })
+
+    try:
+        async for chunk in stream:
+            _feed(parser.write, chunk)
+            await receiver.flush()
+
+        _feed(parser.finalize)
+        if not receiver.finished:
+            # finalize() не проверяет закрывающую границу: обрезанное тело иначе сошло бы за целое
+            raise MultipartUploadError("Multipart body is incomplete")
+        if receiver.path is None:
+            raise MultipartUploadError(f"Field '{file_field}' is required")
+        await receiver.flush(force=True)
+        await receiver.close()
+    except BaseException:
+        await receiver.discard()
+        raise
+
+    return ReceivedUpload(
+        path=receiver.path,
+        size=receiver.size,
+        sha256=receiver.hasher.hexdigest(),
+        filename=receiver.filename,
+        content_type=receiver.content_type,
+        fields=receiver.fields
+    )
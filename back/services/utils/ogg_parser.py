@@ -0,0 +1,203 @@
+"""
+Потоковый разбор контейнера Ogg с Opus.
+
+Читаются только нужные страницы: заголовки в начале файла и последняя страница
+в конце (для granule position). Память не зависит от длины записи.
+"""
+import io
+import struct
+from dataclasses import dataclass
+from typing import BinaryIO, List, NamedTuple, Optional, Union
+
+OGG_CAPTURE_PATTERN = b"OggS"
+OPUS_GRANULE_RATE = 48000  # granule position у Opus всегда в отсчётах 48 кГц
+
+_PAGE_HEADER = struct.Struct("<4sBBqIIIB")
+_FLAG_CONTINUED = 0x01
+_FLAG_BOS = 0x02
+_NO_GRANULE = -1
+_MAX_PAGE_SIZE = _PAGE_HEADER.size + 255 + 255 * 255
+_MAX_HEADER_PAGES = 32
+
+
+class InvalidOggError(ValueError):
+    pass
+
+
+def _build_crc_table() -> List[int]:
+    table = []
+    for i in range(256):
+        crc = i << 24
+        for _ in range(8):
+            crc = ((crc << 1) ^ 0x04C11DB7) if crc & 0x80000000 else (crc << 1)
+        table.append(crc & 0xFFFFFFFF)
+    return table
+
+
+_CRC_TABLE = _build_crc_table()
+
+
+def ogg_crc32(data: bytes) -> int:
+    """CRC-32 в варианте Ogg: полином 0x04C11DB7, без отражения, начальное значение 0"""
+    crc = 0
+    for byte in data:
+        crc = ((crc << 8) & 0xFFFFFFFF) ^ _CRC_TABLE[((crc >> 24) ^ byte) & 0xFF]
+    return crc
+
+
+class OggPage(NamedTuple):
+    header_type: int
+    granule_position: int
+    serial: int
+    sequence: int
+    lacing: bytes
+    body: bytes
+
+
+@dataclass
+class OggOpusInfo:
+    channels: int
+    pre_skip: int
+    input_sample_rate: int
+    granule_position: int
+
+    @property
+    def duration(self) -> float:
+        """Длительность в секундах с учётом pre-skip"""
+        return max(0, self.granule_position - self.pre_skip) / OPUS_GRANULE_RATE
+
+
+def _parse_page(header: bytes, lacing: bytes, body: bytes) -> OggPage:
+    capture, version, header_type, granule, serial, sequence, crc, _ = _PAGE_HEADER.unpack(header)
+
+    if capture != OGG_CAPTURE_PATTERN:
+        raise InvalidOggError("Missing OggS capture pattern")
+    if version != 0:
+        raise InvalidOggError(f"Unsupported Ogg version {version}")
+
+    # CRC считается по странице с обнулённым полем CRC
+    crc_input = header[:22] + b"\x00\x00\x00\x00" + header[26:] + lacing + body
+    if ogg_crc32(crc_input) != crc:
+        raise InvalidOggError(f"CRC mismatch on page {sequence}")
+
+    return OggPage(header_type, granule, serial, sequence, lacing, body)
+
+
+def read_page(f: BinaryIO) -> Optional[OggPage]:
+    """Читает одну страницу из текущей позиции. Возвращает None в конце потока."""
+    header = f.read(_PAGE_HEADER.size)
+    if not header:
+        return None
+    if len(header) < _PAGE_HEADER.size:
+        raise InvalidOggError("Truncated page header")
+
+    lacing = f.read(header[-1])
+    if len(lacing) < header[-1]:
+        raise InvalidOggError("Truncated segment table")
+
+    body_size = sum(lacing)
+    body = f.read(body_size)
+    if len(body) < body_size:
+        raise InvalidOggError("Truncated page body")
+
+    return _parse_page(header, lacing, body)
+
+
+def _page_packets(page: OggPage) -> List[tuple]:
+    """Разбивает тело страницы на куски пакетов: [(данные, пакет_завершён), ...]"""
+    parts = []
+    offset = 0
+    start = 0
+    for lace in page.lacing:
+        offset += lace
+        if lace < 255:
+            parts.append((page.body[start:offset], True))
+            start = offset
+    if start < len(page.body):
+        parts.append((page.body[start:], False))
+    return parts
+
+
+def _read_header_packets(f: BinaryIO) -> tuple:
+    """Собирает первые два пакета потока (OpusHead и OpusTags)"""
+    packets = []
+    pending = b""
+    serial = None
+
+    for index in range(_MAX_HEADER_PAGES):
+        page = read_page(f)
+        if page is None:
+            break
+
+        if index == 0:
+            if not page.header_type & _FLAG_BOS:
+                raise InvalidOggError("First page is not a beginning-of-stream page")
+            serial = page.serial
+        elif page.serial != serial:
+            continue  # страницы других логических потоков
+
+        if not page.header_type & _FLAG_CONTINUED and pending:
+            raise InvalidOggError("Packet continuation expected")
+
+        for data, complete in _page_packets(page):
+            pending += data
+            if complete:
+                packets.append(pending)
+                pending = b""
+                if len(packets) == 2:
+                    return serial, packets
+
+    raise InvalidOggError("Opus header packets not found")
+
+
+def _find_last_granule(f: BinaryIO, serial: int) -> int:
+    """Ищет последнюю корректную страницу потока, читая только хвост файла"""
+    f.seek(0, io.SEEK_END)
+    file_size = f.tell()
+    window = min(file_size, 2 * _MAX_PAGE_SIZE)
+
+    f.seek(file_size - window)
+    tail = f.read(window)
+
+    position = len(tail)
+    while True:
+        position = tail.rfind(OGG_CAPTURE_PATTERN, 0, position)
+        if position < 0:
+            break
+        try:
+            page = read_page(io.BytesIO(tail[position:]))
+        except InvalidOggError:
+            continue
+        if page and page.serial == serial and page.granule_position != _NO_GRANULE:
+            return page.granule_position
+
+    raise InvalidOggError("No final page with granule position found")
+
+
+def inspect_ogg_opus(source: Union[bytes, BinaryIO]) -> OggOpusInfo:
+    """
+    Проверяет контейнер (capture pattern, CRC, заголовки OpusHead/OpusTags)
+    и возвращает параметры потока с точной длительностью.
+    """
+    f = io.BytesIO(source) if isinstance(source, (bytes, bytearray)) else source
+    f.seek(0)
+
+    serial, (head, tags) = _read_header_packets(f)
+
+    if len(head) < 19 or not head.startswith(b"OpusHead"):
+        raise InvalidOggError("First packet is not OpusHead")
+    if not tags.startswith(b"OpusTags"):
+        raise InvalidOggError("Second packet is not OpusTags")
+
+    version, channels, pre_skip, input_sample_rate = struct.unpack_from("<BBHI", head, 8)
+    if version >> 4 != 0:
+        raise InvalidOggError(f"Unsupported Opus version {version}")
+    if channels == 0:
+        raise InvalidOggError("OpusHead declares zero channels")
+
+    return OggOpusInfo(
+        channels=channels,
+        pre_skip=pre_skip,
+        input_sample_rate=input_sample_rate,
+        granule_position=_find_last_granule(f, serial)
+    )
@@ -0,0 +1,322 @@
+"""
+Защита от деградации внешних зависимостей (SpeechKit, YandexGPT, IAM).
+
+CircuitBreaker считает исходы последних вызовов. Если доля ошибок или медленных
+вызовов превышает порог, цепь размыкается: вызовы сразу получают
+DependencyUnavailableError, а не ждут таймаутов. Через open_seconds цепь
+переходит в half-open и пропускает несколько пробных вызовов. Если они
+успешны, цепь замыкается, иначе снова размыкается.
+
+Bulkhead ограничивает число одновременных вызовов зависимости в процессе,
+чтобы медленная зависимость не заняла все соединения и задачи.
+
+Состояние общее для процесса (API или воркер с несколькими потоками и циклами
+событий), поэтому защищено threading.Lock.
+"""
+import asyncio
+import threading
+import time
+from collections import deque
+from contextlib import asynccontextmanager, contextmanager
+from typing import Any, Dict, Optional
+
+import httpx
+
+from app.config import settings
+from app.metrics import OUTBOUND_CALLS, OUTBOUND_IN_FLIGHT
+
+
+class DependencyUnavailableError(RuntimeError):
+    def __init__(self, dependency: str, reason: str, retry_after: float):
+        self.dependency = dependency
+        self.reason = reason
+        self.retry_after = max(1.0, retry_after)
+        super().__init__(f"{dependency} unavailable ({reason}), retry after {self.retry_after:.0f}s")
+
+
+def counts_as_failure(exc: BaseException) -> bool:
+    """Ошибки клиента (4xx, кроме 429) говорят о запросе, а не о состоянии зависимости"""
+    if isinstance(exc, (DependencyUnavailableError, asyncio.CancelledError)):
+        return False
+    if isinstance(exc, httpx.HTTPStatusError):
+        code = exc.response.status_code
+        return code >= 500 or code == 429
+    return True
+
+
+class CircuitBreaker:
+    CLOSED = "closed"
+    OPEN = "open"
+    HALF_OPEN = "half_open"
+
+    def __init__(
+        self,
+        name: str,
+        window_size: int,
+        min_calls: int,
+        failure_rate_threshold: float,
+        slow_call_seconds: float,
+        slow_call_rate_threshold: float,
+        open_seconds: float,
+        half_open_max_calls: int
+    ):
+        self.name = name
+        self.window_size = window_size
+        self.min_calls = min_calls
+        self.failure_rate_threshold = failure_rate_threshold
+        self.slow_call_seconds = slow_call_seconds
+        self.slow_call_rate_threshold = slow_call_rate_threshold
+        self.open_seconds = open_seconds
+        self.half_open_max_calls = half_open_max_calls
+
+        self._lock = threading.Lock()
+        self._state = self.CLOSED
+        self._window: deque = deque(maxlen=window_size)  # (failed, slow)
+        self._opened_at = 0.0
+        self._probes_in_flight = 0
+        self._probe_successes = 0
+        self._rejected = 0
+
+    def before_call(self):
+        with self._lock:
+            if self._state == self.OPEN:
+                remaining = self._opened_at + self.open_seconds - time.monotonic()
+                if remaining > 0:
+                    self._rejected += 1
+                    raise DependencyUnavailableError(self.name, "circuit open", remaining)
+                self._state = self.HALF_OPEN
+                self._probes_in_flight = 0
+                self._probe_successes = 0
+
+            if self._state == self.HALF_OPEN:
+                if self._probes_in_flight >= self.half_open_max_calls:
+                    self._rejected += 1
+                    raise DependencyUnavailableError(self.name, "circuit half-open", self.open_seconds)
+                self._probes_in_flight += 1
+
+    def cancel(self):
+        """Вызов разрешён, но так и не состоялся (например, отказал bulkhead)"""
+        with self._lock:
+            if self._state == self.HALF_OPEN:
+                self._probes_in_flight = max(0, self._probes_in_flight - 1)
+
+    def record(self, duration: float, failed: bool):
+        slow = duration >= self.slow_call_seconds
+        with self._lock:
+            if self._state == self.HALF_OPEN:
+                self._probes_in_flight = max(0, self._probes_in_flight - 1)
+                if failed or slow:
+                    self._open()
+                else:
+                    self._probe_successes += 1
+                    if self._probe_successes >= self.half_open_max_calls:
+                        self._state = self.CLOSED
+                        self._window.clear()
+                return
+
+            if self._state == self.OPEN:
+                return  # вызов начался до размыкания
+
+            self._window.append((failed, slow))
+            if len(self._window) < self.min_calls:
+                return
+            failure_rate = sum(1 for f, _ in self._window if f) / len(self._window)
+            slow_rate = sum(1 for _, s in self._window if s) / len(self._window)
+            if failure_rate >= self.failure_rate_threshold or slow_rate >= self.slow_call_rate_threshold:
+                self._open()
+
+    def _open(self):
+        self._state = self.OPEN
+        self._opened_at = time.monotonic()
+        self._window.clear()
+
+    @contextmanager
+    def track(self):
+        """Для синхронных вызовов: проверка цепи и учёт исхода"""
+        self.before_call()
+        started = time.monotonic()
+        failed = False
+        try:
+            yield
+        except BaseException as e:
+            failed = counts_as_failure(e)
+            raise
+        finally:
+            self.record(time.monotonic() - started, failed)
+
+    def stats(self) -> Dict[str, Any]:
+        with self._lock:
+            return {
+                "state": self._state,
+                "window_calls": len(self._window),
+                "rejected": self._rejected
+            }
+
+
+class _Waiter:
+    __slots__ = ("loop", "future", "granted")
+
+    def __init__(self, loop: asyncio.AbstractEventLoop):
+        self.loop = loop
+        self.future = loop.create_future()
+        self.granted = False
+
+
+class Bulkhead:
+    """
+    Лимит общий для всех циклов событий процесса, поэтому не asyncio.Semaphore:
+    счётчик под threading.Lock, а ожидающие вызовы стоят в очереди. release
+    передаёт слот первому из них и будит его в его собственном цикле.
+    """
+
+    def __init__(self, name: str, max_concurrent: int, max_wait_seconds: float):
+        self.name = name
+        self.max_concurrent = max_concurrent
+        self.max_wait_seconds = max_wait_seconds
+        self._lock = threading.Lock()
+        self._in_flight = 0
+        self._rejected = 0
+        self._waiters: deque = deque()
+
+    async def acquire(self):
+        with self._lock:
+            if self._in_flight < self.max_concurrent and not self._waiters:
+                self._in_flight += 1
+                return
+            waiter = _Waiter(asyncio.get_running_loop())
+            self._waiters.append(waiter)
+
+        try:
+            await asyncio.wait_for(waiter.future, self.max_wait_seconds)
+        except asyncio.TimeoutError:
+            with self._lock:
+                if waiter.granted:
+                    return  # слот передан одновременно с таймаутом
+                self._waiters.remove(waiter)
+                self._rejected += 1
+            raise DependencyUnavailableError(self.name, "too many calls in flight", self.max_wait_seconds)
+        except BaseException:
+            with self._lock:
+                granted = waiter.granted
+                if not granted:
+                    self._waiters.remove(waiter)
+            if granted:
+                self.release()
+            raise
+
+    def release(self):
+        with self._lock:
+            while self._waiters:
+                waiter = self._waiters.popleft()
+                try:
+                    waiter.loop.call_soon_threadsafe(self._wake, waiter.future)
+                except RuntimeError:
+                    continue  # цикл ожидающего уже закрыт
+                # Слот переходит ожидающему: in_flight не меняется
+                waiter.granted = True
+                return
+            self._in_flight -= 1
+
+    @staticmethod
+    def _wake(future: asyncio.Future):
+        if not future.done():
+            future.set_result(None)
+
+    def stats(self) -> Dict[str, int]:
+        with self._lock:
+            return {
+                "max_concurrent": self.max_concurrent,
+                "in_flight": self._in_flight,
+                "waiting": len(self._waiters),
+                "rejected": self._rejected
+            }
+
+
+class Dependency:
+    def __init__(self, name: str, slow_call_seconds: float, max_concurrent: Optional[int] = None,
+                 max_wait_seconds: Optional[float] = None):
+        self.name = name
+        self.breaker = CircuitBreaker(
+            name,
+            window_size=settings.CIRCUIT_WINDOW_SIZE,
+            min_calls=settings.CIRCUIT_MIN_CALLS,
+            failure_rate_threshold=settings.CIRCUIT_FAILURE_RATE_THRESHOLD,
+            slow_call_seconds=slow_call_seconds,
+            slow_call_rate_threshold=settings.CIRCUIT_SLOW_CALL_RATE_THRESHOLD,
+            open_seconds=settings.CIRCUIT_OPEN_SECONDS,
+            half_open_max_calls=settings.CIRCUIT_HALF_OPEN_MAX_CALLS
+        )
+        self.bulkhead = None
+        if max_concurrent:
+            self.bulkhead = Bulkhead(
+                name,
+                max_concurrent,
+                settings.BULKHEAD_MAX_WAIT_SECONDS if max_wait_seconds is None else max_wait_seconds
+            )
+
+    @asynccontextmanager
+    async def guard(self):
+        """
+        async with speechkit.guard(): ...
+        Ошибка внутри блока считается отказом зависимости (см. counts_as_failure).
+        """
+        try:
+            self.breaker.before_call()
+        except DependencyUnavailableError:
+            OUTBOUND_CALLS.labels(dependency=self.name, status="rejected").inc()
+            raise
+        if self.bulkhead:
+            try:
+                await self.bulkhead.acquire()
+            except BaseException as e:
+                self.breaker.cancel()
+                if isinstance(e, DependencyUnavailableError):
+                    OUTBOUND_CALLS.labels(dependency=self.name, status="rejected").inc()
+                raise
+
+        started = time.monotonic()
+        failed = False
+        in_flight = OUTBOUND_IN_FLIGHT.labels(dependency=self.name)
+        in_flight.inc()
+        try:
+            yield
+        except BaseException as e:
+            failed = counts_as_failure(e)
+            if isinstance(e, httpx.TransportError):
+                # Ответа нет - статус не посчитает хук HTTP-клиента
+                OUTBOUND_CALLS.labels(dependency=self.name, status="transport_error").inc()
+            raise
+        finally:
+            in_flight.dec()
+            if self.bulkhead:
+                self.bulkhead.release()
+            self.breaker.record(time.monotonic() - started, failed)
+
+    def stats(self) -> Dict[str, Any]:
+        return {
+            "circuit": self.breaker.stats(),
+            "bulkhead": self.bulkhead.stats() if self.bulkhead else None
+        }
+
+
+speechkit = Dependency(
+    "speechkit",
+    slow_call_seconds=settings.SPEECHKIT_SLOW_CALL_SECONDS,
+    max_concurrent=settings.SPEECHKIT_MAX_CONCURRENT_CALLS
+)
+llm = Dependency(
+    "llm",
+    slow_call_seconds=settings.LLM_SLOW_CALL_SECONDS,
+    max_concurrent=settings.LLM_MAX_CONCURRENT_CALLS
+)
+# Обновления IAM-токена и так схлопываются в одно на процесс - bulkhead не нужен
+iam = Dependency(
+    "iam",
+    slow_call_seconds=settings.IAM_SLOW_CALL_SECONDS
+)
+
+DEPENDENCIES = {dependency.name: dependency for dependency in (speechkit, llm, iam)}
+
+
+def dependency_stats() -> Dict[str, Any]:
+    return {name: dependency.stats() for name, dependency in DEPENDENCIES.items()}
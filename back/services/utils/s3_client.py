@@ -0,0 +1,170 @@
+"""
+Общий для процесса S3-клиент Object Storage.
+
+Клиент создаётся один раз (boto3-клиенты потокобезопасны) и держит пул соединений,
+поэтому TLS-рукопожатие не повторяется на каждую загрузку. Работает с любым
+S3-совместимым хранилищем (MinIO, moto) через S3_ENDPOINT_URL.
+
+Загрузка и удаление в конвейере обработки асинхронные: boto3 только подписывает
+URL (локально, без сети), а сам запрос идёт через общий httpx-клиент. Объекты
+больше S3_MULTIPART_THRESHOLD_BYTES загружаются multipart-загрузкой: части
+уходят параллельно, создание и завершение загрузки (запросы boto3) - в потоке.
+"""
+import asyncio
+import logging
+import threading
+from datetime import datetime, timezone, timedelta
+from typing import List, Optional
+
+import boto3
+import httpx
+from botocore.client import Config
+
+from app.config import settings
+from .http_client import get_async_client
+
+logger = logging.getLogger(__name__)
+
+_DELETE_BATCH_SIZE = 1000  # максимум ключей в одном DeleteObjects
+
+_client = None
+_client_lock = threading.Lock()
+
+_PRESIGNED_URL_TTL_SECONDS = 300
+
+_async_timeout = httpx.Timeout(settings.S3_READ_TIMEOUT_SECONDS, connect=settings.S3_CONNECT_TIMEOUT_SECONDS)
+
+def get_s3_client():
+    global _client
+    if _client is None:
+        with _client_lock:
+            if _client is None:
+                _client = boto3.client(
+                    "s3",
+                    endpoint_url=settings.S3_ENDPOINT_URL,
+                    aws_access_key_id=settings.SECRET_KEY_ID,
+                    aws_secret_access_key=settings.SECRET_KEY,
+                    config=Config(
+                        signature_version="s3v4",
+                        max_pool_connections=settings.S3_MAX_POOL_CONNECTIONS,
+                        connect_timeout=settings.S3_CONNECT_TIMEOUT_SECONDS,
+                        read_timeout=settings.S3_READ_TIMEOUT_SECONDS,
+                        retries={"max_attempts": 3, "mode": "standard"},
+                        s3={"addressing_style": settings.S3_ADDRESSING_STYLE}
+                    ),
+                )
+    return _client
+
+
+def object_url(object_name: str) -> str:
+    return f"{settings.S3_ENDPOINT_URL.rstrip('/')}/{settings.BUCKET_NAME}/{object_name}"
+
+
+def _presigned_url(client_method: str, object_name: str, **params) -> str:
+    return get_s3_client().generate_presigned_url(
+        client_method,
+        Params={"Bucket": settings.BUCKET_NAME, "Key": object_name, **params},
+        ExpiresIn=_PRESIGNED_URL_TTL_SECONDS
+    )
+
+
+async def _put(url: str, data: bytes) -> httpx.Response:
+    resp = await get_async_client().put(url, content=data, timeout=_async_timeout)
+    resp.raise_for_status()
+    return resp
+
+
+async def _upload_multipart(data: bytes, object_name: str):
+    """Части по S3_MULTIPART_CHUNK_BYTES, не больше S3_MULTIPART_MAX_CONCURRENCY одновременно"""
+    client = get_s3_client()
+    upload_id = (await asyncio.to_thread(
+        client.create_multipart_upload, Bucket=settings.BUCKET_NAME, Key=object_name
+    ))["UploadId"]
+    semaphore = asyncio.Semaphore(settings.S3_MULTIPART_MAX_CONCURRENCY)
+    chunk_size = settings.S3_MULTIPART_CHUNK_BYTES
+
+    async def upload_part(number: int, offset: int) -> dict:
+        url = _presigned_url("upload_part", object_name, UploadId=upload_id, PartNumber=number)
+        async with semaphore:
+            resp = await _put(url, data[offset:offset + chunk_size])
+        return {"PartNumber": number, "ETag": resp.headers["ETag"]}
+
+    try:
+        parts = await asyncio.gather(*(
+            upload_part(number, offset)
+            for number, offset in enumerate(range(0, len(data), chunk_size), start=1)
+        ))
+        await asyncio.to_thread(
+            client.complete_multipart_upload,
+            Bucket=settings.BUCKET_NAME,
+            Key=object_name,
+            UploadId=upload_id,
+            MultipartUpload={"Parts": list(parts)}
+        )
+    except BaseException:
+        # Иначе незавершённые части хранятся (и оплачиваются), пока их не удалит lifecycle-правило
+        try:
+            await asyncio.shield(asyncio.to_thread(
+                client.abort_multipart_upload, Bucket=settings.BUCKET_NAME, Key=object_name, UploadId=upload_id
+            ))
+        except Exception as e:
+            logger.warning(f"Could not abort multipart upload of {object_name}: {str(e)}")
+        raise
+
+
+async def upload_bytes(data: bytes, object_name: str):
+    """Загрузка из памяти: одним PUT по подписанному URL, выше порога размера - multipart"""
+    if len(data) > settings.S3_MULTIPART_THRESHOLD_BYTES:
+        await _upload_multipart(data, object_name)
+    else:
+        await _put(_presigned_url("put_object", object_name), data)
+
+
+async def delete_object(object_name: str):
+    try:
+        resp = await get_async_client().delete(
+            _presigned_url("delete_object", object_name),
+            timeout=_async_timeout
+        )
+        resp.raise_for_status()
+        logger.info(f"Deleted object: {object_name}")
+    except Exception as e:
+        logger.warning(f"Could not delete object {object_name}: {str(e)}")
+
+
+def delete_objects(object_names: List[str]) -> int:
+    """Пакетное удаление, по 1000 ключей за запрос"""
+    client = get_s3_client()
+    deleted = 0
+    for start in range(0, len(object_names), _DELETE_BATCH_SIZE):
+        batch = object_names[start:start + _DELETE_BATCH_SIZE]
+        resp = client.delete_objects(
+            Bucket=settings.BUCKET_NAME,
+            Delete={"Objects": [{"Key": key} for key in batch], "Quiet": True}
+        )
+        errors = resp.get("Errors", [])
+        for error in errors:
+            logger.warning(f"Could not delete object {error.get('Key')}: {error.get('Message')}")
+        deleted += len(batch) - len(errors)
+    return deleted
+
+
+def sweep_stale_objects(prefix: Optional[str] = None, older_than_seconds: Optional[int] = None) -> int:
+    """Удаляет забытые объекты (например, после упавшего распознавания)"""
+    prefix = prefix if prefix is not None else settings.S3_STT_PREFIX
+    older_than_seconds = older_than_seconds if older_than_seconds is not None else settings.S3_STALE_OBJECT_SECONDS
+    cutoff = datetime.now(timezone.utc) - timedelta(seconds=older_than_seconds)
+
+    stale = []
+    paginator = get_s3_client().get_paginator("list_objects_v2")
+    for page in paginator.paginate(Bucket=settings.BUCKET_NAME, Prefix=prefix):
+        for obj in page.get("Contents", []):
+            if obj["LastModified"] < cutoff:
+                stale.append(obj["Key"])
+
+    if not stale:
+        return 0
+
+    deleted = delete_objects(stale)
+    logger.info(f"Swept {deleted} stale objects under '{prefix}'")
+    return deleted
@@ -0,0 +1,184 @@
+"""
+Определение речи (VAD) по энергии и числу переходов через ноль.
+
+Работает с PCM s16le моно на CPU: сигнал режется на кадры, для каждого
+считаются громкость (dBFS) и доля переходов через ноль. Порог громкости
+подстраивается под шум записи. Тихие, но «шипящие» кадры (с, ш, ф) с высоким
+числом переходов тоже считаются речью.
+
+trim_silence убирает тишину в начале и в конце, а длинные паузы
+сжимает до 2 * padding_ms. find_pauses и plan_segments нужны, чтобы резать
+длинные записи на части по паузам, а не посреди слова.
+"""
+from dataclasses import dataclass, field
+from typing import List, Tuple
+
+import numpy as np
+
+_EPS = 1e-10
+
+
+class SilentAudioError(ValueError):
+    def __init__(self, original_duration: float, speech_duration: float = 0.0):
+        self.original_duration = original_duration
+        self.speech_duration = speech_duration
+        super().__init__(
+            f"No speech detected: {speech_duration:.1f}s of speech in {original_duration:.1f}s of audio"
+        )
+
+
+@dataclass
+class VadResult:
+    pcm: bytes
+    sample_rate: int
+    original_duration: float
+    trimmed_duration: float
+    # Места склейки в обрезанном аудио (секунды) - там, где была длинная пауза
+    pause_points: List[float] = field(default_factory=list)
+
+
+def frame_features(samples: np.ndarray, frame_len: int):
+    """Громкость кадров в dBFS и доля переходов через ноль"""
+    n_frames = len(samples) // frame_len
+    frames = samples[:n_frames * frame_len].reshape(n_frames, frame_len)
+
+    rms = np.sqrt(np.mean(frames ** 2, axis=1))
+    energy_db = 20 * np.log10(rms + _EPS)
+
+    signs = np.signbit(frames)
+    zcr = np.mean(signs[:, 1:] != signs[:, :-1], axis=1)
+    return energy_db, zcr
+
+
+def detect_speech(
+    samples: np.ndarray,
+    sample_rate: int,
+    frame_ms: int = 30,
+    min_energy_db: float = -50.0,
+    max_energy_db: float = -30.0,
+    energy_margin_db: float = 10.0,
+    zcr_threshold: float = 0.25,
+    zcr_energy_margin_db: float = 6.0
+) -> np.ndarray:
+    """Маска речи по кадрам длиной frame_ms"""
+    frame_len = max(1, sample_rate * frame_ms // 1000)
+    energy_db, zcr = frame_features(samples, frame_len)
+    if not len(energy_db):
+        return np.zeros(0, dtype=bool)
+
+    # Уровень шума - по самым тихим кадрам записи. Порог ограничен сверху:
+    # в записи почти без пауз тихие кадры - это уже речь
+    noise_floor = np.percentile(energy_db, 10)
+    threshold = min(max(min_energy_db, noise_floor + energy_margin_db), max_energy_db)
+
+    voiced = energy_db >= threshold
+    unvoiced = (energy_db >= threshold - zcr_energy_margin_db) & (zcr >= zcr_threshold)
+    return voiced | unvoiced
+
+
+def _dilate(mask: np.ndarray, frames: int) -> np.ndarray:
+    """Расширяет участки речи на frames кадров в обе стороны, чтобы не срезать края слов"""
+    if frames <= 0 or not mask.any():
+        return mask
+    kernel = np.ones(2 * frames + 1, dtype=int)
+    return np.convolve(mask.astype(int), kernel, mode="same") > 0
+
+
+def _runs(mask: np.ndarray) -> List[tuple]:
+    """Непрерывные участки True: [(начало, конец), ...] в кадрах, конец не включается"""
+    padded = np.concatenate(([False], mask, [False]))
+    edges = np.flatnonzero(padded[1:] != padded[:-1])
+    return list(zip(edges[::2], edges[1::2]))
+
+
+def trim_silence(
+    pcm: bytes,
+    sample_rate: int = 16000,
+    frame_ms: int = 30,
+    padding_ms: int = 200,
+    max_pause_ms: int = 700,
+    min_speech_ms: int = 300,
+    **detect_options
+) -> VadResult:
+    """
+    Обрезает тишину в PCM s16le моно. Паузы длиннее max_pause_ms сокращаются,
+    короче - остаются как есть. Если речи меньше min_speech_ms - SilentAudioError.
+    """
+    samples = np.frombuffer(pcm, dtype="<i2").astype(np.float32) / 32768.0
+    original_duration = len(samples) / sample_rate
+    frame_len = max(1, sample_rate * frame_ms // 1000)
+
+    speech = detect_speech(samples, sample_rate, frame_ms, **detect_options)
+    speech_duration = speech.sum() * frame_ms / 1000
+    if speech_duration * 1000 < min_speech_ms:
+        raise SilentAudioError(original_duration, speech_duration)
+
+    # Короткие паузы оставляем: они не стоят склейки
+    padding_frames = padding_ms // frame_ms
+    pause_frames = max_pause_ms // frame_ms
+    segments = []
+    for start, end in _runs(_dilate(speech, padding_frames)):
+        if segments and start - segments[-1][1] + 2 * padding_frames <= pause_frames:
+            segments[-1] = (segments[-1][0], end)
+        else:
+            segments.append((start, end))
+
+    pieces = []
+    pause_points = []
+    trimmed_samples = 0
+    for start, end in segments:
+        if pieces:
+            pause_points.append(trimmed_samples / sample_rate)
+        piece = pcm[start * frame_len * 2:min(end * frame_len, len(samples)) * 2]
+        pieces.append(piece)
+        trimmed_samples += len(piece) // 2
+
+    return VadResult(
+        pcm=b"".join(pieces),
+        sample_rate=sample_rate,
+        original_duration=original_duration,
+        trimmed_duration=trimmed_samples / sample_rate,
+        pause_points=pause_points
+    )
+
+
+def find_pauses(
+    pcm: bytes,
+    sample_rate: int = 16000,
+    frame_ms: int = 30,
+    min_pause_ms: int = 250,
+    **detect_options
+) -> List[float]:
+    """Середины пауз не короче min_pause_ms, в секундах"""
+    samples = np.frombuffer(pcm, dtype="<i2").astype(np.float32) / 32768.0
+    speech = detect_speech(samples, sample_rate, frame_ms, **detect_options)
+
+    min_frames = max(1, min_pause_ms // frame_ms)
+    return [
+        float((start + end) / 2 * frame_ms / 1000)
+        for start, end in _runs(~speech)
+        if end - start >= min_frames
+    ]
+
+
+def plan_segments(
+    duration: float,
+    pause_points: List[float],
+    max_seconds: float,
+    min_seconds: float = 0.0
+) -> List[Tuple[float, float]]:
+    """
+    Границы частей не длиннее max_seconds. Каждый разрез - по последней паузе,
+    которая оставляет часть не короче min_seconds; если такой нет, режем по max_seconds.
+    """
+    pauses = sorted(pause_points)
+    bounds = []
+    start = 0.0
+    while duration - start > max_seconds:
+        limit = start + max_seconds
+        candidates = [p for p in pauses if start + min_seconds <= p <= limit]
+        cut = candidates[-1] if candidates else limit
+        bounds.append((start, cut))
+        start = cut
+    bounds.append((start, duration))
+    return bounds
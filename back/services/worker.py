@@ -0,0 +1,391 @@
+"""
+Воркер очереди задач.
+
+Запуск (из каталога back):
+    python -m services.worker --concurrency 4
+
+Выполняет задачи processing_jobs: обработку аудио (AudioProcessor.process_audio)
+и пересчёт дневной статистики (DailyStatsService.generate_daily_stats).
+Может работать на отдельных машинах, если у них есть доступ к БД
+и к каталогу AUDIO_PROCESSING_DIR.
+"""
+import argparse
+import asyncio
+import logging
+import os
+import signal
+import socket
+import threading
+import time
+from datetime import date
+from typing import Any, Callable, Dict, Optional
+
+from fastapi import HTTPException
+from sqlalchemy.orm import Session
+
+from app.config import settings
+from app.metrics import PIPELINE_JOBS_IN_FLIGHT, mark_process_dead, track_stage
+from app.database import SessionLocal
+from app.models.processing_job import ProcessingJob, JobStatus, JobType
+from .admission import inline_admission
+from .job_service import ProcessingJobService
+from .utils.http_client import close_async_client
+from .utils.resilience import DependencyUnavailableError
+from .utils.s3_client import sweep_stale_objects
+from .utils.vad import SilentAudioError
+
+logger = logging.getLogger(__name__)
+
+
+def _throttled(callback: Callable[[str], None], interval: float) -> Callable[[str], None]:
+    """Пропускает вызовы чаще interval секунд: частичное саммари пишется в БД не на каждый токен"""
+    last_call = 0.0
+
+    def call(value: str):
+        nonlocal last_call
+        now = time.monotonic()
+        if now - last_call >= interval:
+            last_call = now
+            callback(value)
+
+    return call
+
+
+class _JobProgress:
+    """
+    Этап и частичное саммари задачи. Колбэки обработки вызываются в цикле
+    событий, поэтому значения только запоминаются, а в БД их пишет фоновая
+    задача - в отдельной сессии и в потоке (ProcessingJobService.update_progress).
+    Пока идёт запись, новые значения копятся; из частичных саммари
+    записывается последнее.
+    """
+
+    def __init__(self, job_id: int, worker_id: str):
+        self.job_id = job_id
+        self.worker_id = worker_id
+        self._pending: Dict[str, Any] = {}
+        self._changed = asyncio.Event()
+        self._closing = False
+        self._task = asyncio.create_task(self._run())
+
+    def update(self, **values):
+        self._pending.update(values)
+        self._changed.set()
+
+    async def _run(self):
+        while True:
+            await self._changed.wait()
+            self._changed.clear()
+            values, self._pending = self._pending, {}
+            if values:
+                try:
+                    await asyncio.to_thread(ProcessingJobService.update_progress, self.job_id, self.worker_id, values)
+                except Exception as e:
+                    logger.error(f"Failed to save progress of job {self.job_id}: {str(e)}")
+            if self._closing and not self._pending:
+                return
+
+    async def close(self):
+        """Дожидается записи накопленного"""
+        self._closing = True
+        self._changed.set()
+        await self._task
+
+
+async def _handle_process_audio(db: Session, job_service: ProcessingJobService, job: ProcessingJob):
+    from .record_service import RecordService
+
+    record_service = RecordService(db)
+    progress = _JobProgress(job.id, job.locked_by)
+    try:
+        record = await record_service.process_and_create_record(
+            user_id=job.user_id,
+            audio_file_path=job.audio_path,
+            record_name=job.record_name,
+            duration=job.duration,
+            on_stage=lambda stage: progress.update(stage=stage),
+            audio_sha256=job.audio_sha256,
+            on_partial=_throttled(
+                lambda text: progress.update(partial_summary=text),
+                settings.JOB_PARTIAL_FLUSH_SECONDS
+            )
+        )
+    finally:
+        await progress.close()
+    job_service.mark_completed(job, record)
+
+
+async def _handle_daily_stats(db: Session, job_service: ProcessingJobService, job: ProcessingJob):
+    from .daily_stats_service import DailyStatsService
+
+    target_date = date.fromisoformat(job.payload["date"])
+    with track_stage("daily_stats"):
+        await DailyStatsService(db).generate_daily_stats(job.user_id, target_date)
+    job_service.mark_completed(job)
+
+
+JOB_HANDLERS = {
+    JobType.PROCESS_AUDIO: _handle_process_audio,
+    JobType.DAILY_STATS: _handle_daily_stats,
+}
+
+
+def _cleanup_job_files(job: ProcessingJob):
+    if job.status in (JobStatus.PENDING, JobStatus.PROCESSING):
+        return  # файл ещё понадобится для следующей попытки
+    if job.audio_path and os.path.exists(job.audio_path):
+        os.remove(job.audio_path)
+
+
+async def _keep_lease(job_id: int, worker_id: str):
+    """Продлевает аренду, пока задача выполняется: иначе долгое распознавание заберёт второй воркер"""
+    while True:
+        await asyncio.sleep(settings.JOB_HEARTBEAT_INTERVAL_SECONDS)
+        try:
+            if not await asyncio.to_thread(ProcessingJobService.extend_lease, job_id, worker_id):
+                logger.warning(f"Job {job_id} lease is no longer held by {worker_id}")
+                return
+        except Exception as e:
+            logger.error(f"Failed to extend lease of job {job_id}: {str(e)}")
+
+
+async def execute_job(db: Session, job: ProcessingJob):
+    job_service = ProcessingJobService(db)
+    handler = JOB_HANDLERS.get(job.job_type)
+    in_flight = PIPELINE_JOBS_IN_FLIGHT.labels(job_type=job.job_type)
+    in_flight.inc()
+    lease = asyncio.create_task(_keep_lease(job.id, job.locked_by))
+
+    try:
+        if not handler:
+            job_service.mark_failed(job, f"Unknown job type: {job.job_type}", retryable=False)
+            return
+        await handler(db, job_service, job)
+
+    except HTTPException as e:
+        # Например, превышен дневной лимит - повтор не поможет
+        db.rollback()
+        job_service.mark_failed(job, str(e.detail), retryable=False)
+
+    except SilentAudioError as e:
+        db.rollback()
+        job_service.mark_failed(job, str(e), retryable=False)
+
+    except DependencyUnavailableError as e:
+        db.rollback()
+        job_service.defer(job, e.retry_after, str(e))
+
+    except Exception as e:
+        db.rollback()
+        job_service.mark_failed(job, str(e))
+
+    finally:
+        lease.cancel()
+        in_flight.dec()
+        _cleanup_job_files(job)
+
+
+async def run_job_inline(job_id: int, admitted: bool = False):
+    """
+    Выполняет конкретную задачу в процессе API (JOB_QUEUE_INLINE=True)
+    в его цикле событий: пока ждём SpeechKit и LLM, API обслуживает другие запросы.
+    Если задачу уже забрал отдельный воркер, ничего не делает.
+    admitted - для задачи зарезервировано место в inline_admission: она ждёт
+    свободного слота и освобождает место по завершении.
+    """
+    if admitted:
+        async with inline_admission.run():
+            await _run_claimed_job(job_id)
+    else:
+        await _run_claimed_job(job_id)
+
+
+def _inline_worker_id() -> str:
+    return f"api:{socket.gethostname()}:{os.getpid()}"
+
+
+async def _run_claimed_job(job_id: int):
+    db = SessionLocal()
+    try:
+        job = ProcessingJobService(db).claim(_inline_worker_id(), job_id=job_id)
+        if job:
+            await execute_job(db, job)
+    finally:
+        db.close()
+
+
+def _claim_next(worker_id: str):
+    db = SessionLocal()
+    try:
+        job = ProcessingJobService(db).claim(worker_id)
+    except Exception:
+        db.close()
+        raise
+    if job is None:
+        db.close()
+        return None, None
+    return db, job
+
+
+class InlineJobRunner:
+    """
+    Цикл очереди в процессе API (JOB_QUEUE_INLINE=True).
+
+    Свежие загрузки запускает run_job_inline, но повторы после mark_failed,
+    отложенные задачи, задачи с истёкшей арендой и оставшиеся после
+    перезапуска API никто, кроме этого цикла, не заберёт. Задачи берутся,
+    только пока свободен слот анализа, чтобы не отнимать места у загрузок.
+    Как и отдельный воркер, раз в S3_SWEEP_INTERVAL_SECONDS удаляет забытые
+    объекты распознавания из Object Storage.
+    """
+
+    def __init__(self, poll_interval: float):
+        self.poll_interval = poll_interval
+        self._task: Optional[asyncio.Task] = None
+        self._maintenance: Optional[asyncio.Task] = None
+        self._jobs = set()
+
+    async def _run(self, db: Session, job: ProcessingJob):
+        try:
+            async with inline_admission.run():
+                await execute_job(db, job)
+        finally:
+            db.close()
+
+    async def _claim_ready_jobs(self, worker_id: str):
+        while inline_admission.try_admit(limit=inline_admission.max_in_flight):
+            try:
+                db, job = await asyncio.to_thread(_claim_next, worker_id)
+            except Exception:
+                inline_admission.release()
+                raise
+            if job is None:
+                inline_admission.release()
+                return
+            task = asyncio.create_task(self._run(db, job))
+            self._jobs.add(task)
+            task.add_done_callback(self._jobs.discard)
+
+    async def _loop(self):
+        worker_id = _inline_worker_id()
+        logger.info(f"Inline job runner {worker_id} started")
+        while True:
+            try:
+                await self._claim_ready_jobs(worker_id)
+            except Exception as e:
+                logger.error(f"Inline job runner error: {str(e)}")
+            await asyncio.sleep(self.poll_interval)
+
+    async def _run_maintenance(self):
+        while True:
+            await asyncio.sleep(settings.S3_SWEEP_INTERVAL_SECONDS)
+            try:
+                await asyncio.to_thread(sweep_stale_objects)
+            except Exception as e:
+                logger.error(f"Object Storage sweep failed: {str(e)}")
+
+    def start(self):
+        if self._task is None:
+            self._task = asyncio.create_task(self._loop())
+            self._maintenance = asyncio.create_task(self._run_maintenance())
+
+    async def stop(self):
+        """Новые задачи не берутся; начатые доберёт другой процесс, когда истечёт аренда"""
+        if self._task is not None:
+            self._task.cancel()
+            self._maintenance.cancel()
+            self._task = None
+            self._maintenance = None
+
+
+inline_runner = InlineJobRunner(settings.JOB_INLINE_POLL_INTERVAL_SECONDS)
+
+
+class Worker:
+    def __init__(self, concurrency: int, poll_interval: float):
+        self.concurrency = concurrency
+        self.poll_interval = poll_interval
+        self._stop = threading.Event()
+        self._threads = []
+
+    def _worker_id(self, index: int) -> str:
+        return f"{socket.gethostname()}:{os.getpid()}:{index}"
+
+    def _run_loop(self, index: int):
+        worker_id = self._worker_id(index)
+        logger.info(f"Worker thread {worker_id} started")
+
+        # Свой цикл событий на поток: HTTP-соединения переиспользуются между задачами
+        loop = asyncio.new_event_loop()
+        try:
+            while not self._stop.is_set():
+                db = SessionLocal()
+                try:
+                    job = ProcessingJobService(db).claim(worker_id)
+                    if job:
+                        loop.run_until_complete(execute_job(db, job))
+                        continue
+                except Exception as e:
+                    logger.error(f"Worker {worker_id} loop error: {str(e)}")
+                finally:
+                    db.close()
+
+                self._stop.wait(self.poll_interval)
+        finally:
+            loop.run_until_complete(close_async_client())
+            loop.close()
+
+        logger.info(f"Worker thread {worker_id} stopped")
+
+    def _run_maintenance(self):
+        """Периодическая очистка объектов, оставшихся в Object Storage"""
+        while not self._stop.wait(settings.S3_SWEEP_INTERVAL_SECONDS):
+            try:
+                sweep_stale_objects()
+            except Exception as e:
+                logger.error(f"Object Storage sweep failed: {str(e)}")
+
+    def start(self):
+        maintenance = threading.Thread(target=self._run_maintenance, name="worker-maintenance")
+        maintenance.start()
+        self._threads.append(maintenance)
+
+        for index in range(self.concurrency):
+            thread = threading.Thread(target=self._run_loop, args=(index,), name=f"worker-{index}")
+            thread.start()
+            self._threads.append(thread)
+
+    def stop(self, *args):
+        logger.info("Stopping worker, waiting for running jobs to finish...")
+        self._stop.set()
+
+    def join(self):
+        for thread in self._threads:
+            thread.join()
+
+
+def main(argv: Optional[list] = None):
+    parser = argparse.ArgumentParser(description="Voice Diary job worker")
+    parser.add_argument("--concurrency", type=int, default=settings.WORKER_CONCURRENCY,
+                        help="Number of jobs processed in parallel")
+    parser.add_argument("--poll-interval", type=float, default=settings.WORKER_POLL_INTERVAL_SECONDS,
+                        help="Seconds to wait when the queue is empty")
+    args = parser.parse_args(argv)
+
+    logging.basicConfig(
+        level=logging.INFO,
+        format='%(asctime)s - %(name)s - %(levelname)s - %(message)s'
+    )
+
+    worker = Worker(args.concurrency, args.poll_interval)
+    signal.signal(signal.SIGTERM, worker.stop)
+    signal.signal(signal.SIGINT, worker.stop)
+
+    logger.info(f"Starting worker with concurrency {args.concurrency}")
+    worker.start()
+    worker.join()
+    mark_process_dead()
+
+
+if __name__ == "__main__":
+    main()
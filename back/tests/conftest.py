@@ -0,0 +1,45 @@
+"""
+Общие настройки тестов. Запуск из каталога back:
+    python -m pytest
+
+Настройки читаются при импорте app.config, поэтому окружение задаётся здесь,
+до импорта приложения. База - временный SQLite: тесты создают и удаляют
+таблицы, поэтому DATABASE_URL из .env не используется.
+"""
+import os
+import sys
+import tempfile
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+_db_dir = tempfile.mkdtemp(prefix="voicebook-tests-")
+os.environ["DATABASE_URL"] = f"sqlite:///{os.path.join(_db_dir, 'test.db')}"
+os.environ.pop("DATABASE_REPLICA_URL", None)
+for name in ("SERVICE_ACCOUNT_ID", "KEY_ID", "PRIVATE_KEY", "FOLDER_ID",
+             "BUCKET_NAME", "SECRET_KEY", "SECRET_KEY_ID"):
+    os.environ.setdefault(name, "test")
+
+import pytest
+
+import app.main  # noqa: F401  регистрирует все модели до create_all
+from app.database import Base, SessionLocal, engine
+from app.models.user import User
+
+
+@pytest.fixture
+def db():
+    Base.metadata.create_all(bind=engine)
+    session = SessionLocal()
+    try:
+        yield session
+    finally:
+        session.close()
+        Base.metadata.drop_all(bind=engine)
+
+
+@pytest.fixture
+def user(db):
+    user = User(username="user", email="user@example.com", hashed_password="x")
+    db.add(user)
+    db.commit()
+    return user
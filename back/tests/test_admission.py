@@ -0,0 +1,164 @@
+import asyncio
+
+import pytest
+from fastapi import HTTPException
+from fastapi.testclient import TestClient
+
+from app.auth import get_current_user
+from app.config import settings
+from app.main import app
+from app.routes import records
+from services.admission import AdmissionController
+from services.job_service import ProcessingJobService
+
+BOUNDARY = "voicebook-boundary"
+
+
+def _controller(max_in_flight: int = 1, max_queue: int = 1) -> AdmissionController:
+    return AdmissionController(max_in_flight=max_in_flight, max_queue=max_queue, default_retry_after=15.0)
+
+
+def test_admit_rejects_with_503_and_retry_after_at_capacity():
+    admission = _controller()
+    admission.admit()
+    admission.admit()
+
+    with pytest.raises(HTTPException) as error:
+        admission.admit()
+
+    assert error.value.status_code == 503
+    assert error.value.headers["Retry-After"] == "15"
+    assert admission.stats()["rejected"] == 1
+
+    admission.release()
+    admission.admit()
+
+
+def test_retry_after_follows_observed_analysis_time():
+    admission = _controller(max_in_flight=2, max_queue=2)
+
+    async def analyse():
+        admission.admit()
+        async with admission.run():
+            await asyncio.sleep(0)
+
+    asyncio.run(analyse())
+    admission._avg_seconds = 10.0
+    for _ in range(4):
+        admission.admit()
+
+    # Четыре места в очереди при двух слотах: две длительности анализа плюс текущий
+    assert admission.retry_after() == pytest.approx(30.0)
+    with pytest.raises(HTTPException) as error:
+        admission.admit()
+    assert error.value.headers["Retry-After"] == "30"
+
+
+def test_run_releases_place_even_on_error():
+    admission = _controller()
+
+    async def failing():
+        admission.admit()
+        async with admission.run():
+            raise RuntimeError("analysis failed")
+
+    with pytest.raises(RuntimeError):
+        asyncio.run(failing())
+
+    assert admission.stats()["queued"] == 0
+    assert admission.stats()["running"] == 0
+
+
+@pytest.fixture
+def upload_client(db, user, tmp_path, monkeypatch):
+    admission = _controller()
+    monkeypatch.setattr(records, "inline_admission", admission)
+    monkeypatch.setattr(settings, "JOB_QUEUE_INLINE", True)
+    monkeypatch.setattr(settings, "AUDIO_PROCESSING_DIR", str(tmp_path))
+    app.dependency_overrides[get_current_user] = lambda: user
+    try:
+        yield TestClient(app, raise_server_exceptions=False), admission
+    finally:
+        app.dependency_overrides.pop(get_current_user, None)
+
+
+def _upload(client: TestClient, audio: bytes = b"OggS" * 100, content_type: str = "audio/ogg",
+            duration: str = "12.5", headers: dict = None):
+    body = (
+        f'--{BOUNDARY}\r\nContent-Disposition: form-data; name="duration"\r\n\r\n{duration}\r\n'
+        f'--{BOUNDARY}\r\nContent-Disposition: form-data; name="file"; filename="note.ogg"\r\n'
+        f"Content-Type: {content_type}\r\n\r\n"
+    ).encode() + audio + f"\r\n--{BOUNDARY}--\r\n".encode()
+    return client.post(
+        "/records/upload",
+        content=body,
+        headers={"Content-Type": f"multipart/form-data; boundary={BOUNDARY}", **(headers or {})}
+    )
+
+
+def test_upload_is_rejected_with_503_before_body_is_read(upload_client, tmp_path):
+    client, admission = upload_client
+    admission.admit()
+    admission.admit()
+
+    resp = _upload(client)
+
+    assert resp.status_code == 503
+    assert resp.headers["Retry-After"] == "15"
+    assert list(tmp_path.iterdir()) == []
+
+
+def test_oversized_chunked_upload_releases_its_place(upload_client, tmp_path, monkeypatch):
+    client, admission = upload_client
+    monkeypatch.setattr(settings, "MAX_UPLOAD_BYTES", 100)
+
+    assert _upload(client, audio=b"x" * 1000).status_code == 413
+    assert admission.stats()["queued"] == 0
+    assert list(tmp_path.iterdir()) == []
+
+
+def test_upload_over_content_length_is_rejected_without_admission(upload_client, monkeypatch):
+    client, admission = upload_client
+    monkeypatch.setattr(settings, "MAX_UPLOAD_BYTES", 100)
+
+    resp = _upload(client, headers={"Content-Length": str(10 * 1024 * 1024)})
+
+    assert resp.status_code == 413
+    assert admission.stats()["queued"] == 0
+
+
+@pytest.mark.parametrize("kwargs, status_code", [
+    ({"content_type": "text/plain"}, 400),
+    ({"duration": "long"}, 422),
+])
+def test_rejected_upload_releases_its_place(upload_client, tmp_path, kwargs, status_code):
+    client, admission = upload_client
+
+    assert _upload(client, **kwargs).status_code == status_code
+    assert admission.stats()["queued"] == 0
+    assert list(tmp_path.iterdir()) == []
+
+
+def test_malformed_body_releases_its_place(upload_client):
+    client, admission = upload_client
+
+    resp = client.post(
+        "/records/upload",
+        content=b"not multipart",
+        headers={"Content-Type": f"multipart/form-data; boundary={BOUNDARY}"}
+    )
+
+    assert resp.status_code == 422
+    assert admission.stats()["queued"] == 0
+
+
+def test_failed_enqueue_releases_place_and_removes_file(upload_client, tmp_path, monkeypatch):
+    client, admission = upload_client
+
+    def enqueue_audio_job(self, **kwargs):
+        raise RuntimeError("database is down")
+    monkeypatch.setattr(ProcessingJobService, "enqueue_audio_job", enqueue_audio_job)
+
+    assert _upload(client).status_code == 500
+    assert admission.stats()["queued"] == 0
+    assert list(tmp_path.iterdir()) == []
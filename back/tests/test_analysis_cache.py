@@ -0,0 +1,52 @@
+from app.config import settings
+from app.models.audio_analysis_cache import AudioAnalysisCache
+from app.models.user import User
+from services.analysis_cache_service import AudioAnalysisCacheService
+
+CONTENT_HASH = "a" * 64
+RESULT = {
+    "transcript": "личная запись",
+    "duration": 12.5,
+    "summary": "саммари",
+    "emotion": "happy",
+    "insights": {"topics": []}
+}
+
+
+def _other_user(db) -> User:
+    other = User(username="other", email="other@example.com", hashed_password="x")
+    db.add(other)
+    db.commit()
+    return other
+
+
+def test_entry_is_returned_to_the_user_who_uploaded_it(db, user):
+    cache = AudioAnalysisCacheService(db)
+    cache.put(user.id, CONTENT_HASH, RESULT)
+
+    assert cache.get(user.id, CONTENT_HASH) == RESULT
+
+
+def test_same_audio_of_another_user_is_a_miss(db, user):
+    other = _other_user(db)
+    cache = AudioAnalysisCacheService(db)
+    cache.put(user.id, CONTENT_HASH, RESULT)
+
+    assert cache.get(other.id, CONTENT_HASH) is None
+
+    cache.put(other.id, CONTENT_HASH, {**RESULT, "transcript": "другая запись"})
+    assert cache.get(user.id, CONTENT_HASH)["transcript"] == "личная запись"
+    assert cache.get(other.id, CONTENT_HASH)["transcript"] == "другая запись"
+
+
+def test_eviction_removes_least_recently_used_entries(db, user, monkeypatch):
+    other = _other_user(db)
+    monkeypatch.setattr(settings, "ANALYSIS_CACHE_MAX_ENTRIES", 2)
+    cache = AudioAnalysisCacheService(db)
+
+    cache.put(user.id, CONTENT_HASH, RESULT)
+    cache.put(other.id, CONTENT_HASH, RESULT)
+    cache.put(user.id, "b" * 64, RESULT)
+
+    keys = {(entry.user_id, entry.content_hash) for entry in db.query(AudioAnalysisCache).all()}
+    assert keys == {(other.id, CONTENT_HASH), (user.id, "b" * 64)}
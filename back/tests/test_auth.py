@@ -0,0 +1,76 @@
+import asyncio
+import os
+from datetime import datetime, timedelta, timezone
+
+import pytest
+from fastapi.security import HTTPAuthorizationCredentials
+from sqlalchemy import create_engine
+from sqlalchemy.orm import sessionmaker
+from starlette.requests import Request
+
+import app.auth as auth
+import app.database as database
+from app.database import Base, SessionLocal
+from app.models.session import UserSession
+from app.schemas.common import TokenPayload
+
+
+@pytest.fixture
+def replica(db, tmp_path, monkeypatch):
+    """Реплика, до которой ещё не дошли новые строки: та же схема, но пустая"""
+    engine = create_engine(f"sqlite:///{os.path.join(tmp_path, 'replica.db')}")
+    Base.metadata.create_all(bind=engine)
+    monkeypatch.setattr(database, "replica_engine", engine)
+    session = sessionmaker(bind=engine)()
+    try:
+        yield session
+    finally:
+        session.close()
+        engine.dispose()
+
+
+def _user_session(db, user, last_used: datetime) -> UserSession:
+    session = UserSession(
+        user_id=user.id,
+        session_token="session",
+        refresh_token="refresh",
+        expires_at=datetime.now(timezone.utc) + timedelta(hours=1),
+        refresh_expires_at=datetime.now(timezone.utc) + timedelta(days=1),
+        last_used=last_used
+    )
+    db.add(session)
+    db.commit()
+    return session
+
+
+def _current_user(db, session: UserSession, monkeypatch):
+    payload = TokenPayload(user_id=session.user_id, session_id=session.id, type="access")
+    monkeypatch.setattr(auth, "verify_jwt_token", lambda token: payload)
+    request = Request({"type": "http", "method": "GET", "headers": []})
+    credentials = HTTPAuthorizationCredentials(scheme="Bearer", credentials="token")
+    return asyncio.run(auth.get_current_user(request, credentials, db))
+
+
+def test_replica_miss_falls_back_to_primary_and_touches_session(db, user, replica, monkeypatch):
+    stale = datetime.now(timezone.utc) - timedelta(hours=1)
+    session = _user_session(db, user, last_used=stale)
+    session_id, user_id, email = session.id, user.id, user.email
+
+    current = _current_user(replica, session, monkeypatch)
+
+    # Пользователь из primary отсоединён от сессии, но его атрибуты загружены
+    assert (current.id, current.email) == (user_id, email)
+    with SessionLocal() as primary:
+        last_used = primary.get(UserSession, session_id).last_used
+    assert last_used.replace(tzinfo=timezone.utc) > stale + timedelta(minutes=30)
+
+
+def test_session_found_on_primary_is_touched(db, user, monkeypatch):
+    stale = datetime.now(timezone.utc) - timedelta(hours=1)
+    session = _user_session(db, user, last_used=stale)
+
+    current = _current_user(db, session, monkeypatch)
+
+    assert current.email == user.email
+    db.refresh(session)
+    assert session.last_used.replace(tzinfo=timezone.utc) > stale + timedelta(minutes=30)
@@ -0,0 +1,208 @@
+import asyncio
+import time
+
+import pytest
+
+from app.config import settings
+from services import gpt_service
+from services.utils.hedging import CallStats, HedgeBudget, LatencyTracker, decorrelated_jitter, hedged
+
+
+class FakeCalls:
+    """call() для hedged: i-й вызов ждёт delays[i] секунд и возвращает свой номер"""
+
+    def __init__(self, *delays: float):
+        self.delays = delays
+        self.started = []
+        self.cancelled = []
+
+    async def __call__(self):
+        number = len(self.started)
+        self.started.append(time.monotonic())
+        try:
+            await asyncio.sleep(self.delays[number])
+        except asyncio.CancelledError:
+            self.cancelled.append(number)
+            raise
+        return number
+
+
+def _budget(tokens: int) -> HedgeBudget:
+    budget = HedgeBudget(budget_ratio=1.0)
+    for _ in range(tokens):
+        budget.on_request()
+    return budget
+
+
+def test_fast_call_is_not_hedged():
+    calls, stats = FakeCalls(0.0), CallStats()
+
+    assert asyncio.run(hedged(calls, 0.2, _budget(1), stats)) == (0, False)
+
+    assert len(calls.started) == 1
+    assert stats.stats()["hedges"] == 0
+
+
+def test_hedge_fires_after_delay_and_loser_is_cancelled():
+    calls, stats = FakeCalls(10.0, 0.0), CallStats()
+
+    assert asyncio.run(hedged(calls, 0.05, _budget(1), stats)) == (1, True)
+
+    # Таймер цикла событий может сработать на долю миллисекунды раньше
+    assert calls.started[1] - calls.started[0] >= 0.045
+    assert calls.cancelled == [0]
+    assert stats.stats()["hedges"] == 1
+    assert stats.stats()["hedge_wins"] == 1
+
+
+def test_primary_may_still_win_after_hedge():
+    calls, stats = FakeCalls(0.1, 10.0), CallStats()
+
+    assert asyncio.run(hedged(calls, 0.05, _budget(1), stats)) == (0, False)
+
+    assert calls.cancelled == [1]
+    assert stats.stats()["hedge_wins"] == 0
+
+
+def test_hedge_is_not_sent_without_budget():
+    calls, stats = FakeCalls(0.1, 0.0), CallStats()
+
+    assert asyncio.run(hedged(calls, 0.01, _budget(0), stats)) == (0, False)
+
+    assert len(calls.started) == 1
+    assert stats.stats()["hedges_over_budget"] == 1
+
+
+def test_result_of_loser_that_also_finished_is_discarded():
+    discarded = []
+
+    async def run():
+        both_done = asyncio.Event()
+        calls = []
+
+        async def call():
+            number = len(calls)
+            calls.append(number)
+            if number == 0:
+                await both_done.wait()
+            else:
+                both_done.set()
+            return number
+
+        async def discard(result):
+            discarded.append(result)
+
+        # Хедж будит основной запрос, и оба завершаются до того, как hedged проснётся
+        return await hedged(call, 0.01, _budget(1), CallStats(), discard=discard)
+
+    result, _ = asyncio.run(run())
+
+    assert discarded == [1 - result]
+
+
+def test_budget_caps_hedges():
+    budget = HedgeBudget(budget_ratio=0.1, max_tokens=2.0)
+    for _ in range(9):
+        budget.on_request()
+    assert not budget.try_spend()
+
+    for _ in range(100):
+        budget.on_request()
+    assert budget.try_spend()
+    assert budget.try_spend()
+    assert not budget.try_spend()
+
+
+def test_latency_tracker_percentile_over_window():
+    tracker = LatencyTracker(window_size=100, min_samples=10)
+    for seconds in range(9):
+        tracker.record(seconds)
+    assert tracker.percentile(95) is None
+
+    for seconds in range(1, 201):
+        tracker.record(seconds / 100)
+    # В окне последние 100 замеров: 1.01 ... 2.00
+    assert tracker.percentile(50) == pytest.approx(1.505)
+    assert tracker.percentile(95) == pytest.approx(1.9505)
+    assert tracker.stats()["samples"] == 100
+
+
+def test_decorrelated_jitter_stays_within_bounds():
+    previous = 0.5
+    for _ in range(100):
+        delay = decorrelated_jitter(previous, 0.5, 8.0)
+        assert 0.5 <= delay <= min(8.0, max(0.5, previous * 3))
+        previous = delay
+
+
+@pytest.fixture
+def sleeps(monkeypatch):
+    """Паузы между повторами _with_retries записываются, а не выдерживаются"""
+    delays = []
+    real_sleep = asyncio.sleep
+
+    async def sleep(delay, *args, **kwargs):
+        delays.append(delay)
+        await real_sleep(0)
+
+    monkeypatch.setattr(gpt_service.asyncio, "sleep", sleep)
+    monkeypatch.setattr(settings, "LLM_HEDGING_ENABLED", False)
+    return delays
+
+
+def _failing(*errors, result="ok"):
+    errors = list(errors)
+
+    async def attempt():
+        if errors:
+            raise errors.pop(0)
+        return result
+    return attempt
+
+
+def test_retry_delay_follows_retry_after(sleeps, monkeypatch):
+    monkeypatch.setattr(settings, "LLM_MAX_ATTEMPTS", 3)
+    attempt = _failing(
+        gpt_service.UpstreamError(429, "slow down", retry_after=3.0),
+        gpt_service.UpstreamError(503, "unavailable", retry_after=60.0)
+    )
+
+    assert asyncio.run(gpt_service._with_retries(attempt, LatencyTracker(10, 1))) == "ok"
+
+    # Не раньше Retry-After, но не дольше LLM_RETRY_MAX_DELAY_SECONDS
+    assert sleeps[0] >= 3.0
+    assert sleeps[1] == settings.LLM_RETRY_MAX_DELAY_SECONDS
+
+
+def test_retry_without_retry_after_uses_jitter(sleeps):
+    attempt = _failing(gpt_service.UpstreamError(500, "error"))
+
+    assert asyncio.run(gpt_service._with_retries(attempt, LatencyTracker(10, 1))) == "ok"
+
+    assert settings.LLM_RETRY_BASE_DELAY_SECONDS <= sleeps[0] <= settings.LLM_RETRY_MAX_DELAY_SECONDS
+
+
+def test_last_upstream_error_is_raised(sleeps, monkeypatch):
+    monkeypatch.setattr(settings, "LLM_MAX_ATTEMPTS", 2)
+    attempt = _failing(gpt_service.UpstreamError(500, "first"), gpt_service.UpstreamError(502, "second"))
+
+    with pytest.raises(gpt_service.UpstreamError) as error:
+        asyncio.run(gpt_service._with_retries(attempt, LatencyTracker(10, 1)))
+
+    assert error.value.status_code == 502
+    assert len(sleeps) == 1
+
+
+def test_with_retries_hedges_after_latency_percentile(monkeypatch):
+    monkeypatch.setattr(settings, "LLM_HEDGING_ENABLED", True)
+    monkeypatch.setattr(settings, "LLM_HEDGE_MIN_DELAY_SECONDS", 0.01)
+    monkeypatch.setattr(gpt_service, "_hedge_budget", HedgeBudget(budget_ratio=1.0))
+    latency = LatencyTracker(window_size=20, min_samples=20)
+    for _ in range(20):
+        latency.record(0.1)
+    calls = FakeCalls(10.0, 0.0)
+
+    assert asyncio.run(gpt_service._with_retries(calls, latency)) == 1
+
+    assert calls.started[1] - calls.started[0] >= 0.095
+    assert calls.cancelled == [0]
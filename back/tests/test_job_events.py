@@ -0,0 +1,74 @@
+import asyncio
+import json
+import time
+
+from starlette.requests import Request
+
+from app.auth import READ_PRIMARY_HEADER, is_pinned_to_primary
+from app.config import settings
+from app.models.processing_job import JobStatus, JobType
+from services.job_events import job_event_stream
+from services.job_service import ProcessingJobService
+
+
+def _collect(job_id: int) -> list:
+    async def run():
+        return [chunk async for chunk in job_event_stream(job_id)]
+    return asyncio.run(run())
+
+
+def _parse(chunk: str) -> tuple:
+    event, data = chunk.strip().split("\n")
+    return event.removeprefix("event: "), json.loads(data.removeprefix("data: "))
+
+
+def _request(headers: dict) -> Request:
+    return Request({
+        "type": "http",
+        "method": "GET",
+        "headers": [(name.lower().encode(), value.encode()) for name, value in headers.items()],
+    })
+
+
+def test_completed_job_stream_ends_with_done_and_pin_time(db, user):
+    job = ProcessingJobService(db).enqueue(JobType.DAILY_STATS, user.id, payload={"date": "2025-01-01"})
+    job.status = JobStatus.COMPLETED
+    db.commit()
+
+    events = [_parse(chunk) for chunk in _collect(job.id)]
+
+    assert [name for name, _ in events] == ["stage", "done"]
+    done = events[-1][1]
+    assert done["id"] == job.id
+    assert time.time() < done["read_primary_until"] <= time.time() + settings.DB_READ_YOUR_WRITES_SECONDS
+
+
+def test_missing_job_stream_reports_error(db):
+    assert [name for name, _ in map(_parse, _collect(12345))] == ["error"]
+
+
+def test_stream_does_not_hold_a_connection_between_polls(db, user, monkeypatch):
+    monkeypatch.setattr(settings, "JOB_EVENTS_POLL_INTERVAL_SECONDS", 0.01)
+    job = ProcessingJobService(db).enqueue(JobType.DAILY_STATS, user.id, payload={"date": "2025-01-01"})
+    job_id = job.id
+
+    async def run():
+        stream = job_event_stream(job_id)
+        first = await stream.__anext__()
+        # Между опросами поток не держит сессию: строку можно менять и удалять
+        db.delete(job)
+        db.commit()
+        rest = [chunk async for chunk in stream]
+        return [first] + rest
+
+    assert [name for name, _ in map(_parse, asyncio.run(run()))] == ["stage", "error"]
+
+
+def test_read_primary_header_is_accepted_only_within_the_window():
+    now = time.time()
+    assert is_pinned_to_primary(_request({READ_PRIMARY_HEADER: f"{now + 5:.3f}"}))
+    assert not is_pinned_to_primary(_request({READ_PRIMARY_HEADER: f"{now - 1:.3f}"}))
+    assert not is_pinned_to_primary(
+        _request({READ_PRIMARY_HEADER: f"{now + settings.DB_READ_YOUR_WRITES_SECONDS + 60:.3f}"})
+    )
+    assert not is_pinned_to_primary(_request({READ_PRIMARY_HEADER: "soon"}))
@@ -0,0 +1,213 @@
+from datetime import datetime, timedelta, timezone
+
+import pytest
+
+from app.config import settings
+from app.models.processing_job import JobStatus, JobType, ProcessingJob
+from services.job_service import ProcessingJobService
+
+
+def _utc(value: datetime) -> datetime:
+    # SQLite возвращает время без часового пояса
+    return value if value.tzinfo else value.replace(tzinfo=timezone.utc)
+
+
+def _enqueue(service: ProcessingJobService, user_id: int, day: int = 1) -> ProcessingJob:
+    return service.enqueue(JobType.DAILY_STATS, user_id, payload={"date": f"2025-01-{day:02d}"})
+
+
+def _expire_lease(db, job: ProcessingJob):
+    job.locked_until = datetime.now(timezone.utc) - timedelta(seconds=1)
+    db.commit()
+
+
+def test_claim_takes_oldest_ready_job_and_leases_it(db, user):
+    service = ProcessingJobService(db)
+    first = _enqueue(service, user.id, 1)
+    _enqueue(service, user.id, 2)
+
+    job = service.claim("worker-1")
+
+    assert job.id == first.id
+    assert job.status == JobStatus.PROCESSING
+    assert job.attempts == 1
+    assert job.locked_by == "worker-1"
+    assert _utc(job.locked_until) > datetime.now(timezone.utc) + \
+        timedelta(seconds=settings.JOB_VISIBILITY_TIMEOUT_SECONDS - 10)
+
+
+def test_claim_skips_jobs_not_ready_yet(db, user):
+    service = ProcessingJobService(db)
+    job = _enqueue(service, user.id)
+    job.run_after = datetime.now(timezone.utc) + timedelta(minutes=5)
+    db.commit()
+
+    assert service.claim("worker-1") is None
+
+
+def test_claimed_job_is_not_claimed_twice(db, user):
+    service = ProcessingJobService(db)
+    _enqueue(service, user.id)
+
+    assert service.claim("worker-1") is not None
+    assert service.claim("worker-2") is None
+
+
+def test_claim_by_id(db, user):
+    service = ProcessingJobService(db)
+    _enqueue(service, user.id, 1)
+    second = _enqueue(service, user.id, 2)
+
+    assert service.claim("worker-1", job_id=second.id).id == second.id
+
+
+def test_retryable_failure_is_retried_with_backoff(db, user):
+    service = ProcessingJobService(db)
+    _enqueue(service, user.id)
+    job = service.claim("worker-1")
+
+    service.mark_failed(job, "boom")
+
+    assert job.status == JobStatus.PENDING
+    assert job.locked_by is None
+    assert job.error == "boom"
+    assert _utc(job.run_after) > datetime.now(timezone.utc) + \
+        timedelta(seconds=settings.JOB_RETRY_BACKOFF_SECONDS - 1)
+    assert service.claim("worker-1") is None  # ждёт окончания паузы
+
+
+def test_job_goes_to_dead_letter_after_max_attempts(db, user):
+    service = ProcessingJobService(db)
+    _enqueue(service, user.id)
+
+    for attempt in range(1, settings.JOB_MAX_ATTEMPTS + 1):
+        job = service.claim("worker-1")
+        assert job.attempts == attempt
+        service.mark_failed(job, "boom")
+        job.run_after = datetime.now(timezone.utc) - timedelta(seconds=1)
+        db.commit()
+
+    assert job.status == JobStatus.DEAD
+    assert service.claim("worker-1") is None
+
+
+def test_non_retryable_failure_is_final(db, user):
+    service = ProcessingJobService(db)
+    _enqueue(service, user.id)
+    job = service.claim("worker-1")
+
+    service.mark_failed(job, "daily limit reached", retryable=False)
+
+    assert job.status == JobStatus.FAILED
+    assert service.claim("worker-1") is None
+
+
+def test_expired_lease_is_reclaimed_by_another_worker(db, user):
+    service = ProcessingJobService(db)
+    _enqueue(service, user.id)
+    job = service.claim("worker-1")
+    _expire_lease(db, job)
+
+    reclaimed = service.claim("worker-2")
+
+    assert reclaimed.id == job.id
+    assert reclaimed.locked_by == "worker-2"
+    assert reclaimed.attempts == 2
+    # Первый воркер больше не владеет задачей
+    assert not ProcessingJobService.extend_lease(job.id, "worker-1")
+    assert ProcessingJobService.extend_lease(job.id, "worker-2")
+
+
+def test_expired_lease_on_last_attempt_goes_to_dead_letter(db, user):
+    service = ProcessingJobService(db)
+    _enqueue(service, user.id)
+    job = service.claim("worker-1")
+    job.attempts = job.max_attempts
+    _expire_lease(db, job)
+
+    assert service.claim("worker-2") is None
+    db.refresh(job)
+    assert job.status == JobStatus.DEAD
+
+
+def test_extend_lease_moves_deadline(db, user):
+    service = ProcessingJobService(db)
+    _enqueue(service, user.id)
+    job = service.claim("worker-1")
+    _expire_lease(db, job)
+
+    assert ProcessingJobService.extend_lease(job.id, "worker-1")
+
+    db.refresh(job)
+    assert _utc(job.locked_until) > datetime.now(timezone.utc)
+    assert service.claim("worker-2") is None
+
+
+def test_extend_lease_of_completed_job_fails(db, user):
+    service = ProcessingJobService(db)
+    _enqueue(service, user.id)
+    job = service.claim("worker-1")
+    service.mark_completed(job)
+
+    assert job.status == JobStatus.COMPLETED
+    assert not ProcessingJobService.extend_lease(job.id, "worker-1")
+
+
+def test_update_progress_only_by_lease_owner(db, user):
+    service = ProcessingJobService(db)
+    _enqueue(service, user.id)
+    job = service.claim("worker-1")
+
+    assert not ProcessingJobService.update_progress(job.id, "worker-2", {"stage": "analysing"})
+    assert ProcessingJobService.update_progress(job.id, "worker-1", {"partial_summary": "text"})
+
+    db.refresh(job)
+    assert job.partial_summary == "text"
+    assert job.stage != "analysing"
+
+
+def test_defer_does_not_spend_an_attempt(db, user):
+    service = ProcessingJobService(db)
+    _enqueue(service, user.id)
+    job = service.claim("worker-1")
+
+    service.defer(job, 30, "speechkit unavailable")
+
+    assert job.status == JobStatus.PENDING
+    assert job.attempts == 0
+    assert job.error == "speechkit unavailable"
+    assert _utc(job.run_after) > datetime.now(timezone.utc) + timedelta(seconds=25)
+
+
+def test_defer_past_the_limit_counts_as_a_failed_attempt(db, user, monkeypatch):
+    monkeypatch.setattr(settings, "JOB_MAX_DEFER_SECONDS", 60.0)
+    service = ProcessingJobService(db)
+    job = _enqueue(service, user.id)
+    job.created_at = datetime.now(timezone.utc) - timedelta(minutes=5)
+    db.commit()
+    job = service.claim("worker-1")
+
+    service.defer(job, 30, "speechkit unavailable")
+
+    assert job.status == JobStatus.PENDING
+    assert job.attempts == 1
+
+
+@pytest.mark.parametrize("status", [JobStatus.PENDING, JobStatus.PROCESSING])
+def test_count_active_jobs(db, user, status):
+    service = ProcessingJobService(db)
+    job = service.enqueue_audio_job(user_id=user.id, audio_path="/tmp/a.ogg", record_name="r", duration=1.0)
+    job.status = status
+    db.commit()
+
+    assert service.count_active_jobs(user.id) == 1
+
+
+def test_daily_stats_job_is_not_enqueued_twice(db, user):
+    service = ProcessingJobService(db)
+    day = datetime(2025, 1, 1).date()
+
+    first = service.enqueue_daily_stats_job(user.id, day)
+
+    assert service.enqueue_daily_stats_job(user.id, day).id == first.id
+    assert service.enqueue_daily_stats_job(user.id, day + timedelta(days=1)).id != first.id
@@ -0,0 +1,43 @@
+import pytest
+
+from services.utils.json_repair import parse_llm_json, repair_json
+
+
+def test_valid_json_is_parsed_as_is():
+    assert parse_llm_json('{"emotion": "happy", "insights": []}') == {"emotion": "happy", "insights": []}
+
+
+def test_markdown_fence_label_is_removed():
+    # call_gpt убирает обратные кавычки, метка json остаётся
+    assert parse_llm_json('json\n{"emotion": "sadness"}') == {"emotion": "sadness"}
+
+
+def test_full_markdown_fence_is_removed():
+    assert parse_llm_json('```json\n{"emotion": "neutral"}\n```') == {"emotion": "neutral"}
+
+
+def test_text_around_object_is_dropped():
+    text = 'Вот результат анализа:\n{"emotion": "fearful"}\nНадеюсь, это поможет.'
+
+    assert parse_llm_json(text) == {"emotion": "fearful"}
+
+
+def test_trailing_commas_are_removed():
+    text = '{"insights": {"key_triggers": ["работа", "сон",], "support": "",},}'
+
+    assert parse_llm_json(text) == {"insights": {"key_triggers": ["работа", "сон"], "support": ""}}
+
+
+def test_commas_inside_strings_are_kept():
+    text = '{"support": "ты справишься, }", "recommendations": ["a, ]",],}'
+
+    assert parse_llm_json(text) == {"support": "ты справишься, }", "recommendations": ["a, ]"]}
+
+
+def test_escaped_quotes_inside_strings():
+    assert repair_json('{"a": "say \\"hi\\",}",}') == '{"a": "say \\"hi\\",}"}'
+
+
+def test_unrecoverable_text_raises_value_error():
+    with pytest.raises(ValueError):
+        parse_llm_json("Не удалось проанализировать текст")
@@ -0,0 +1,105 @@
+import asyncio
+import hashlib
+import os
+
+import pytest
+
+from services.utils.file_utils import UploadTooLargeError
+from services.utils.multipart_upload import (
+    MultipartUploadError, UploadContentTypeError, receive_multipart_upload
+)
+
+BOUNDARY = "voicebook-boundary"
+CONTENT_TYPE = f"multipart/form-data; boundary={BOUNDARY}"
+
+
+def _body(audio: bytes, content_type: str = "audio/ogg", filename: str = "note.ogg",
+          fields: dict = None) -> bytes:
+    parts = [
+        f'--{BOUNDARY}\r\nContent-Disposition: form-data; name="{name}"\r\n\r\n{value}\r\n'.encode()
+        for name, value in (fields or {}).items()
+    ]
+    parts.append(
+        f'--{BOUNDARY}\r\nContent-Disposition: form-data; name="file"; filename="{filename}"\r\n'
+        f"Content-Type: {content_type}\r\n\r\n".encode() + audio + b"\r\n"
+    )
+    return b"".join(parts) + f"--{BOUNDARY}--\r\n".encode()
+
+
+async def _chunks(body: bytes, size: int = 1000):
+    """Тело, пришедшее по частям (chunked, без Content-Length)"""
+    for start in range(0, len(body), size):
+        await asyncio.sleep(0)
+        yield body[start:start + size]
+
+
+def _receive(body: bytes, dest_dir, max_bytes: int = 1024 * 1024, **kwargs):
+    return asyncio.run(receive_multipart_upload(
+        _chunks(body), CONTENT_TYPE, str(dest_dir), max_bytes,
+        content_type_prefix="audio/", buffer_size=4096, **kwargs
+    ))
+
+
+def test_file_is_written_with_sha256_and_fields(tmp_path):
+    audio = os.urandom(50_000)
+
+    upload = _receive(_body(audio, fields={"duration": "12.5"}), tmp_path)
+
+    with open(upload.path, "rb") as f:
+        assert f.read() == audio
+    assert os.path.dirname(upload.path) == str(tmp_path)
+    assert upload.path.endswith(".ogg")
+    assert upload.size == len(audio)
+    assert upload.sha256 == hashlib.sha256(audio).hexdigest()
+    assert (upload.filename, upload.content_type) == ("note.ogg", "audio/ogg")
+    assert upload.fields == {"duration": "12.5"}
+
+
+def test_size_cap_applies_to_chunked_body_and_removes_partial_file(tmp_path):
+    with pytest.raises(UploadTooLargeError):
+        _receive(_body(os.urandom(20_000)), tmp_path, max_bytes=10_000)
+
+    assert os.listdir(tmp_path) == []
+
+
+def test_file_at_size_cap_is_accepted(tmp_path):
+    assert _receive(_body(b"x" * 10_000), tmp_path, max_bytes=10_000).size == 10_000
+
+
+def test_part_content_type_is_rejected_before_file_is_written(tmp_path):
+    with pytest.raises(UploadContentTypeError):
+        _receive(_body(b"not audio", content_type="text/plain"), tmp_path)
+
+    assert os.listdir(tmp_path) == []
+
+
+def test_truncated_body_removes_partial_file(tmp_path):
+    body = _body(os.urandom(50_000))
+
+    with pytest.raises(MultipartUploadError):
+        _receive(body[:30_000], tmp_path)
+
+    assert os.listdir(tmp_path) == []
+
+
+def test_stream_error_removes_partial_file(tmp_path):
+    async def broken_stream():
+        body = _body(os.urandom(50_000))
+        yield body[:20_000]
+        raise ConnectionResetError("client went away")
+
+    with pytest.raises(ConnectionResetError):
+        asyncio.run(receive_multipart_upload(
+            broken_stream(), CONTENT_TYPE, str(tmp_path), 1024 * 1024, buffer_size=4096
+        ))
+
+    assert os.listdir(tmp_path) == []
+
+
+def test_missing_file_field_and_wrong_content_type(tmp_path):
+    body = f'--{BOUNDARY}\r\nContent-Disposition: form-data; name="duration"\r\n\r\n3\r\n--{BOUNDARY}--\r\n'
+    with pytest.raises(MultipartUploadError, match="required"):
+        _receive(body.encode(), tmp_path)
+
+    with pytest.raises(MultipartUploadError):
+        asyncio.run(receive_multipart_upload(_chunks(b"{}"), "application/json", str(tmp_path), 1024))
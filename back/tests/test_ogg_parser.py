@@ -0,0 +1,93 @@
+import io
+import struct
+
+import pytest
+
+from services.utils.ogg_parser import (
+    OPUS_GRANULE_RATE, InvalidOggError, inspect_ogg_opus, ogg_crc32, read_page
+)
+
+SERIAL = 0x1234
+
+
+def _page(body: bytes, sequence: int, granule: int = 0, header_type: int = 0, serial: int = SERIAL) -> bytes:
+    """Страница Ogg с одним пакетом, целиком помещающимся в неё"""
+    lacing = bytes([255] * (len(body) // 255) + [len(body) % 255])
+    header = struct.pack("<4sBBqIIIB", b"OggS", 0, header_type, granule, serial, sequence, 0, len(lacing))
+    crc = ogg_crc32(header + lacing + body)
+    return header[:22] + struct.pack("<I", crc) + header[26:] + lacing + body
+
+
+def _opus_head(channels: int = 1, pre_skip: int = 312, sample_rate: int = 48000) -> bytes:
+    return b"OpusHead" + struct.pack("<BBHIhB", 1, channels, pre_skip, sample_rate, 0, 0)
+
+
+def _ogg_opus(granule: int, pre_skip: int = 312, audio_pages: int = 3) -> bytes:
+    pages = [
+        _page(_opus_head(pre_skip=pre_skip), 0, header_type=0x02),
+        _page(b"OpusTags" + struct.pack("<I", 0) + struct.pack("<I", 0), 1),
+    ]
+    for index in range(audio_pages):
+        is_last = index == audio_pages - 1
+        pages.append(_page(
+            b"\xfc" + bytes(300),
+            2 + index,
+            granule=granule if is_last else granule * (index + 1) // audio_pages,
+            header_type=0x04 if is_last else 0
+        ))
+    return b"".join(pages)
+
+
+def test_duration_from_last_granule_minus_pre_skip():
+    data = _ogg_opus(granule=3 * OPUS_GRANULE_RATE + 312, pre_skip=312)
+
+    info = inspect_ogg_opus(data)
+
+    assert info.channels == 1
+    assert info.pre_skip == 312
+    assert info.input_sample_rate == 48000
+    assert info.duration == pytest.approx(3.0)
+
+
+def test_accepts_file_object():
+    data = _ogg_opus(granule=OPUS_GRANULE_RATE)
+
+    assert inspect_ogg_opus(io.BytesIO(data)).duration == pytest.approx(1.0 - 312 / OPUS_GRANULE_RATE)
+
+
+def test_crc_mismatch_is_rejected():
+    data = bytearray(_ogg_opus(granule=OPUS_GRANULE_RATE))
+    data[40] ^= 0xFF  # байт внутри OpusHead
+
+    with pytest.raises(InvalidOggError, match="CRC"):
+        inspect_ogg_opus(bytes(data))
+
+
+def test_first_page_must_begin_stream():
+    data = _page(_opus_head(), 0) + _page(b"OpusTags" + bytes(8), 1)
+
+    with pytest.raises(InvalidOggError, match="beginning-of-stream"):
+        inspect_ogg_opus(data)
+
+
+def test_non_opus_stream_is_rejected():
+    data = _page(b"\x01vorbis" + bytes(23), 0, header_type=0x02) + _page(b"\x03vorbis" + bytes(8), 1)
+
+    with pytest.raises(InvalidOggError, match="OpusHead"):
+        inspect_ogg_opus(data)
+
+
+def test_not_ogg_is_rejected():
+    with pytest.raises(InvalidOggError):
+        inspect_ogg_opus(b"RIFF" + bytes(100))
+
+
+def test_truncated_page_is_rejected():
+    page = _page(_opus_head(), 0, header_type=0x02)
+
+    with pytest.raises(InvalidOggError, match="Truncated"):
+        read_page(io.BytesIO(page[:-5]))
+
+
+def test_read_page_returns_none_at_end_of_stream():
+    assert read_page(io.BytesIO(b"")) is None
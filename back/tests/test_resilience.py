@@ -0,0 +1,170 @@
+import asyncio
+import threading
+import time
+
+import pytest
+
+from services.utils.resilience import Bulkhead, CircuitBreaker, DependencyUnavailableError
+
+
+def _breaker(open_seconds: float = 60.0) -> CircuitBreaker:
+    return CircuitBreaker(
+        "test",
+        window_size=4,
+        min_calls=4,
+        failure_rate_threshold=0.5,
+        slow_call_seconds=10.0,
+        slow_call_rate_threshold=1.0,
+        open_seconds=open_seconds,
+        half_open_max_calls=2
+    )
+
+
+def _call(breaker: CircuitBreaker, failed: bool = False, duration: float = 0.1):
+    breaker.before_call()
+    breaker.record(duration, failed)
+
+
+def _open(breaker: CircuitBreaker, monkeypatch) -> list:
+    """Размыкает цепь и возвращает часы, которыми тест двигает время"""
+    now = [1000.0]
+    monkeypatch.setattr("services.utils.resilience.time.monotonic", lambda: now[0])
+    for failed in (False, True, False, True):
+        _call(breaker, failed)
+    assert breaker.stats()["state"] == CircuitBreaker.OPEN
+    return now
+
+
+def test_breaker_stays_closed_below_min_calls_and_threshold():
+    breaker = _breaker()
+    for failed in (True, True, True):
+        _call(breaker, failed)
+    assert breaker.stats()["state"] == CircuitBreaker.CLOSED
+
+    breaker = _breaker()
+    for failed in (True, False, False, False):
+        _call(breaker, failed)
+    assert breaker.stats()["state"] == CircuitBreaker.CLOSED
+
+
+def test_open_breaker_rejects_until_open_seconds_pass(monkeypatch):
+    breaker = _breaker(open_seconds=30)
+    now = _open(breaker, monkeypatch)
+
+    now[0] += 10
+    with pytest.raises(DependencyUnavailableError) as error:
+        breaker.before_call()
+    assert error.value.retry_after == pytest.approx(20)
+    assert breaker.stats()["rejected"] == 1
+
+
+def test_half_open_limits_probes_and_closes_after_successes(monkeypatch):
+    breaker = _breaker(open_seconds=30)
+    now = _open(breaker, monkeypatch)
+    now[0] += 31
+
+    breaker.before_call()
+    breaker.before_call()
+    assert breaker.stats()["state"] == CircuitBreaker.HALF_OPEN
+    with pytest.raises(DependencyUnavailableError):
+        breaker.before_call()
+
+    breaker.record(0.1, failed=False)
+    breaker.record(0.1, failed=False)
+    assert breaker.stats() == {"state": CircuitBreaker.CLOSED, "window_calls": 0, "rejected": 1}
+    _call(breaker)
+
+
+def test_failed_or_slow_probe_reopens_breaker(monkeypatch):
+    breaker = _breaker(open_seconds=30)
+    now = _open(breaker, monkeypatch)
+
+    now[0] += 31
+    _call(breaker, failed=True)
+    assert breaker.stats()["state"] == CircuitBreaker.OPEN
+
+    now[0] += 31
+    _call(breaker, duration=15.0)
+    assert breaker.stats()["state"] == CircuitBreaker.OPEN
+
+
+def test_cancelled_probe_frees_its_half_open_slot(monkeypatch):
+    breaker = _breaker(open_seconds=30)
+    now = _open(breaker, monkeypatch)
+    now[0] += 31
+
+    breaker.before_call()
+    breaker.before_call()
+    breaker.cancel()
+    breaker.before_call()
+
+
+def test_bulkhead_rejects_at_capacity_after_max_wait():
+    bulkhead = Bulkhead("test", max_concurrent=2, max_wait_seconds=0.05)
+
+    async def run():
+        await bulkhead.acquire()
+        await bulkhead.acquire()
+        started = time.monotonic()
+        with pytest.raises(DependencyUnavailableError):
+            await bulkhead.acquire()
+        return time.monotonic() - started
+
+    waited = asyncio.run(run())
+
+    assert 0.04 <= waited < 1.0
+    assert bulkhead.stats() == {"max_concurrent": 2, "in_flight": 2, "waiting": 0, "rejected": 1}
+
+
+def test_bulkhead_hands_released_slot_to_waiter():
+    bulkhead = Bulkhead("test", max_concurrent=1, max_wait_seconds=5.0)
+
+    async def run():
+        await bulkhead.acquire()
+        waiter = asyncio.create_task(bulkhead.acquire())
+        await asyncio.sleep(0.01)
+        assert bulkhead.stats()["waiting"] == 1
+        bulkhead.release()
+        await asyncio.wait_for(waiter, 1.0)
+
+    asyncio.run(run())
+
+    assert bulkhead.stats() == {"max_concurrent": 1, "in_flight": 1, "waiting": 0, "rejected": 0}
+
+
+def test_bulkhead_wakes_waiter_on_another_event_loop():
+    bulkhead = Bulkhead("test", max_concurrent=1, max_wait_seconds=5.0)
+    asyncio.run(bulkhead.acquire())
+    acquired = threading.Event()
+
+    def other_loop():
+        asyncio.run(bulkhead.acquire())
+        acquired.set()
+
+    thread = threading.Thread(target=other_loop)
+    thread.start()
+    deadline = time.monotonic() + 2
+    while bulkhead.stats()["waiting"] == 0 and time.monotonic() < deadline:
+        time.sleep(0.01)
+    bulkhead.release()
+    thread.join(timeout=2)
+
+    assert acquired.is_set()
+    assert bulkhead.stats()["in_flight"] == 1
+
+
+def test_cancelled_waiter_does_not_leak_slot():
+    bulkhead = Bulkhead("test", max_concurrent=1, max_wait_seconds=5.0)
+
+    async def run():
+        await bulkhead.acquire()
+        waiter = asyncio.create_task(bulkhead.acquire())
+        await asyncio.sleep(0.01)
+        waiter.cancel()
+        with pytest.raises(asyncio.CancelledError):
+            await waiter
+        bulkhead.release()
+
+    asyncio.run(run())
+
+    assert bulkhead.stats() == {"max_concurrent": 1, "in_flight": 0, "waiting": 0, "rejected": 0}
@@ -0,0 +1,150 @@
+"""
+S3-клиент против moto в режиме сервера: загрузка и удаление идут через
+httpx по подписанным URL, поэтому нужен настоящий HTTP-эндпоинт.
+Без moto (pip install "moto[server]") тесты пропускаются.
+"""
+import asyncio
+
+import pytest
+
+moto_server = pytest.importorskip("moto.server")
+
+from app.config import settings
+from services import stt_service
+from services.utils import s3_client
+from services.utils.http_client import close_async_client
+
+_CHUNK = 5 * 1024 * 1024  # минимальная часть multipart-загрузки в S3
+
+
+@pytest.fixture(scope="module")
+def endpoint():
+    server = moto_server.ThreadedMotoServer(ip_address="127.0.0.1", port=0, verbose=False)
+    server.start()
+    host, port = server.get_host_and_port()
+    yield f"http://{host}:{port}"
+    server.stop()
+
+
+@pytest.fixture
+def s3(endpoint, monkeypatch):
+    monkeypatch.setattr(settings, "S3_ENDPOINT_URL", endpoint)
+    monkeypatch.setattr(settings, "S3_ADDRESSING_STYLE", "path")
+    monkeypatch.setattr(settings, "S3_MULTIPART_THRESHOLD_BYTES", _CHUNK)
+    monkeypatch.setattr(settings, "S3_MULTIPART_CHUNK_BYTES", _CHUNK)
+    monkeypatch.setattr(s3_client, "_client", None)
+    client = s3_client.get_s3_client()
+    client.create_bucket(Bucket=settings.BUCKET_NAME)
+    yield client
+    keys = [obj["Key"] for obj in client.list_objects_v2(Bucket=settings.BUCKET_NAME).get("Contents", [])]
+    s3_client.delete_objects(keys)
+    client.delete_bucket(Bucket=settings.BUCKET_NAME)
+
+
+def _run(coro):
+    async def run():
+        try:
+            return await coro
+        finally:
+            await close_async_client()
+    return asyncio.run(run())
+
+
+def _keys(client, prefix: str = "") -> list:
+    paginator = client.get_paginator("list_objects_v2")
+    return [
+        obj["Key"]
+        for page in paginator.paginate(Bucket=settings.BUCKET_NAME, Prefix=prefix)
+        for obj in page.get("Contents", [])
+    ]
+
+
+def _read(client, key: str) -> bytes:
+    return client.get_object(Bucket=settings.BUCKET_NAME, Key=key)["Body"].read()
+
+
+def test_small_object_is_uploaded_with_single_put(s3, monkeypatch):
+    def no_multipart(*args, **kwargs):
+        raise AssertionError("multipart upload below the threshold")
+    monkeypatch.setattr(s3_client, "_upload_multipart", no_multipart)
+    data = b"x" * 1024
+
+    _run(s3_client.upload_bytes(data, "stt/small.ogg"))
+
+    assert _read(s3, "stt/small.ogg") == data
+
+
+def test_large_object_is_uploaded_in_parts(s3):
+    data = bytes(range(256)) * (2 * _CHUNK // 256) + b"tail"
+
+    _run(s3_client.upload_bytes(data, "stt/large.ogg"))
+
+    assert _read(s3, "stt/large.ogg") == data
+    head = s3.head_object(Bucket=settings.BUCKET_NAME, Key="stt/large.ogg")
+    assert head["ETag"].strip('"').endswith("-3")
+
+
+def test_failed_part_aborts_multipart_upload(s3, monkeypatch):
+    put = s3_client._put
+
+    async def failing_put(url: str, data: bytes):
+        if "partNumber=2" in url:
+            raise RuntimeError("connection reset")
+        return await put(url, data)
+    monkeypatch.setattr(s3_client, "_put", failing_put)
+
+    with pytest.raises(RuntimeError):
+        _run(s3_client.upload_bytes(b"x" * (2 * _CHUNK + 1), "stt/broken.ogg"))
+
+    assert s3.list_multipart_uploads(Bucket=settings.BUCKET_NAME).get("Uploads", []) == []
+    assert _keys(s3) == []
+
+
+def test_object_is_deleted_after_recognition_is_done(s3, monkeypatch):
+    seen = {}
+
+    async def start_transcription(iam_token: str, audio_url: str) -> str:
+        seen["url"] = audio_url
+        return "operation"
+
+    async def get_transcription_result(iam_token, operation_id, audio_duration=None) -> str:
+        seen["stored"] = _keys(s3, settings.S3_STT_PREFIX)
+        return "текст"
+
+    monkeypatch.setattr(stt_service, "start_transcription", start_transcription)
+    monkeypatch.setattr(stt_service, "get_transcription_result", get_transcription_result)
+
+    transcript = _run(stt_service.transcribe_audio("token", b"ogg" * 1000, audio_duration=None))
+
+    assert transcript == "текст"
+    assert len(seen["stored"]) == 1
+    assert seen["url"] == s3_client.object_url(seen["stored"][0])
+    assert _keys(s3) == []
+
+
+def test_sweep_deletes_stale_objects_in_batches(s3, monkeypatch):
+    keys = [f"stt/{number:04d}.ogg" for number in range(1005)]
+    for key in keys:
+        s3.put_object(Bucket=settings.BUCKET_NAME, Key=key, Body=b"")
+    s3.put_object(Bucket=settings.BUCKET_NAME, Key="other/keep.ogg", Body=b"")
+
+    batches = []
+    delete_objects = s3.delete_objects
+
+    def counting_delete_objects(**kwargs):
+        batches.append(len(kwargs["Delete"]["Objects"]))
+        return delete_objects(**kwargs)
+    monkeypatch.setattr(s3, "delete_objects", counting_delete_objects)
+
+    # Порог в будущем: устаревшими считаются все объекты под префиксом
+    assert s3_client.sweep_stale_objects(prefix="stt/", older_than_seconds=-60) == 1005
+
+    assert batches == [1000, 5]
+    assert _keys(s3) == ["other/keep.ogg"]
+
+
+def test_sweep_keeps_fresh_objects(s3):
+    s3.put_object(Bucket=settings.BUCKET_NAME, Key="stt/fresh.ogg", Body=b"")
+
+    assert s3_client.sweep_stale_objects(prefix="stt/", older_than_seconds=3600) == 0
+    assert _keys(s3) == ["stt/fresh.ogg"]
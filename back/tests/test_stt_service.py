@@ -0,0 +1,77 @@
+import asyncio
+
+import pytest
+
+from app.config import settings
+from services import stt_service
+from services.stt_service import fits_sync_recognition
+
+MAX_SECONDS = settings.STT_SYNC_MAX_DURATION_SECONDS
+MAX_BYTES = settings.STT_SYNC_MAX_BYTES
+
+
+@pytest.mark.parametrize("size, duration, expected", [
+    (MAX_BYTES, MAX_SECONDS, True),
+    (1, 0.5, True),
+    (MAX_BYTES + 1, MAX_SECONDS, False),
+    (MAX_BYTES, MAX_SECONDS + 0.01, False),
+    (1, None, False),
+])
+def test_sync_recognition_boundary(size, duration, expected):
+    assert fits_sync_recognition(b"x" * size, duration) is expected
+
+
+def test_sync_recognition_can_be_disabled(monkeypatch):
+    monkeypatch.setattr(settings, "STT_SYNC_ENABLED", False)
+    assert not fits_sync_recognition(b"x", 1.0)
+
+
+@pytest.fixture
+def stt_calls(monkeypatch):
+    """Какой путь распознавания выбран: синхронный или через Object Storage"""
+    calls = []
+
+    async def recognize_short_audio(iam_token, audio_data):
+        calls.append("sync")
+        return "short"
+
+    async def upload_to_bucket(audio_data):
+        calls.append("upload")
+        return "stt/object.ogg"
+
+    async def start_transcription(iam_token, audio_url):
+        return "operation"
+
+    async def get_transcription_result(iam_token, operation_id, audio_duration=None):
+        calls.append("long_running")
+        return "long"
+
+    async def delete_object(object_name):
+        calls.append("delete")
+
+    for fake in (recognize_short_audio, upload_to_bucket, start_transcription,
+                 get_transcription_result, delete_object):
+        monkeypatch.setattr(stt_service, fake.__name__, fake)
+    return calls
+
+
+def test_short_clip_uses_sync_recognition(stt_calls):
+    assert asyncio.run(stt_service.transcribe_audio("token", b"x" * MAX_BYTES, MAX_SECONDS)) == "short"
+    assert stt_calls == ["sync"]
+
+
+def test_long_clip_goes_through_object_storage(stt_calls):
+    assert asyncio.run(stt_service.transcribe_audio("token", b"x" * 100, MAX_SECONDS + 1)) == "long"
+    assert stt_calls == ["upload", "long_running", "delete"]
+
+
+def test_large_clip_goes_through_object_storage(stt_calls):
+    assert asyncio.run(stt_service.transcribe_audio("token", b"x" * (MAX_BYTES + 1), 5.0)) == "long"
+    assert stt_calls == ["upload", "long_running", "delete"]
+
+
+def test_segments_are_routed_one_by_one(stt_calls):
+    segments = [(b"x" * 100, 20.0), (b"x" * 100, MAX_SECONDS + 5)]
+
+    assert asyncio.run(stt_service.transcribe_audio("token", b"", None, segments=segments)) == "short long"
+    assert sorted(stt_calls) == ["delete", "long_running", "sync", "upload"]
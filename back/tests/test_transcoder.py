@@ -0,0 +1,49 @@
+import threading
+import time
+
+from prometheus_client import REGISTRY
+
+from services.transcoder import TranscoderPool
+
+
+def _gauge(name: str) -> float:
+    return REGISTRY.get_sample_value(name) or 0.0
+
+
+def _wait_for(condition, timeout: float = 2.0):
+    deadline = time.monotonic() + timeout
+    while not condition():
+        assert time.monotonic() < deadline, "condition not reached"
+        time.sleep(0.01)
+
+
+def test_slot_gauges_track_active_and_queued_transcodes():
+    pool = TranscoderPool(max_workers=1)
+    active, queued = _gauge("voicebook_transcodes_active"), _gauge("voicebook_transcodes_queued")
+    release_first = threading.Event()
+    second_started = threading.Event()
+
+    def first():
+        with pool._slot():
+            release_first.wait()
+
+    def second():
+        with pool._slot():
+            second_started.set()
+
+    threads = [threading.Thread(target=first), threading.Thread(target=second)]
+    threads[0].start()
+    _wait_for(lambda: pool.stats()["active"] == 1)
+    threads[1].start()
+    _wait_for(lambda: pool.stats()["queue_depth"] == 1)
+
+    assert _gauge("voicebook_transcodes_active") == active + 1
+    assert _gauge("voicebook_transcodes_queued") == queued + 1
+
+    release_first.set()
+    for thread in threads:
+        thread.join(timeout=2)
+
+    assert second_started.is_set()
+    assert _gauge("voicebook_transcodes_active") == active
+    assert _gauge("voicebook_transcodes_queued") == queued
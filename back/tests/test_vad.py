@@ -0,0 +1,75 @@
+import numpy as np
+import pytest
+
+from services.utils.vad import SilentAudioError, find_pauses, plan_segments, trim_silence
+
+SAMPLE_RATE = 16000
+
+
+def _tone(seconds: float) -> np.ndarray:
+    t = np.arange(int(seconds * SAMPLE_RATE)) / SAMPLE_RATE
+    return (np.sin(2 * np.pi * 220 * t) * 8000).astype(np.int16)
+
+
+def _silence(seconds: float) -> np.ndarray:
+    return np.zeros(int(seconds * SAMPLE_RATE), dtype=np.int16)
+
+
+def _trim(pcm: np.ndarray):
+    return trim_silence(pcm.tobytes(), sample_rate=SAMPLE_RATE, frame_ms=30, padding_ms=200,
+                        max_pause_ms=700, min_speech_ms=300)
+
+
+def test_trim_silence_shortens_long_pauses():
+    pcm = np.concatenate([_silence(1.0), _tone(1.0), _silence(3.0), _tone(1.0), _silence(1.0)])
+
+    vad = _trim(pcm)
+
+    assert vad.original_duration == pytest.approx(7.0, abs=0.01)
+    assert 2.0 < vad.trimmed_duration < 4.0
+
+
+def test_trim_silence_rejects_silent_audio():
+    with pytest.raises(SilentAudioError):
+        _trim(_silence(2.0))
+
+
+def test_find_pauses_locates_gap_between_speech():
+    pcm = np.concatenate([_tone(2.0), _silence(1.0), _tone(2.0)])
+
+    pauses = find_pauses(pcm.tobytes(), SAMPLE_RATE, 30, 500)
+
+    assert len(pauses) == 1
+    assert 2.0 < pauses[0] < 3.0
+
+
+def test_short_audio_is_one_segment():
+    assert plan_segments(30.0, [10.0, 20.0], max_seconds=60.0) == [(0.0, 30.0)]
+
+
+def test_cut_at_last_pause_before_limit():
+    bounds = plan_segments(100.0, [20.0, 45.0, 55.0, 70.0], max_seconds=60.0)
+
+    assert bounds == [(0.0, 55.0), (55.0, 100.0)]
+
+
+def test_cut_at_limit_without_pauses():
+    bounds = plan_segments(130.0, [], max_seconds=60.0)
+
+    assert bounds == [(0.0, 60.0), (60.0, 120.0), (120.0, 130.0)]
+
+
+def test_pause_too_close_to_start_is_ignored():
+    # Разрез по паузе на 5 с дал бы часть короче min_seconds
+    bounds = plan_segments(100.0, [5.0], max_seconds=60.0, min_seconds=10.0)
+
+    assert bounds == [(0.0, 60.0), (60.0, 100.0)]
+
+
+def test_segments_cover_audio_without_gaps():
+    pauses = [12.5, 31.0, 58.0, 61.0, 119.0, 150.0]
+    bounds = plan_segments(200.0, pauses, max_seconds=60.0, min_seconds=5.0)
+
+    assert bounds[0][0] == 0.0 and bounds[-1][1] == 200.0
+    assert all(end == next_start for (_, end), (next_start, _) in zip(bounds, bounds[1:]))
+    assert all(end - start <= 60.0 for start, end in bounds)
@@ -16,6 +16,7 @@ export const API_CONFIG = {
     RECORDS: {
       GET_ALL: '/records/',
       UPLOAD: '/records/upload',
+      JOB_STATUS: '/records/jobs/{jobId}',
       GET_BY_ID: '/records/{recordId}',
       UPDATE: '/records/{recordId}',
       UPDATE_FEEDBACK: '/records/{recordId}/feedback',
@@ -1,5 +1,20 @@
 import { useState, useRef, useEffect, useCallback } from "react";
-import { useUploadRecordingMutation } from "../recordingsApi";
+import { useDispatch } from "react-redux";
+import {
+  recordingsApi,
+  useUploadRecordingMutation,
+  useLazyGetRecordingJobQuery,
+} from "../recordingsApi";
+
+const JOB_POLL_INTERVAL_MS = 1500;
+
+// Сервер определяет формат по содержимому, расширение - для читаемости
+const fileExtension = (mimeType) => {
+  if (mimeType.includes("ogg")) return ".ogg";
+  if (mimeType.includes("mp4")) return ".m4a";
+  if (mimeType.includes("wav")) return ".wav";
+  return ".webm";
+};
 
 const useAudioRecorder = ({ setIsRecording, onRecordingStart, onResult }) => {
   const [isRecording, setRecording] = useState(false);
@@ -15,6 +30,8 @@ const useAudioRecorder = ({ setIsRecording, onRecordingStart, onResult }) => {
   const [showDeleteConfirm, setShowDeleteConfirm] = useState(false);
   const [isActionInProgress, setIsActionInProgress] = useState(false);
   const [uploadRecording] = useUploadRecordingMutation();
+  const [fetchRecordingJob] = useLazyGetRecordingJobQuery();
+  const dispatch = useDispatch();
 
   useEffect(() => {
     const checkPermission = async () => {
@@ -110,7 +127,9 @@ const useAudioRecorder = ({ setIsRecording, onRecordingStart, onResult }) => {
       };
 
       mediaRecorder.current.onstop = () => {
-        const audioBlob = new Blob(audioChunks.current, { type: "audio/wav" });
+        // MediaRecorder пишет в свой формат (обычно WebM/Opus), а не в WAV
+        const mimeType = mediaRecorder.current.mimeType || "audio/webm";
+        const audioBlob = new Blob(audioChunks.current, { type: mimeType });
         setAudioBlob(audioBlob);
       };
 
@@ -163,6 +182,25 @@ const useAudioRecorder = ({ setIsRecording, onRecordingStart, onResult }) => {
     setShowDeleteConfirm(false);
   };
 
+  const waitForRecord = async (jobId) => {
+    // Сервер обрабатывает запись асинхронно, опрашиваем состояние задачи
+    for (;;) {
+      const job = await fetchRecordingJob(jobId).unwrap();
+
+      if (job.status === "completed") {
+        dispatch(
+          recordingsApi.util.invalidateTags(["Recordings", "RecordingLimit"])
+        );
+        return job.record;
+      }
+      if (job.status === "failed" || job.status === "dead") {
+        throw new Error(job.error || "Processing failed");
+      }
+
+      await new Promise((resolve) => setTimeout(resolve, JOB_POLL_INTERVAL_MS));
+    }
+  };
+
   const saveRecording = async () => {
     setIsActionInProgress(true);
     if (audioBlob) {
@@ -176,11 +214,12 @@ const useAudioRecorder = ({ setIsRecording, onRecordingStart, onResult }) => {
         formData.append(
           "file",
           audioBlob,
-          `voice-${new Date().toISOString()}.wav`
+          `voice-${new Date().toISOString()}${fileExtension(audioBlob.type)}`
         );
         formData.append("duration", recordTime);
 
-        const result = await uploadRecording(formData).unwrap();
+        const job = await uploadRecording(formData).unwrap();
+        const result = await waitForRecord(job.id);
 
         if (onResult) {
           onResult({
@@ -13,7 +13,13 @@ export const recordingsApi = createApi({
         method: "POST",
         body: formData,
       }),
-      invalidatesTags: ["Recordings", "RecordingLimit", "Achievements"],
+      invalidatesTags: ["RecordingLimit"],
+    }),
+    getRecordingJob: builder.query({
+      query: (jobId) => ({
+        url: API_CONFIG.ENDPOINTS.RECORDS.JOB_STATUS.replace("{jobId}", jobId),
+      }),
+      keepUnusedDataFor: 0,
     }),
     getRecordings: builder.query({
       query: ({
@@ -68,6 +74,7 @@ export const recordingsApi = createApi({
 
 export const {
   useUploadRecordingMutation,
+  useLazyGetRecordingJobQuery,
   useGetRecordingsQuery,
   useDeleteRecordingMutation,
   useSetRecordingFeedbackMutation,